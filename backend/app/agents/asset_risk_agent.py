@@ -1,6 +1,63 @@
-from app.core.ai_client import call_llm
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional
 
-def classify_asset(asset: dict) -> dict:
+from app.agents.rule_classifier import pre_classify, rules_enabled
+from app.core.ai_client import LLM_TIMEOUT, LLMError, call_llm_async
+from app.core.async_runtime import run_sync
+from app.core.classification_cache import classification_key, get_classification_cache
+from app.core.config_loader import load_easm_config
+
+DEFAULT_BATCH_SIZE = 20
+
+# Fields the model needs; the rest of the asset (timestamps, ids of other
+# records) only costs prompt tokens
+PROMPT_FIELDS = ("asset_id", "asset_type", "identifier", "risk_tags", "hostnames")
+
+_JSON_BLOCK = re.compile(r"(\{.*\}|\[.*\])", re.DOTALL)
+
+
+def get_batch_size() -> int:
+    llm_cfg = load_easm_config().get("llm", {}) or {}
+    return max(1, int(llm_cfg.get("batch_size", DEFAULT_BATCH_SIZE)))
+
+
+def parse_llm_json(result: dict):
+    """
+    Decode the JSON the model wrote into Ollama's `response` text.
+    Tolerates code fences and prose around it; None if nothing parses.
+    """
+    text = result.get("response") if isinstance(result, dict) else None
+    if not isinstance(text, str):
+        return None
+
+    for candidate in (text, *_JSON_BLOCK.findall(text)):
+        try:
+            return json.loads(candidate.strip().strip("`"))
+        except ValueError:
+            continue
+    return None
+
+
+def _normalize(result) -> dict:
+    """Keep the output schema stable: {"risk_score": int|None, "risk_tags": [str]}."""
+    if not isinstance(result, dict):
+        return {}
+
+    score = result.get("risk_score")
+    try:
+        score = max(0, min(100, int(score))) if score is not None else None
+    except (TypeError, ValueError):
+        score = None
+
+    tags = result.get("risk_tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    return {"risk_score": score, "risk_tags": [str(t) for t in tags]}
+
+
+async def _classify_one(asset: dict, timeout: float) -> dict:
     prompt = f"""
 You are a cybersecurity risk engine.
 
@@ -11,4 +68,145 @@ Return JSON only:
 - risk_score (0-100)
 - risk_tags
 """
-    return call_llm(prompt)
+    return _normalize(parse_llm_json(await call_llm_async(prompt, timeout=timeout, format="json")))
+
+
+def _store(cache, key: str, result: dict):
+    # Unparseable answers are retried next time rather than cached
+    if cache is not None and result.get("risk_score") is not None:
+        cache.put(key, result)
+
+
+def classify_asset(asset: dict, timeout: float = LLM_TIMEOUT) -> dict:
+    """
+    Classify one asset: by the rule tier if it is unambiguous, from the
+    cache if it is unchanged, otherwise by the LLM.
+    """
+    ruled = pre_classify(asset) if rules_enabled() else None
+    if ruled is not None:
+        return ruled
+
+    cache = get_classification_cache()
+    key = classification_key(asset)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    result = run_sync(_classify_one(asset, timeout))
+    _store(cache, key, result)
+    return result
+
+
+async def _ask_batch(assets: List[dict], timeout: float) -> Dict[str, dict]:
+    """One request for several assets; only the assets the model answered come back."""
+    compact = [{k: a.get(k) for k in PROMPT_FIELDS if a.get(k) is not None} for a in assets]
+    prompt = f"""
+You are a cybersecurity risk engine.
+
+Evaluate the exposure risk of each asset below:
+{json.dumps(compact, default=str)}
+
+Return JSON only, one entry per asset, keeping each asset_id unchanged:
+{{"results": [{{"asset_id": "...", "risk_score": 0-100, "risk_tags": ["..."]}}]}}
+"""
+    parsed = parse_llm_json(await call_llm_async(prompt, timeout=timeout, format="json"))
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results")
+
+    wanted = {a["asset_id"] for a in assets}
+    return {
+        entry["asset_id"]: _normalize(entry)
+        for entry in (parsed if isinstance(parsed, list) else [])
+        if isinstance(entry, dict) and entry.get("asset_id") in wanted
+    }
+
+
+async def _classify_batch(assets: List[dict], timeout: float) -> Dict[str, dict]:
+    """
+    One request for the whole batch. Assets missing from the answer are
+    asked for again as one smaller batch, then one by one; the fallback
+    shares the batch's `timeout`, and whatever is still unanswered when it
+    runs out is left out of the result.
+    """
+    if len(assets) == 1:
+        return {assets[0]["asset_id"]: await _classify_one(assets[0], timeout)}
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    results = await _ask_batch(assets, timeout)
+
+    def missing():
+        return [a for a in assets if a["asset_id"] not in results]
+
+    # Failed fallback requests only lose their own assets, not the batch
+    if len(missing()) > 1 and deadline > loop.time():
+        try:
+            results.update(await _ask_batch(missing(), deadline - loop.time()))
+        except LLMError:
+            pass
+
+    singles = missing()
+    if singles and deadline > loop.time():
+        answers = await asyncio.gather(
+            *(_classify_one(a, deadline - loop.time()) for a in singles), return_exceptions=True
+        )
+        for asset, answer in zip(singles, answers):
+            if isinstance(answer, LLMError):
+                continue
+            if isinstance(answer, BaseException):
+                raise answer
+            results[asset["asset_id"]] = answer
+    return results
+
+
+def classify_assets(
+    assets: List[dict],
+    timeout: float = LLM_TIMEOUT,
+    batch_size: Optional[int] = None
+) -> Dict[str, dict]:
+    """
+    Classify many assets with one LLM request per `batch_size` assets
+    (`llm.batch_size`). Results are keyed by asset_id. Assets the rule tier
+    can decide and cached ones are answered without the model. Assets the
+    model left out of its batch answer are retried as one smaller batch,
+    then on their own, within the batch's `timeout`; any still unanswered
+    are missing from the result.
+
+    Batches are sent concurrently and the LLM client caps how many are in
+    flight. Results of batches that succeeded are kept (and cached) even if
+    another batch fails; the first failure is then raised.
+    """
+    batch_size = batch_size or get_batch_size()
+    cache = get_classification_cache()
+    results: Dict[str, dict] = {}
+    keys = {a["asset_id"]: classification_key(a) for a in assets}
+    use_rules = rules_enabled()
+
+    pending = []
+    for asset in assets:
+        result = pre_classify(asset) if use_rules else None
+        if result is None and cache is not None:
+            result = cache.get(keys[asset["asset_id"]])
+        if result is not None:
+            results[asset["asset_id"]] = result
+        else:
+            pending.append(asset)
+
+    async def classify_pending():
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        return await asyncio.gather(
+            *(_classify_batch(b, timeout) for b in batches), return_exceptions=True
+        )
+
+    errors = []
+    for outcome in run_sync(classify_pending()) if pending else []:
+        if isinstance(outcome, BaseException):
+            errors.append(outcome)
+            continue
+        for asset_id, result in outcome.items():
+            results[asset_id] = result
+            _store(cache, keys[asset_id], result)
+
+    if errors:
+        raise errors[0]
+    return results
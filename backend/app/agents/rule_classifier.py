@@ -0,0 +1,105 @@
+"""
+Rule-based risk pre-classifier.
+
+Most assets need no model to judge: a domain that is only internet exposed,
+or a service whose port and HTTP fingerprint evidence already say what it
+is. `pre_classify` scores those deterministically from asset type, tags and
+the evidence in EVIDENCE_STORE, and returns None for anything it cannot
+decide (unknown tags, AI evidence, unnamed services) so only those reach
+the LLM.
+
+Score = the highest rule that matched, plus FINDING_BONUS for every other
+finding, capped at 100. Output has the LLM's schema:
+{"risk_score": int, "risk_tags": [str]}.
+"""
+
+from typing import Optional
+
+from app.core.config_loader import load_easm_config
+from app.core.evidence_store import EVIDENCE_STORE
+
+# Evidence type -> (score, tag). Types not listed make the asset ambiguous.
+EVIDENCE_RULES = {
+    "subdomain_found": (10, None),
+    "cname_detected": (10, None),
+    "port_open": (20, None),
+    "http_service_detected": (30, "web_service"),
+    "api_endpoint_detected": (45, "api_exposed"),
+    "login_interface_detected": (55, "login_exposed"),
+    "admin_interface_detected": (75, "admin_exposed"),
+    "auth_missing": (85, "no_authentication"),
+}
+
+# Service name (as tagged by service discovery) -> (score, tag)
+SERVICE_RULES = {
+    "http": (30, "web_service"),
+    "https": (25, "web_service"),
+    "dns": (20, None),
+    "smtp": (25, "mail_service"),
+    "smtps": (20, "mail_service"),
+    "pop3": (35, "cleartext_mail"),
+    "imap": (35, "cleartext_mail"),
+    "pop3s": (20, "mail_service"),
+    "imaps": (20, "mail_service"),
+    "ssh": (30, "remote_access"),
+    "ftp": (50, "cleartext_file_transfer"),
+    "rdp": (70, "remote_access"),
+    "mysql": (70, "database_exposed"),
+    "postgres": (70, "database_exposed"),
+    "redis": (80, "database_exposed"),
+    "elasticsearch": (80, "database_exposed"),
+}
+
+HOST_TAGS = {"internet_exposed"}
+SERVICE_TAGS = {"public_service"}
+MINIMAL_SCORE = 10
+FINDING_BONUS = 5
+
+
+def rules_enabled() -> bool:
+    llm_cfg = load_easm_config().get("llm", {}) or {}
+    return bool(llm_cfg.get("rules", True))
+
+
+def _known_tags(asset: dict) -> Optional[str]:
+    """The service name for a service asset, "" for hosts; None if a tag is unexpected."""
+    tags = set(asset.get("risk_tags") or [])
+
+    if asset.get("asset_type") == "service":
+        names = {t for t in tags if t in SERVICE_RULES}
+        other = tags - names - SERVICE_TAGS
+        if len(names) != 1 or any(not t.startswith("scan_mode:") for t in other):
+            return None
+        return names.pop()
+
+    if asset.get("asset_type") in ("domain", "ip") and tags <= HOST_TAGS:
+        return ""
+    return None
+
+
+def pre_classify(asset: dict) -> Optional[dict]:
+    """Deterministic score for an unambiguous asset, else None."""
+    service = _known_tags(asset)
+    if service is None:
+        return None
+
+    evidence_types = {
+        e.type for e in EVIDENCE_STORE.get(asset.get("asset_id"), []) if e.is_active
+    }
+    if any(t not in EVIDENCE_RULES for t in evidence_types):
+        return None
+
+    findings = [EVIDENCE_RULES[t] for t in sorted(evidence_types)]
+    if service:
+        findings.append(SERVICE_RULES[service])
+    if not findings:
+        return {"risk_score": MINIMAL_SCORE, "risk_tags": ["minimal_exposure"]}
+
+    scores = sorted((score for score, _ in findings), reverse=True)
+    score = min(100, scores[0] + FINDING_BONUS * (len(scores) - 1))
+
+    tags = []
+    for _, tag in sorted(findings, key=lambda f: f[0], reverse=True):
+        if tag and tag not in tags:
+            tags.append(tag)
+    return {"risk_score": score, "risk_tags": tags}
@@ -1,23 +1,207 @@
+"""
+Ollama client.
+
+Requests go through one pooled keep-alive `AsyncHttpClient` on the shared
+scan event loop, so concurrent classification batches reuse connections
+instead of opening one per call. At most `llm.concurrency` requests are in
+flight per process (match it to how many requests the model server runs in
+parallel); the rest wait their turn. Connection errors, timeouts and
+429/5xx answers are retried `llm.retries` times with exponential backoff,
+all within the caller's timeout, which also covers waiting for a turn.
+
+The client is built on first use, so the app imports without `OLLAMA_URL`;
+a call without a configured server raises `LLMError`.
+"""
+
+import asyncio
+import json
 import os
-import requests
+from typing import Optional
+
+from app.core.async_runtime import run_sync
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.engines.discovery.async_http_engine import CAPTURE_ERRORS, AsyncHttpClient
+
+LLM_TIMEOUT = 120
+# One server, reused constantly: keep its connections warm for longer
+LLM_IDLE_TIMEOUT = 60.0
+DEFAULT_MODEL = "llama3"
+DEFAULT_CONCURRENCY = 2
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 1.0
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
 
-OLLAMA_URL = os.getenv("OLLAMA_URL")
 
-if not OLLAMA_URL:
-    raise RuntimeError("OLLAMA_URL environment variable is not set")
+class _RetryableLLMError(LLMError):
+    pass
 
-def call_llm(prompt: str, model: str = "llama3") -> dict:
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
+
+def get_llm_config() -> dict:
+    cfg = load_easm_config().get("llm", {}) or {}
+    return {
+        # The environment wins so deployments keep configuring it there
+        "url": (os.getenv("OLLAMA_URL") or cfg.get("url") or "").rstrip("/"),
+        "model": str(cfg.get("model", DEFAULT_MODEL)),
+        "concurrency": max(1, int(cfg.get("concurrency", DEFAULT_CONCURRENCY))),
+        "retries": max(0, int(cfg.get("retries", DEFAULT_RETRIES))),
+        "backoff": float(cfg.get("backoff", DEFAULT_BACKOFF)),
     }
 
-    response = requests.post(
-        f"{OLLAMA_URL}/api/generate",
-        json=payload,
-        timeout=120
+
+class OllamaClient:
+    def __init__(
+        self,
+        url: str,
+        model: str = DEFAULT_MODEL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF
+    ):
+        self.url = url
+        self.model = model
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+
+        # Per-call timeouts are enforced around each attempt; these only
+        # keep the HTTP client from giving up on a slow generation first
+        self.http = AsyncHttpClient(
+            max_connections=concurrency,
+            max_connections_per_host=concurrency,
+            timeout=LLM_TIMEOUT,
+            max_body_bytes=MAX_RESPONSE_BYTES,
+            read_deadline=LLM_TIMEOUT,
+            rate_limit=None,
+            idle_timeout=LLM_IDLE_TIMEOUT,
+            max_idle=concurrency,
+        )
+        # Created lazily so it binds to the scan event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+
+    async def _post(self, payload: dict, timeout: float) -> dict:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+
+        # Waiting for a slot spends the same budget as the request itself
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await asyncio.wait_for(self._slots.acquire(), timeout)
+        try:
+            self.requests += 1
+            response = await asyncio.wait_for(
+                self.http.request(
+                    "POST",
+                    f"{self.url}/api/generate",
+                    body=json.dumps(payload).encode(),
+                    headers={"Content-Type": "application/json"},
+                ),
+                deadline - loop.time()
+            )
+        finally:
+            self._slots.release()
+
+        if response.status_code in RETRY_STATUSES:
+            raise _RetryableLLMError(f"Ollama answered HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise LLMError(f"Ollama answered HTTP {response.status_code}")
+        if response.truncated_reason:
+            raise _RetryableLLMError(f"Ollama response cut short ({response.truncated_reason})")
+
+        try:
+            return json.loads(response.body)
+        except ValueError:
+            raise LLMError("Ollama returned a non-JSON body")
+
+    async def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        timeout: float = LLM_TIMEOUT,
+        format: Optional[str] = None
+    ) -> dict:
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": False
+        }
+        if format:
+            payload["format"] = format  # e.g. "json": constrain the model to valid JSON
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        for attempt in range(self.retries + 1):
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                return await self._post(payload, remaining)
+            except (_RetryableLLMError, *CAPTURE_ERRORS) as e:
+                delay = self.backoff * (2 ** attempt)
+                if attempt == self.retries or deadline - loop.time() <= delay:
+                    self.failures += 1
+                    raise LLMError(f"Ollama request failed after {attempt + 1} attempt(s): {e!r}") from e
+                self.retried += 1
+                await asyncio.sleep(delay)
+            except LLMError:
+                self.failures += 1
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "model": self.model,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failures": self.failures,
+            "connections_opened": self.http.connections_opened,
+        }
+
+
+def _build_llm_client(cfg: dict) -> OllamaClient:
+    if not cfg["url"]:
+        raise LLMError("OLLAMA_URL environment variable is not set")
+    return OllamaClient(
+        cfg["url"],
+        model=cfg["model"],
+        concurrency=cfg["concurrency"],
+        retries=cfg["retries"],
+        backoff=cfg["backoff"],
     )
-    response.raise_for_status()
 
-    return response.json()
+
+_CLIENT: ConfigBound[OllamaClient] = ConfigBound(get_llm_config, _build_llm_client)
+
+
+def get_llm_client() -> OllamaClient:
+    """Process-wide client, built on first use from `llm` config / `OLLAMA_URL` and rebuilt when they change."""
+    return _CLIENT.get()
+
+
+async def call_llm_async(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout: float = LLM_TIMEOUT,
+    format: Optional[str] = None
+) -> dict:
+    return await get_llm_client().generate(prompt, model=model, timeout=timeout, format=format)
+
+
+def call_llm(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout: float = LLM_TIMEOUT,
+    format: Optional[str] = None
+) -> dict:
+    """Blocking wrapper for callers outside the event loop."""
+    return run_sync(call_llm_async(prompt, model=model, timeout=timeout, format=format))
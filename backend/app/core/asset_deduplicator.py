@@ -1,22 +1,36 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 from app.models.asset import Asset
 
 
-def deduplicate_assets(assets: List[Asset]) -> List[Asset]:
+class AssetIndex:
     """
-    Deduplicate assets based on (asset_type, identifier).
-    Keeps the first occurrence.
+    Incremental (asset_type, identifier) dedup for streamed results.
+    The first occurrence wins; later duplicates only contribute hostnames.
     """
-    seen: set[Tuple[str, str]] = set()
-    deduped: List[Asset] = []
 
-    for asset in assets:
+    def __init__(self):
+        self._seen: Dict[Tuple[str, str], Asset] = {}
+
+    def add(self, asset: Asset) -> bool:
+        """Return True if `asset` is new, False if it merged into a kept one."""
         key = (asset.asset_type, asset.identifier)
+        kept = self._seen.get(key)
+
+        if kept is not None:
+            kept.hostnames += [h for h in asset.hostnames if h not in kept.hostnames]
+            return False
+
+        self._seen[key] = asset
+        return True
 
-        if key in seen:
-            continue
+    def get(self, asset_type: str, identifier: str) -> Optional[Asset]:
+        return self._seen.get((asset_type, identifier))
 
-        seen.add(key)
-        deduped.append(asset)
 
-    return deduped
+def deduplicate_assets(assets: List[Asset]) -> List[Asset]:
+    """
+    Deduplicate assets based on (asset_type, identifier).
+    Keeps the first occurrence, merging in hostnames from the duplicates.
+    """
+    index = AssetIndex()
+    return [asset for asset in assets if index.add(asset)]
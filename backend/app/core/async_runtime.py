@@ -0,0 +1,45 @@
+"""
+Shared asyncio runtime for discovery engines.
+
+Engines are called from synchronous code (FastAPI background tasks, the
+continuous scheduler), so instead of each call spinning up a private event
+loop, coroutines are submitted to one loop running on a daemon thread.
+Semaphores created on that loop therefore act as process-wide limits that
+hold across hosts and jobs.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared scan event loop, starting it on first use."""
+    global _LOOP
+
+    with _LOOP_LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever,
+                name="scan-event-loop",
+                daemon=True
+            )
+            thread.start()
+            _LOOP = loop
+
+    return _LOOP
+
+
+def submit(coro) -> Future:
+    """Schedule a coroutine on the shared loop from any thread."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the shared loop and block until it finishes."""
+    return submit(coro).result(timeout)
@@ -0,0 +1,307 @@
+"""
+Scan job broker for out-of-process workers.
+
+With `job_queue.backend: broker` the API only records jobs; separate
+worker processes (`python -m app.worker`) claim them from a broker and
+write job state back to it, so scans scale with the number of worker
+processes instead of living inside a uvicorn worker.
+
+The default backend is a SQLite file, which needs no external service and
+is safe across processes on one host: a claim is a `BEGIN IMMEDIATE`
+transaction, so each job is handed to exactly one worker. It runs in WAL
+mode, which relies on shared memory between the processes, so the file must
+not be shared over a network filesystem; the SQLite broker is single-host
+only. Workers on several machines need a networked backend, plugged in with
+`register_broker_backend()`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Optional, Type
+
+from app.models.scan_job import ScanJob
+from app.core.config_loader import load_easm_config
+from app.core.ct_cache import BACKEND_DIR
+
+DEFAULT_BROKER_BACKEND = "sqlite"
+DEFAULT_BROKER_PATH = "data/broker.db"
+DEFAULT_POLL_INTERVAL = 1.0
+
+FINISHED_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+
+
+def worker_process(worker_id: str) -> str:
+    """The process a `<host>-<pid>-<thread>` worker id belongs to."""
+    return worker_id.rsplit("-", 1)[0]
+
+
+def get_queue_backend() -> str:
+    """`local` (in-process worker pool) or `broker` (separate worker processes)."""
+    return str((load_easm_config().get("job_queue", {}) or {}).get("backend", "local"))
+
+
+class Broker(ABC):
+    """Interface every broker backend implements."""
+
+    @abstractmethod
+    def enqueue(self, job: ScanJob, rank: int, max_queued: Optional[int] = None) -> bool:
+        """Queue `job`; `rank` orders jobs (lower first). False if the queue is full."""
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[ScanJob]:
+        """Hand the next queued job to `worker_id`, or None if nothing is waiting."""
+
+    @abstractmethod
+    def update(self, job: ScanJob):
+        """Persist the job's current state (status, counters, error, ...)."""
+
+    @abstractmethod
+    def request_cancel(self, job_id: str):
+        """Cancel a queued job outright; flag a running one for its worker."""
+
+    @abstractmethod
+    def cancel_requested(self, job_id: str) -> bool:
+        """Whether a cancel was requested for the running job."""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str):
+        """Mark a running job as still being worked on."""
+
+    @abstractmethod
+    def requeue_stale(self, max_age: float) -> int:
+        """Re-queue running jobs without a heartbeat for `max_age` seconds."""
+
+    @abstractmethod
+    def scanning_processes(self, max_age: float) -> int:
+        """Worker processes running a job heartbeated within `max_age` seconds."""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[ScanJob]:
+        """Current state of the job, or None if the broker never saw it."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Queue depth and worker figures for `GET /scan/queue`."""
+
+
+class SQLiteBroker(Broker):
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS scan_jobs (
+                    job_id     TEXT PRIMARY KEY,
+                    rank       INTEGER NOT NULL,
+                    status     TEXT NOT NULL,
+                    worker_id  TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    payload    TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS scan_jobs_waiting ON scan_jobs (status, rank)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit mode; transactions are opened explicitly where needed
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, job: ScanJob, rank: int, max_queued: Optional[int] = None) -> bool:
+        job.status = "QUEUED"
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if max_queued is not None:
+                (waiting,) = conn.execute(
+                    "SELECT COUNT(*) FROM scan_jobs WHERE status = 'QUEUED'"
+                ).fetchone()
+                if waiting >= max_queued:
+                    conn.execute("ROLLBACK")
+                    return False
+
+            conn.execute(
+                "INSERT OR REPLACE INTO scan_jobs (job_id, rank, status, payload, updated_at) "
+                "VALUES (?, ?, 'QUEUED', ?, ?)",
+                (job.job_id, rank, job.json(), time.time())
+            )
+            conn.execute("COMMIT")
+
+        job.queue_position = self._position(job.job_id)
+        return True
+
+    def claim(self, worker_id: str) -> Optional[ScanJob]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT job_id, payload FROM scan_jobs WHERE status = 'QUEUED' "
+                "ORDER BY rank, rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            job = ScanJob(**json.loads(row[1]))
+            job.status = "RUNNING"
+            job.queue_position = None
+            conn.execute(
+                "UPDATE scan_jobs SET status = 'RUNNING', worker_id = ?, payload = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (worker_id, job.json(), time.time(), job.job_id)
+            )
+            conn.execute("COMMIT")
+
+        return job
+
+    def update(self, job: ScanJob):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE scan_jobs SET status = ?, payload = ?, updated_at = ? WHERE job_id = ?",
+                (job.status, job.json(), time.time(), job.job_id)
+            )
+
+    def request_cancel(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE scan_jobs SET status = 'CANCELLED', updated_at = ? "
+                "WHERE job_id = ? AND status = 'QUEUED'",
+                (time.time(), job_id)
+            )
+            conn.execute(
+                "UPDATE scan_jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'RUNNING'",
+                (job_id,)
+            )
+            conn.execute("COMMIT")
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cancel_requested FROM scan_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def heartbeat(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE scan_jobs SET updated_at = ? WHERE job_id = ?", (time.time(), job_id)
+            )
+
+    def requeue_stale(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE scan_jobs SET status = 'CANCELLED', updated_at = ? "
+                "WHERE status = 'RUNNING' AND updated_at < ? AND cancel_requested = 1",
+                (time.time(), cutoff)
+            )
+            requeued = conn.execute(
+                "UPDATE scan_jobs SET status = 'QUEUED', worker_id = NULL, updated_at = ? "
+                "WHERE status = 'RUNNING' AND updated_at < ?",
+                (time.time(), cutoff)
+            ).rowcount
+            conn.execute("COMMIT")
+        return requeued
+
+    def scanning_processes(self, max_age: float) -> int:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT worker_id FROM scan_jobs "
+                "WHERE status = 'RUNNING' AND worker_id IS NOT NULL AND updated_at >= ?",
+                (time.time() - max_age,)
+            ).fetchall()
+        return len({worker_process(row[0]) for row in rows})
+
+    def _position(self, job_id: str) -> Optional[int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) FROM scan_jobs AS ahead, scan_jobs AS me
+                WHERE me.job_id = ? AND me.status = 'QUEUED' AND ahead.status = 'QUEUED'
+                  AND (ahead.rank < me.rank OR (ahead.rank = me.rank AND ahead.rowid <= me.rowid))
+                """,
+                (job_id,)
+            ).fetchone()
+        return row[0] or None
+
+    def get_job(self, job_id: str) -> Optional[ScanJob]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, payload FROM scan_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = ScanJob(**json.loads(row[1]))
+        job.status = row[0]
+        job.queue_position = self._position(job_id) if row[0] == "QUEUED" else None
+        return job
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            by_status = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM scan_jobs GROUP BY status"
+            ).fetchall())
+            workers = conn.execute(
+                "SELECT COUNT(DISTINCT worker_id) FROM scan_jobs WHERE status = 'RUNNING'"
+            ).fetchone()[0]
+
+        return {
+            "backend": "broker",
+            "queued": by_status.get("QUEUED", 0),
+            "running": by_status.get("RUNNING", 0),
+            "busy_workers": workers,
+            "jobs_by_status": by_status,
+        }
+
+
+BROKER_BACKENDS: Dict[str, Type[Broker]] = {
+    "sqlite": SQLiteBroker,
+}
+
+
+def register_broker_backend(name: str, backend: Type[Broker]):
+    BROKER_BACKENDS[name] = backend
+
+
+_BROKER: Optional[Broker] = None
+_BROKER_LOCK = threading.Lock()
+
+
+def get_broker_config() -> dict:
+    cfg = load_easm_config().get("broker", {}) or {}
+    return {
+        "backend": str(cfg.get("backend", DEFAULT_BROKER_BACKEND)),
+        "path": str(BACKEND_DIR / cfg.get("path", DEFAULT_BROKER_PATH)),
+        "poll_interval": float(cfg.get("poll_interval", DEFAULT_POLL_INTERVAL)),
+    }
+
+
+def get_broker() -> Broker:
+    global _BROKER
+
+    with _BROKER_LOCK:
+        if _BROKER is None:
+            cfg = get_broker_config()
+            backend = BROKER_BACKENDS.get(cfg["backend"])
+            if backend is None:
+                raise RuntimeError(f"Unknown broker backend: {cfg['backend']}")
+            _BROKER = backend(cfg["path"])
+
+    return _BROKER
@@ -0,0 +1,125 @@
+"""
+Scan deadlines and cooperative cancellation.
+
+Every running scan owns a `CancelToken`. It trips when the job's time
+budget (`deadlines.job`) runs out or when the scan is cancelled through
+`DELETE /scan/{job_id}`. Pipeline stages get child tokens bounded by their
+own budget (`deadlines.stages`), and discovery engines check the token they
+are handed between units of work (certificates, hosts, ports, requests).
+Nothing is interrupted mid-operation: work already done is kept and the job
+is marked incomplete.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config_loader import load_easm_config
+
+DEFAULT_JOB_BUDGET = 3600
+DEFAULT_LLM_TIMEOUT = 120
+
+REASON_CANCELLED = "cancelled"
+REASON_DEADLINE = "deadline_exceeded"
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag with an optional monotonic deadline.
+    A child token trips with its parent, or on its own (earlier) deadline.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[float] = None,
+        parent: Optional["CancelToken"] = None
+    ):
+        self.parent = parent
+        self.deadline = time.monotonic() + budget if budget else None
+        if parent is not None and parent.deadline is not None:
+            self.deadline = min(self.deadline or parent.deadline, parent.deadline)
+
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = REASON_CANCELLED):
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._event.is_set():
+            return self._reason
+        if self.parent is not None and self.parent.cancelled:
+            return self.parent.reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return REASON_DEADLINE
+        return None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None = unbounded, 0 once tripped)."""
+        if self.cancelled:
+            return 0.0
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, default: float) -> float:
+        """`default`, shortened to what is left of the budget."""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    def child(self, budget: Optional[float] = None) -> "CancelToken":
+        return CancelToken(budget, parent=self)
+
+
+def get_deadline_config() -> dict:
+    cfg = load_easm_config().get("deadlines", {}) or {}
+    return {
+        "job": float(cfg.get("job", DEFAULT_JOB_BUDGET) or 0),
+        "stages": {
+            name: float(budget)
+            for name, budget in (cfg.get("stages") or {}).items()
+            if budget
+        },
+        "llm": float(cfg.get("llm", DEFAULT_LLM_TIMEOUT)),
+    }
+
+
+# -------------------------------------------------
+# Running jobs
+# -------------------------------------------------
+_TOKENS: Dict[str, CancelToken] = {}
+_TOKENS_LOCK = threading.Lock()
+
+
+def start_job_token(job_id: str) -> CancelToken:
+    """Create the token for a starting scan, bounded by `deadlines.job`."""
+    token = CancelToken(get_deadline_config()["job"] or None)
+    with _TOKENS_LOCK:
+        _TOKENS[job_id] = token
+    return token
+
+
+def release_job_token(job_id: str):
+    with _TOKENS_LOCK:
+        _TOKENS.pop(job_id, None)
+
+
+def get_cancel_token(job_id: str) -> Optional[CancelToken]:
+    with _TOKENS_LOCK:
+        return _TOKENS.get(job_id)
+
+
+def cancel_running_scan(job_id: str) -> bool:
+    """Trip the token of a scan running in this process."""
+    token = get_cancel_token(job_id)
+    if token is None:
+        return False
+    token.cancel(REASON_CANCELLED)
+    return True
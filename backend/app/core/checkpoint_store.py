@@ -0,0 +1,210 @@
+"""
+Durable scan checkpoints.
+
+A scan's finished work units are written to a local SQLite file so a
+restarted process can pick the job up where it stopped instead of starting
+over:
+
+    dns    hostname → resolver answer
+    ports  (ip, port-plan chunk) → open services and their evidence
+    http   URL → evidence recorded by the HTTP and AI analyzers
+
+Writes are buffered and flushed every `checkpoints.flush_interval` seconds
+(and when the scan ends), so checkpointing costs one transaction per
+interval rather than one per unit. Only complete units are recorded: a port
+chunk cut short by cancellation is scanned again.
+
+With the local queue, queued and running jobs are recorded here too and
+`resume_interrupted_scans()` re-queues them at startup. With the broker,
+the broker already holds the jobs; workers requeue jobs whose worker
+stopped sending heartbeats.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.models.asset import Asset
+from app.models.evidence import Evidence
+from app.models.scan_job import ScanJob
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.core.ct_cache import BACKEND_DIR
+from app.core.evidence_store import EVIDENCE_STORE, add_evidence
+
+DEFAULT_CHECKPOINT_PATH = "data/checkpoints.db"
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_PORT_CHUNK_SIZE = 4096
+DEFAULT_STALE_AFTER = 120
+
+
+def get_checkpoint_config() -> dict:
+    cfg = load_easm_config().get("checkpoints", {}) or {}
+    return {
+        "enabled": bool(cfg.get("enabled", True)),
+        "path": str(BACKEND_DIR / cfg.get("path", DEFAULT_CHECKPOINT_PATH)),
+        "flush_interval": float(cfg.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+        "port_chunk_size": int(cfg.get("port_chunk_size", DEFAULT_PORT_CHUNK_SIZE)),
+        "stale_after": float(cfg.get("stale_after", DEFAULT_STALE_AFTER)),
+    }
+
+
+# -------------------------------------------------
+# Unit payloads
+# -------------------------------------------------
+def pack_assets(assets: List[Asset]) -> dict:
+    """Assets plus the evidence recorded for them, ready to checkpoint."""
+    return {
+        "assets": [json.loads(a.json()) for a in assets],
+        "evidence": [
+            json.loads(e.json())
+            for a in assets
+            for e in EVIDENCE_STORE.get(a.asset_id, [])
+        ],
+    }
+
+
+def unpack_assets(payload: dict) -> List[Asset]:
+    """Restore checkpointed assets and put their evidence back in the store."""
+    for item in payload.get("evidence", []):
+        add_evidence(Evidence(**item))
+    return [Asset(**a) for a in payload.get("assets", [])]
+
+
+def pack_evidence(asset_id: str) -> dict:
+    return {"evidence": [json.loads(e.json()) for e in EVIDENCE_STORE.get(asset_id, [])]}
+
+
+def unpack_evidence(payload: dict, asset_id: str):
+    """Re-record checkpointed evidence against `asset_id` (ids change across restarts)."""
+    for item in payload.get("evidence", []):
+        add_evidence(Evidence(**{**item, "asset_id": asset_id}))
+
+
+class SQLiteCheckpointStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_jobs ("
+                " job_id TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_units ("
+                " job_id TEXT NOT NULL, kind TEXT NOT NULL, unit_key TEXT NOT NULL,"
+                " payload TEXT NOT NULL, PRIMARY KEY (job_id, kind, unit_key))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -------------------------------------------------
+    # Jobs (local queue)
+    # -------------------------------------------------
+    def save_job(self, job: ScanJob):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoint_jobs (job_id, payload, updated_at) VALUES (?, ?, ?)",
+                (job.job_id, job.json(), time.time())
+            )
+
+    def unfinished_jobs(self) -> List[ScanJob]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT payload FROM checkpoint_jobs ORDER BY updated_at"
+            ).fetchall()
+        return [ScanJob(**json.loads(r[0])) for r in rows]
+
+    def finish_job(self, job_id: str):
+        """Forget a job that completed, failed or was cancelled, and its units."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoint_jobs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM checkpoint_units WHERE job_id = ?", (job_id,))
+
+    # -------------------------------------------------
+    # Work units
+    # -------------------------------------------------
+    def load_units(self, job_id: str) -> Dict[Tuple[str, str], dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT kind, unit_key, payload FROM checkpoint_units WHERE job_id = ?",
+                (job_id,)
+            ).fetchall()
+        return {(kind, key): json.loads(payload) for kind, key, payload in rows}
+
+    def save_units(self, job_id: str, units: Dict[Tuple[str, str], dict]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_units (job_id, kind, unit_key, payload) "
+                "VALUES (?, ?, ?, ?)",
+                [(job_id, kind, key, json.dumps(payload, default=str))
+                 for (kind, key), payload in units.items()]
+            )
+
+
+class JobCheckpoint:
+    """One job's view of the store: restored units plus a buffered writer."""
+
+    def __init__(
+        self,
+        store: SQLiteCheckpointStore,
+        job_id: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.store = store
+        self.job_id = job_id
+        self.flush_interval = flush_interval
+
+        self.restored = store.load_units(job_id)
+        self._pending: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        return self.restored.get((kind, key))
+
+    def save(self, kind: str, key: str, payload: dict):
+        with self._lock:
+            self._pending[(kind, key)] = payload
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if pending:
+            self.store.save_units(self.job_id, pending)
+
+
+# Reopened when `checkpoints.path` changes; the other settings are read per job
+_STORE: ConfigBound[SQLiteCheckpointStore] = ConfigBound(
+    lambda: get_checkpoint_config()["path"], SQLiteCheckpointStore
+)
+
+
+def get_checkpoint_store() -> Optional[SQLiteCheckpointStore]:
+    """Process-wide store, or None when `checkpoints.enabled` is false."""
+    if not get_checkpoint_config()["enabled"]:
+        return None
+    return _STORE.get()
+
+
+def open_job_checkpoint(job_id: str) -> Optional[JobCheckpoint]:
+    store = get_checkpoint_store()
+    if store is None:
+        return None
+    return JobCheckpoint(store, job_id, get_checkpoint_config()["flush_interval"])
@@ -0,0 +1,205 @@
+"""
+Content-addressed cache for LLM risk classifications.
+
+Continuous EASM re-discovers mostly unchanged assets every interval, and
+each one used to cost a model call. A classification is now stored under a
+SHA-256 of what the model is actually judging:
+
+    asset_type, identifier, sorted risk_tags, sorted active evidence types
+
+Asset ids are left out on purpose, since every scan mints new ones.
+
+Two tiers:
+
+    memory  LRU of `classification_cache.max_entries` results
+    disk    optional SQLite file (`classification_cache.disk`), shared by
+            the API and worker processes and kept across restarts
+
+Entries expire `classification_cache.ttl` seconds after they were stored,
+so scores are refreshed now and then even for assets that never change.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.core.ct_cache import BACKEND_DIR
+from app.core.evidence_store import EVIDENCE_STORE
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL = 86400
+DEFAULT_CACHE_PATH = "data/classification_cache.db"
+
+
+def get_classification_cache_config() -> dict:
+    cfg = load_easm_config().get("classification_cache", {}) or {}
+    return {
+        "enabled": bool(cfg.get("enabled", True)),
+        "max_entries": int(cfg.get("max_entries", DEFAULT_MAX_ENTRIES)),
+        "ttl": float(cfg.get("ttl", DEFAULT_TTL)),
+        "disk": bool(cfg.get("disk", True)),
+        "path": str(BACKEND_DIR / cfg.get("path", DEFAULT_CACHE_PATH)),
+    }
+
+
+def classification_key(asset: dict) -> str:
+    """Stable hash of the asset fields that influence its classification."""
+    evidence_types = sorted({
+        e.type for e in EVIDENCE_STORE.get(asset.get("asset_id"), []) if e.is_active
+    })
+    material = {
+        "asset_type": asset.get("asset_type"),
+        "identifier": asset.get("identifier"),
+        "risk_tags": sorted(asset.get("risk_tags") or []),
+        "evidence_types": evidence_types,
+    }
+    encoded = json.dumps(material, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class SQLiteClassificationStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                " cache_key TEXT PRIMARY KEY, result TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Tuple[dict, float]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, stored_at FROM classifications WHERE cache_key = ?", (key,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: str, result: dict, stored_at: float):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO classifications (cache_key, result, stored_at) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(result), stored_at)
+            )
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM classifications WHERE cache_key = ?", (key,))
+
+
+class ClassificationCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        store: Optional[SQLiteClassificationStore] = None
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.store = store
+
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl <= 0 or time.time() - stored_at < self.ttl
+
+    def _remember(self, key: str, result: dict, stored_at: float):
+        # Caller holds the lock
+        self._entries[key] = (result, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[1]):
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return dict(entry[0])
+                del self._entries[key]
+                self.expired += 1
+
+        entry = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if entry is not None and self._fresh(entry[1]):
+                self._remember(key, entry[0], entry[1])
+                self.disk_hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                self.expired += 1
+            self.misses += 1
+
+        if entry is not None and self.store is not None:
+            self.store.delete(key)
+        return None
+
+    def put(self, key: str, result: dict):
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, dict(result), stored_at)
+        if self.store is not None:
+            self.store.put(key, result, stored_at)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "disk": self.store is not None,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+            }
+
+
+def _build_classification_cache(cfg: dict) -> ClassificationCache:
+    store = SQLiteClassificationStore(cfg["path"]) if cfg["disk"] else None
+    return ClassificationCache(cfg["max_entries"], cfg["ttl"], store)
+
+
+# Rebuilt when its settings change; `enabled` alone only switches it off
+_CACHE: ConfigBound[ClassificationCache] = ConfigBound(
+    lambda: {k: v for k, v in get_classification_cache_config().items() if k != "enabled"},
+    _build_classification_cache
+)
+
+
+def get_classification_cache() -> Optional[ClassificationCache]:
+    """Process-wide cache, or None when `classification_cache.enabled` is false."""
+    if not get_classification_cache_config()["enabled"]:
+        return None
+    return _CACHE.get()
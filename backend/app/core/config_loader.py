@@ -1,12 +1,331 @@
+"""
+EASM config service.
+
+`easm.yaml` is parsed and validated once, then served from memory. The
+file is re-stat'ed at most every CONFIG_CHECK_INTERVAL seconds and only
+re-parsed when its mtime or size changes, so hot paths can call
+`load_easm_config()` freely. Edits are picked up without a restart; an
+edit that fails validation is logged and the last good config stays
+active. The returned dict is shared — treat it as read-only.
+
+Process-wide objects built from config (port scanner, resolver, HTTP and
+LLM clients, classification cache, checkpoint store) are held in a
+`ConfigBound` and rebuilt when a reload changes their settings; the rate
+limiter, the local job queue and the scheduler are reconfigured in place.
+Scans already running keep the objects they started with. Only these
+settings need a restart: `broker` (backend, path; it also holds the shared
+result store), `job_queue.backend` and `scheduler.store_path`.
+"""
+
+import os
+import threading
+import time
 import yaml
 from pathlib import Path
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from app.core.logger import logger
 
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "easm.yaml"
 
+CONFIG_CHECK_INTERVAL = 1.0  # seconds between mtime checks
+
+PORT_SCAN_MODES = ("curated", "extended", "full")
+
+NUMBER = (int, float)
+
+# Known sections and the types of their keys. Sections and keys not listed
+# here are accepted as-is.
+CONFIG_SCHEMA = {
+    "port_scan": {
+        "mode": str,
+        "max_concurrency": int,
+        "curated_ports": (list, dict),
+        "extended_ports": dict,
+        "full_scan": dict,
+        "adaptive": dict,
+    },
+    "host_scan": {
+        "max_parallel_hosts": int,
+    },
+    "network_scan": {
+        "max_hosts": int,
+    },
+    "dns": {
+        "nameservers": list,
+        "port": int,
+        "timeout": NUMBER,
+        "attempts": int,
+        "max_concurrency": int,
+        "negative_ttl": int,
+        "fallback_ttl": int,
+        "max_ttl": int,
+    },
+    "ct_cache": {
+        "enabled": bool,
+        "directory": str,
+        "refresh_minutes": NUMBER,
+        "timeout_with_cache": NUMBER,
+    },
+    "http_probe": {
+        "max_body_bytes": int,
+        "read_deadline": NUMBER,
+        "timeout": NUMBER,
+        "max_connections": int,
+        "max_connections_per_host": int,
+        "idle_timeout": NUMBER,
+        "max_idle_connections": int,
+        "verify_tls": bool,
+    },
+    "job_queue": {
+        "workers": int,
+        "max_queued": int,
+        "on_full": str,
+        "backend": str,
+    },
+    "broker": {
+        "backend": str,
+        "path": str,
+        "poll_interval": NUMBER,
+    },
+    "scheduler": {
+        "store_path": str,
+        "max_concurrent_scans": int,
+        "jitter": NUMBER,
+    },
+    "pipeline": {
+        "queue_size": int,
+        "stages": dict,
+    },
+    "events": {
+        "history": int,
+        "progress_interval": NUMBER,
+        "max_finished_jobs": int,
+    },
+    "rate_limits": {
+        "enabled": bool,
+        "burst_seconds": NUMBER,
+        "port_scan": dict,
+        "http": dict,
+    },
+    "checkpoints": {
+        "enabled": bool,
+        "path": str,
+        "flush_interval": NUMBER,
+        "port_chunk_size": int,
+        "stale_after": NUMBER,
+    },
+    "deadlines": {
+        "job": NUMBER,
+        "llm": NUMBER,
+        "stages": dict,
+    },
+    "llm": {
+        "url": str,
+        "model": str,
+        "batch_size": int,
+        "rules": bool,
+        "concurrency": int,
+        "retries": int,
+        "backoff": NUMBER,
+    },
+    "classification_cache": {
+        "enabled": bool,
+        "max_entries": int,
+        "ttl": NUMBER,
+        "disk": bool,
+        "path": str,
+    },
+}
+
+REQUIRED_SECTIONS = ("port_scan",)
+
+_STATE = {
+    "config": None,
+    "path": None,
+    "signature": None,
+    "checked_at": 0.0,
+    "version": 0,
+}
+_LOCK = threading.Lock()
+
+
+# -------------------------------------------------
+# Validation
+# -------------------------------------------------
+def _type_ok(value, expected) -> bool:
+    expected = expected if isinstance(expected, tuple) else (expected,)
+    # bool is an int subclass; only accept it where bool is expected
+    if isinstance(value, bool) and bool not in expected:
+        return False
+    return isinstance(value, expected)
+
+
+def _validate_port(value, where: str):
+    if _type_ok(value, int) and 1 <= value <= 65535:
+        return
+    try:
+        if 1 <= int(value) <= 65535:
+            return
+    except (TypeError, ValueError):
+        pass
+    raise RuntimeError(f"Invalid EASM config: {where} has invalid port {value!r}")
+
+
+def _validate_port_scan(port_cfg: dict):
+    mode = port_cfg.get("mode", "curated")
+    if mode not in PORT_SCAN_MODES:
+        raise RuntimeError(
+            f"Invalid EASM config: port_scan.mode must be one of {PORT_SCAN_MODES}, got {mode!r}"
+        )
+
+    for port in port_cfg.get("curated_ports") or []:
+        _validate_port(port, "port_scan.curated_ports")
+
+    range_str = (port_cfg.get("extended_ports") or {}).get("range", "1-1024")
+    try:
+        start, end = (int(p) for p in str(range_str).split("-"))
+    except ValueError:
+        raise RuntimeError(f"Invalid EASM config: port_scan.extended_ports.range {range_str!r}")
+    _validate_port(start, "port_scan.extended_ports.range")
+    _validate_port(end, "port_scan.extended_ports.range")
+    if end < start:
+        raise RuntimeError(f"Invalid EASM config: port_scan.extended_ports.range {range_str!r}")
+
+
+def validate_easm_config(config) -> dict:
+    """Check `config` against CONFIG_SCHEMA, raising RuntimeError on the first problem."""
+    if not isinstance(config, dict):
+        raise RuntimeError("Invalid EASM config: top level must be a mapping")
+
+    for section in REQUIRED_SECTIONS:
+        if section not in config:
+            raise RuntimeError(f"Invalid EASM config: missing section '{section}'")
+
+    for section, keys in CONFIG_SCHEMA.items():
+        section_cfg = config.get(section)
+        if section_cfg is None:
+            continue
+        if not isinstance(section_cfg, dict):
+            raise RuntimeError(f"Invalid EASM config: '{section}' must be a mapping")
+
+        for key, expected in keys.items():
+            if key in section_cfg and not _type_ok(section_cfg[key], expected):
+                raise RuntimeError(
+                    f"Invalid EASM config: {section}.{key} has invalid value {section_cfg[key]!r}"
+                )
+
+    _validate_port_scan(config["port_scan"])
+    return config
+
+
+# -------------------------------------------------
+# Cached loading
+# -------------------------------------------------
+def _read_config(path: Path) -> dict:
+    with open(path, "r") as f:
+        return validate_easm_config(yaml.safe_load(f))
+
 
 def load_easm_config() -> dict:
-    if not CONFIG_PATH.exists():
-        raise RuntimeError("EASM config file missing")
+    path = CONFIG_PATH
+    now = time.monotonic()
+
+    with _LOCK:
+        cached = _STATE["config"]
+        if (
+            cached is not None
+            and _STATE["path"] == path
+            and now - _STATE["checked_at"] < CONFIG_CHECK_INTERVAL
+        ):
+            return cached
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if cached is not None and _STATE["path"] == path:
+                logger.error(f"EASM config {path} disappeared — keeping last loaded config")
+                _STATE["checked_at"] = now
+                return cached
+            raise RuntimeError("EASM config file missing")
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        _STATE["checked_at"] = now
+
+        if cached is not None and _STATE["path"] == path and _STATE["signature"] == signature:
+            return cached
+
+        try:
+            config = _read_config(path)
+        except (RuntimeError, yaml.YAMLError) as e:
+            if cached is None or _STATE["path"] != path:
+                raise RuntimeError(str(e))
+            logger.error(f"EASM config reload rejected — keeping last good config | error={e}")
+            _STATE["signature"] = signature
+            return cached
+
+        _STATE.update(config=config, path=path, signature=signature)
+        _STATE["version"] += 1
+        if cached is not None:
+            logger.info(f"EASM config reloaded | version={_STATE['version']}")
+
+        return config
+
+
+def get_config_version() -> int:
+    """Increments on every successful (re)load; use it to key derived caches."""
+    load_easm_config()
+    return _STATE["version"]
+
+
+def reset_config_cache():
+    """Drop the cached config so the next call re-reads the file."""
+    with _LOCK:
+        _STATE.update(config=None, path=None, signature=None, checked_at=0.0)
+
+
+# -------------------------------------------------
+# Objects built from config
+# -------------------------------------------------
+T = TypeVar("T")
+
+
+class ConfigBound(Generic[T]):
+    """
+    A process-wide object built from the settings `settings()` reads out of
+    easm.yaml. `get()` builds it on first use and, after a reload that
+    changed those settings, either rebuilds it or hands the new settings to
+    `refresh(obj, settings)` to apply in place.
+    """
+
+    def __init__(
+        self,
+        settings: Callable[[], Any],
+        build: Callable[[Any], T],
+        refresh: Optional[Callable[[T, Any], None]] = None
+    ):
+        self._settings = settings
+        self._build = build
+        self._refresh = refresh
+        self._value: Optional[T] = None
+        self._built_from: Any = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        version = get_config_version()
+
+        with self._lock:
+            if self._value is not None and self._version == version:
+                return self._value
+
+            settings = self._settings()
+            if self._value is None or self._refresh is None:
+                if self._value is None or settings != self._built_from:
+                    self._value = self._build(settings)
+            elif settings != self._built_from:
+                self._refresh(self._value, settings)
 
-    with open(CONFIG_PATH, "r") as f:
-        return yaml.safe_load(f)
+            self._built_from = settings
+            self._version = version
+            return self._value
@@ -0,0 +1,105 @@
+"""
+On-disk Certificate Transparency cache.
+
+One JSON file per root domain records every subdomain seen in CT logs
+together with the last certificate ID and timestamp that named it, plus the
+highest certificate ID merged so far. Subdomain discovery uses it to skip
+crt.sh entirely inside the refresh window, to merge only certificates newer
+than the cached high-water mark, and to keep serving results when crt.sh is
+slow or down.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.core.config_loader import load_easm_config
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+DEFAULT_CT_CACHE_DIR = "data/ct_cache"
+DEFAULT_REFRESH_MINUTES = 360
+DEFAULT_TIMEOUT_WITH_CACHE = 10
+
+_WRITE_LOCK = threading.Lock()
+
+
+def get_ct_cache_config() -> dict:
+    cfg = load_easm_config().get("ct_cache", {}) or {}
+    return {
+        "enabled": bool(cfg.get("enabled", True)),
+        "directory": BACKEND_DIR / cfg.get("directory", DEFAULT_CT_CACHE_DIR),
+        "refresh_minutes": float(cfg.get("refresh_minutes", DEFAULT_REFRESH_MINUTES)),
+        "timeout_with_cache": float(cfg.get("timeout_with_cache", DEFAULT_TIMEOUT_WITH_CACHE)),
+    }
+
+
+def _cache_path(domain: str) -> Path:
+    safe_name = re.sub(r"[^a-z0-9.-]", "_", domain.lower())
+    return get_ct_cache_config()["directory"] / f"{safe_name}.json"
+
+
+def new_ct_cache_entry(domain: str) -> dict:
+    return {
+        "domain": domain,
+        "max_cert_id": 0,
+        "fetched_at": None,
+        "subdomains": {},
+    }
+
+
+def load_ct_cache(domain: str) -> Optional[dict]:
+    path = _cache_path(domain)
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Corrupt cache is treated as a cold start
+        return None
+
+
+def save_ct_cache(entry: dict):
+    """Atomically replace the cache file for entry["domain"]."""
+    path = _cache_path(entry["domain"])
+
+    with _WRITE_LOCK:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+def is_ct_cache_fresh(entry: dict, refresh_minutes: float) -> bool:
+    if not entry.get("fetched_at"):
+        return False
+    fetched_at = datetime.fromisoformat(entry["fetched_at"])
+    age_minutes = (datetime.utcnow() - fetched_at).total_seconds() / 60
+    return age_minutes < refresh_minutes
+
+
+def record_certificate(entry: dict, subdomain: str, cert_id: int, timestamp: Optional[str]) -> bool:
+    """
+    Merge one certificate sighting. Returns True if the subdomain is new.
+    """
+    seen = entry["subdomains"].get(subdomain)
+
+    if seen is None:
+        entry["subdomains"][subdomain] = {
+            "last_cert_id": cert_id,
+            "last_seen": timestamp,
+        }
+        return True
+
+    if cert_id > seen["last_cert_id"]:
+        seen["last_cert_id"] = cert_id
+        seen["last_seen"] = timestamp
+
+    return False
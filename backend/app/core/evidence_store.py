@@ -1,10 +1,18 @@
 from typing import Dict, List
 from app.models.evidence import Evidence
 from datetime import datetime, timedelta
+from app.core.broker import get_queue_backend
+from app.core.scan_events import CURRENT_SCAN_JOB, publish_scan_event
+from app.core.shared_store import get_result_store
 
 EVIDENCE_STORE: Dict[str, List[Evidence]] = {}
 
 def add_evidence(evidence: Evidence):
+    # Attribute evidence to the scan whose pipeline recorded it
+    job_id = CURRENT_SCAN_JOB.get()
+    if evidence.scan_job_id is None:
+        evidence.scan_job_id = job_id
+
     evs = EVIDENCE_STORE.setdefault(evidence.asset_id, [])
 
     for e in evs:
@@ -19,10 +27,17 @@ def add_evidence(evidence: Evidence):
             return
 
     evs.append(evidence)
+    publish_scan_event(job_id, "evidence", evidence.dict())
 
 def get_evidence_for_asset(asset_id: str) -> List[Evidence]:
     return EVIDENCE_STORE.get(asset_id, [])
 
+def lookup_evidence() -> Dict[str, List[Evidence]]:
+    """Evidence by asset id, including what broker workers wrote to the shared store."""
+    if get_queue_backend() == "broker":
+        return {**get_result_store().load_evidence(), **EVIDENCE_STORE}
+    return EVIDENCE_STORE
+
 def get_evidence_by_type(asset_id: str, evidence_type: str) -> List[Evidence]:
     return [
         e for e in EVIDENCE_STORE.get(asset_id, [])
@@ -0,0 +1,316 @@
+"""
+Scan job queue.
+
+Scans are executed by a fixed pool of worker threads instead of FastAPI
+BackgroundTasks, so the number of scans competing for sockets is bounded
+by `job_queue.workers`. Waiting jobs sit in a priority heap (high → normal
+→ low, FIFO within a level) holding at most `job_queue.max_queued`
+entries. Once it is full, new submissions are either rejected (`QueueFull`,
+HTTP 429 at the API) or deferred into an overflow line that is admitted as
+space frees up, depending on `job_queue.on_full`.
+
+Every queued job's `status` and `queue_position` are kept current, so
+`GET /scan/{job_id}` shows where a job actually is.
+
+With `job_queue.backend: broker`, `submit_scan` hands jobs to the broker
+instead and separate worker processes run them (see `app/worker.py`).
+"""
+
+import heapq
+import itertools
+import threading
+from collections import Counter, deque
+from typing import Optional
+
+from app.models.scan_job import ScanJob
+from app.core.broker import FINISHED_STATUSES, get_broker, get_queue_backend
+from app.core.cancellation import cancel_running_scan
+from app.core.checkpoint_store import get_checkpoint_store
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.core.logger import logger
+from app.core.scan_orchestrator import run_scan
+from app.core.scan_store import SCAN_JOBS
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 100
+DEFAULT_ON_FULL = "reject"
+ON_FULL_POLICIES = ("reject", "defer")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ScanJobQueue:
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        on_full: str = DEFAULT_ON_FULL
+    ):
+        if on_full not in ON_FULL_POLICIES:
+            raise ValueError(f"Invalid job_queue.on_full policy: {on_full}")
+
+        self.workers = workers
+        self.max_queued = max_queued
+        self.on_full = on_full
+
+        self._heap = []                 # (priority, seq, job_id, target)
+        self._deferred = deque()        # same tuples, FIFO overflow
+        self._running = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+    # -------------------------------------------------
+    # Submission
+    # -------------------------------------------------
+    def submit(self, job: ScanJob, priority: str = "normal") -> ScanJob:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Invalid priority '{priority}' (expected one of {list(PRIORITIES)})")
+
+        entry = (PRIORITIES[priority], next(self._seq), job.job_id, job.target)
+        job.priority = priority
+
+        with self._cond:
+            if len(self._heap) < self.max_queued:
+                heapq.heappush(self._heap, entry)
+                job.status = "QUEUED"
+            elif self.on_full == "defer":
+                self._deferred.append(entry)
+                job.status = "DEFERRED"
+            else:
+                raise QueueFull(
+                    f"Scan queue is full ({self.max_queued} jobs waiting)"
+                )
+
+            self._update_positions()
+            self._ensure_workers()
+            self._cond.notify()
+
+        logger.info(
+            f"Scan queued | job_id={job.job_id} priority={priority} "
+            f"status={job.status} position={job.queue_position}"
+        )
+        return job
+
+    def configure(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        on_full: str = DEFAULT_ON_FULL
+    ):
+        """Apply new `job_queue` settings; surplus workers retire after their current scan."""
+        if on_full not in ON_FULL_POLICIES:
+            raise ValueError(f"Invalid job_queue.on_full policy: {on_full}")
+
+        with self._cond:
+            self.workers = workers
+            self.max_queued = max_queued
+            self.on_full = on_full
+            self._admit_deferred()
+            self._update_positions()
+            if self._threads:
+                self._ensure_workers()
+            self._cond.notify_all()
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"scan-worker-{len(self._threads)}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _admit_deferred(self):
+        while self._deferred and len(self._heap) < self.max_queued:
+            deferred = self._deferred.popleft()
+            heapq.heappush(self._heap, deferred)
+            promoted = SCAN_JOBS.get(deferred[2])
+            if promoted is not None:
+                promoted.status = "QUEUED"
+
+    def _update_positions(self):
+        waiting = sorted(self._heap) + list(self._deferred)
+        for position, (_, _, job_id, _) in enumerate(waiting, start=1):
+            job = SCAN_JOBS.get(job_id)
+            if job is not None:
+                job.queue_position = position
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that is still waiting. False if it is not in the queue."""
+        with self._cond:
+            waiting = len(self._heap) + len(self._deferred)
+            self._heap = [entry for entry in self._heap if entry[2] != job_id]
+            heapq.heapify(self._heap)
+            self._deferred = deque(entry for entry in self._deferred if entry[2] != job_id)
+            if len(self._heap) + len(self._deferred) == waiting:
+                return False
+            self._update_positions()
+
+        job = SCAN_JOBS.get(job_id)
+        if job is not None:
+            job.status = "CANCELLED"
+            job.queue_position = None
+        return True
+
+    # -------------------------------------------------
+    # Workers
+    # -------------------------------------------------
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if len(self._threads) > self.workers:
+                        # The pool was shrunk by a config reload
+                        self._threads.remove(threading.current_thread())
+                        return
+                    if self._heap:
+                        break
+                    self._cond.wait()
+
+                _, _, job_id, target = heapq.heappop(self._heap)
+                self._admit_deferred()
+
+                self._running.add(job_id)
+                job = SCAN_JOBS.get(job_id)
+                if job is not None:
+                    job.queue_position = None
+                self._update_positions()
+
+            try:
+                run_scan(job_id, target)
+            except Exception as e:
+                logger.error(f"Scan worker error | job_id={job_id} error={e}")
+            finally:
+                with self._cond:
+                    self._running.discard(job_id)
+
+    # -------------------------------------------------
+    # Visibility
+    # -------------------------------------------------
+    def stats(self) -> dict:
+        with self._cond:
+            by_priority = Counter(
+                PRIORITY_NAMES[entry[0]] for entry in list(self._heap) + list(self._deferred)
+            )
+            snapshot = {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "on_full": self.on_full,
+                "queued": len(self._heap),
+                "deferred": len(self._deferred),
+                "running": len(self._running),
+                "queued_by_priority": {name: by_priority.get(name, 0) for name in PRIORITIES},
+            }
+
+        snapshot["jobs_by_status"] = dict(Counter(job.status for job in list(SCAN_JOBS.values())))
+        return snapshot
+
+
+def get_queue_config() -> dict:
+    queue_cfg = load_easm_config().get("job_queue", {}) or {}
+    return {
+        "workers": int(queue_cfg.get("workers", DEFAULT_WORKERS)),
+        "max_queued": int(queue_cfg.get("max_queued", DEFAULT_MAX_QUEUED)),
+        "on_full": str(queue_cfg.get("on_full", DEFAULT_ON_FULL)),
+    }
+
+
+# Reconfigured in place on reload: queued jobs and running scans stay put
+_QUEUE: ConfigBound[ScanJobQueue] = ConfigBound(
+    get_queue_config,
+    lambda settings: ScanJobQueue(**settings),
+    lambda queue, settings: queue.configure(**settings)
+)
+
+
+def get_job_queue() -> ScanJobQueue:
+    """Process-wide queue; worker threads start on the first submission."""
+    return _QUEUE.get()
+
+
+def submit_scan(job: ScanJob, priority: str = "normal") -> ScanJob:
+    """Queue a scan on the configured backend (local worker pool or broker)."""
+    if get_queue_backend() != "broker":
+        get_job_queue().submit(job, priority=priority)
+        checkpoints = get_checkpoint_store()
+        if checkpoints is not None:
+            # Recorded so a restart re-queues it (see resume_interrupted_scans)
+            checkpoints.save_job(job)
+        return job
+
+    if priority not in PRIORITIES:
+        raise ValueError(f"Invalid priority '{priority}' (expected one of {list(PRIORITIES)})")
+
+    cfg = get_queue_config()
+    job.priority = priority
+    max_queued = cfg["max_queued"] if cfg["on_full"] == "reject" else None
+    if not get_broker().enqueue(job, PRIORITIES[priority], max_queued=max_queued):
+        raise QueueFull(f"Scan queue is full ({cfg['max_queued']} jobs waiting)")
+
+    logger.info(
+        f"Scan queued | job_id={job.job_id} priority={priority} "
+        f"backend=broker position={job.queue_position}"
+    )
+    return job
+
+
+def get_queue_stats() -> dict:
+    if get_queue_backend() == "broker":
+        return get_broker().stats()
+    return get_job_queue().stats()
+
+
+def cancel_scan(job_id: str) -> Optional[ScanJob]:
+    """
+    Cancel a queued or running scan. Queued jobs are dropped; running ones
+    stop cooperatively and keep their partial results. Returns the job
+    (None if unknown); finished jobs are returned unchanged.
+    """
+    if get_queue_backend() == "broker":
+        broker = get_broker()
+        broker.request_cancel(job_id)
+        return broker.get_job(job_id)
+
+    job = SCAN_JOBS.get(job_id)
+    if job is None or job.status in FINISHED_STATUSES:
+        return job
+
+    if get_job_queue().cancel(job_id):
+        checkpoints = get_checkpoint_store()
+        if checkpoints is not None:
+            checkpoints.finish_job(job_id)
+    elif not cancel_running_scan(job_id):
+        # Dequeued but not started yet: run_scan sees the status and stops
+        job.status = "CANCELLED"
+    return job
+
+
+def resume_interrupted_scans() -> int:
+    """
+    Re-queue local jobs that were queued or running when the process last
+    stopped. Running ones pick up from their checkpointed work units.
+    """
+    checkpoints = get_checkpoint_store()
+    if checkpoints is None or get_queue_backend() == "broker":
+        return 0
+
+    jobs = checkpoints.unfinished_jobs()
+    for job in jobs:
+        job.status = "PENDING"
+        job.queue_position = None
+        SCAN_JOBS[job.job_id] = job
+        try:
+            get_job_queue().submit(job, priority=job.priority)
+        except QueueFull as e:
+            logger.error(f"Interrupted scan not resumed | job_id={job.job_id} error={e}")
+
+    if jobs:
+        logger.info(f"Interrupted scans re-queued | count={len(jobs)}")
+    return len(jobs)
@@ -0,0 +1,115 @@
+"""
+Single-pass multi-pattern matching.
+
+`PatternMatcher` compiles named groups of keywords into one alternation
+regex, so a single scan in the `re` engine finds every keyword from every
+group. The alternation is nested by shared prefixes ("admin(?:istrator)?")
+so the engine tests one branch per character instead of every keyword at
+every position.
+
+Each match is the longest keyword starting at its position, and every
+keyword that is a prefix of it matched there too; the next search resumes
+one character later. Overlapping keywords ("admin" inside "administrator",
+"he" inside "she") are therefore all reported.
+
+Analyzers register their keyword lists with `register_pattern_group`; the
+shared matcher is rebuilt lazily whenever the registered groups change.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _alternation(keywords: Iterable[str]) -> str:
+    """Regex matching any of `keywords`, longest first, nested by shared prefix."""
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy: a longer keyword wins over one that ends here
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class PatternMatcher:
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups: Dict[str, List[str]] = {name: list(patterns) for name, patterns in groups.items()}
+
+        # keyword -> (group, index) pairs of every list entry spelling it
+        owners: Dict[str, List[Tuple[str, int]]] = {}
+        for name, patterns in self.groups.items():
+            for index, pattern in enumerate(patterns):
+                if pattern:
+                    owners.setdefault(pattern.lower(), []).append((name, index))
+
+        keywords = list(owners)
+        self._regex = re.compile(_alternation(keywords)) if keywords else None
+
+        # Longest match at a position -> entries of every keyword it starts with
+        self._hits: Dict[str, List[Tuple[str, int]]] = {
+            keyword: [o for k in keywords if keyword.startswith(k) for o in owners[k]]
+            for keyword in keywords
+        }
+
+    def search(self, text: str) -> Dict[str, List[str]]:
+        """
+        Return, for every group, the patterns found in `text` (case-insensitive),
+        in the order they appear in the group's list.
+        """
+        found: Dict[str, List[int]] = {name: [] for name in self.groups}
+        if self._regex is not None:
+            lowered = text.lower()
+            longest = set()
+            match = self._regex.search(lowered)
+            while match:
+                longest.add(match.group())
+                # Resume one character on, so overlapping keywords are seen
+                match = self._regex.search(lowered, match.start() + 1)
+
+            hits = set()
+            for keyword in longest:
+                hits.update(self._hits[keyword])
+            for name, index in hits:
+                found[name].append(index)
+
+        return {
+            name: [self.groups[name][i] for i in sorted(indexes)]
+            for name, indexes in found.items()
+        }
+
+
+# -------------------------------------------------
+# Shared matcher for HTTP analyzers
+# -------------------------------------------------
+PATTERN_GROUPS: Dict[str, List[str]] = {}
+
+_SHARED_MATCHER: Optional[PatternMatcher] = None
+_MATCHER_LOCK = threading.Lock()
+
+
+def register_pattern_group(name: str, patterns: Iterable[str]):
+    """Add or replace a named keyword list in the shared matcher."""
+    global _SHARED_MATCHER
+
+    with _MATCHER_LOCK:
+        PATTERN_GROUPS[name] = list(patterns)
+        _SHARED_MATCHER = None
+
+
+def get_shared_matcher() -> PatternMatcher:
+    global _SHARED_MATCHER
+
+    with _MATCHER_LOCK:
+        if _SHARED_MATCHER is None:
+            _SHARED_MATCHER = PatternMatcher(PATTERN_GROUPS)
+        return _SHARED_MATCHER
@@ -0,0 +1,124 @@
+"""
+Generic multi-stage worker pipeline.
+
+Stages run on their own worker threads and are connected by bounded
+`queue.Queue`s. A stage hands results downstream through `emit`, which
+blocks while the next queue is full, so a slow stage throttles everything
+upstream of it and memory stays bounded by the queue sizes rather than by
+the size of the scan. Completion flows down the chain as a sentinel: a
+stage forwards it only after its last worker has drained its input.
+"""
+
+import contextvars
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional
+
+from app.core.logger import logger
+
+DEFAULT_QUEUE_SIZE = 256
+
+_STAGE_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline step. `handler(item, emit)` is called per item, or
+    `handler(items, emit)` with up to `batch_size` queued items when
+    batching. Handler errors are logged and the item is dropped; for a
+    `fatal` stage the first error is re-raised once the pipeline drains.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        workers: int = 1,
+        batch_size: Optional[int] = None,
+        fatal: bool = False
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.batch_size = int(batch_size) if batch_size else None
+        self.fatal = fatal
+
+
+def _discard(item):
+    pass
+
+
+class StagePipeline:
+    def __init__(self, stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.error: Optional[Exception] = None
+        self._active = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+
+    def run(self, seeds: Iterable):
+        """Feed `seeds` to the first stage and block until every stage has drained."""
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                # Workers inherit the caller's context variables (e.g. the scan job id)
+                thread = threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(self._work, index),
+                    name=f"pipeline-{stage.name}-{n}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        for seed in seeds:
+            self.queues[0].put(seed)
+        self.queues[0].put(_STAGE_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def _take(self, inbox: queue.Queue, batch_size: Optional[int]) -> list:
+        items = [inbox.get()]
+        while batch_size and len(items) < batch_size and items[-1] is not _STAGE_DONE:
+            try:
+                items.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _handle(self, stage: Stage, items: list, emit: Callable):
+        try:
+            stage.handler(items if stage.batch_size else items[0], emit)
+        except Exception as e:
+            logger.error(f"Pipeline stage failed | stage={stage.name} error={e}")
+            if stage.fatal and self.error is None:
+                self.error = e
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        has_next = index + 1 < len(self.stages)
+        emit = self.queues[index + 1].put if has_next else _discard
+
+        while True:
+            items = self._take(inbox, stage.batch_size)
+            done = items[-1] is _STAGE_DONE
+            if done:
+                items.pop()
+            if items:
+                self._handle(stage, items, emit)
+            if done:
+                break
+
+        # Upstream has finished: wake the next sibling, and let the last
+        # worker out close the downstream stage
+        inbox.put(_STAGE_DONE)
+        with self._lock:
+            self._active[index] -= 1
+            last = self._active[index] == 0
+        if last and has_next:
+            self.queues[index + 1].put(_STAGE_DONE)
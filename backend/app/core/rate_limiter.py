@@ -0,0 +1,258 @@
+"""
+Per-target rate limiting shared by every scan in the process.
+
+Manual scans, continuous EASM runs and BAS-triggered rescans can all hit
+the same host at once. Every outbound probe therefore takes a token from
+buckets keyed by the target instead of by the job:
+
+    port_scan  connect attempts per IP
+    http       requests per IP; a hostname's requests count against its
+               registered domain and the IP it resolves to
+               (fingerprinting and AI evidence fetches both count here)
+
+Buckets are token buckets refilled at `rate` per second and holding up to
+`burst` seconds worth of tokens. A caller that finds a bucket empty reserves
+its token anyway and sleeps until it is due, so waiters are served in
+arrival order without polling and other targets are never held up.
+
+Buckets live in this process. With `job_queue.backend: broker` several
+`app.worker` processes scan at once, so each process runs at 1/N of every
+budget, N being the worker processes the broker sees running a job (with a
+heartbeat within `checkpoints.stale_after`). N is re-read every
+`SHARE_REFRESH_SECONDS` and existing buckets are retuned in place, which
+keeps the combined rate under the configured one as workers come and go.
+"""
+
+import asyncio
+import ipaddress
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.broker import get_broker, get_queue_backend
+from app.core.checkpoint_store import get_checkpoint_config
+from app.core.config_loader import ConfigBound, load_easm_config
+
+DEFAULT_LIMITS = {
+    "port_scan": {"per_ip": 300},
+    "http": {"per_ip": 10, "per_domain": 20},
+}
+DEFAULT_BURST_SECONDS = 2.0
+# Idle, full buckets are dropped once the table grows past this
+MAX_BUCKETS = 10000
+# How often the number of scanning processes is re-read from the broker
+SHARE_REFRESH_SECONDS = 5.0
+
+# Public suffixes with more than one label, for registered-domain grouping
+MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "gov.au", "edu.au",
+    "co.nz", "org.nz", "co.jp", "ne.jp", "or.jp", "co.in", "org.in",
+    "com.br", "com.cn", "com.mx", "com.sg", "com.tr", "co.za", "co.kr",
+}
+
+
+def registered_domain(host: str) -> str:
+    """`api.eu.example.co.uk` → `example.co.uk` (best effort, no PSL download)."""
+    labels = host.lower().rstrip(".").split(".")
+    if len(labels) <= 2:
+        return ".".join(labels)
+    if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens; return how long the caller must wait for them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def retune(self, rate: float, burst: float):
+        """Change the rate, keeping the tokens (and debt) accrued so far."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = rate
+            self.burst = max(burst, 1.0)
+            self.tokens = min(self.tokens, self.burst)
+
+    def idle(self) -> bool:
+        with self._lock:
+            refilled = self.tokens + (time.monotonic() - self.updated) * self.rate
+            return refilled >= self.burst
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        burst_seconds: float = DEFAULT_BURST_SECONDS,
+        processes: int = 1
+    ):
+        self._buckets: Dict[Tuple[str, str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.processes = max(1, int(processes))
+        self.next_share_check = 0.0
+        self.throttled = 0
+        self.waited = 0.0
+        self.configure(limits, burst_seconds)
+
+    def configure(
+        self,
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        burst_seconds: float = DEFAULT_BURST_SECONDS
+    ):
+        """Apply new budgets; buckets are rebuilt at the new rates as they are next used."""
+        with self._lock:
+            # engine -> scope ("per_ip" / "per_domain") -> configured rate
+            self.limits = {
+                engine: {scope: float(rate) for scope, rate in scopes.items() if rate}
+                for engine, scopes in (limits or {}).items()
+            }
+            self.burst_seconds = burst_seconds
+            self._buckets.clear()
+
+    def set_processes(self, processes: int):
+        """Split every budget across `processes` scanning processes, retuning live buckets."""
+        processes = max(1, int(processes))
+        with self._lock:
+            if processes == self.processes:
+                return
+            self.processes = processes
+            for (engine, scope, _), bucket in self._buckets.items():
+                rate = self.limits[engine][scope] / processes
+                bucket.retune(rate, rate * self.burst_seconds)
+
+    def refresh_share(self):
+        """Re-read the number of scanning processes, at most every SHARE_REFRESH_SECONDS."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self.next_share_check:
+                return
+            self.next_share_check = now + SHARE_REFRESH_SECONDS
+        # A broker query: not under the lock
+        self.set_processes(scanning_processes())
+
+    def _bucket(self, engine: str, scope: str, key: str) -> Optional[TokenBucket]:
+        with self._lock:
+            rate = self.limits.get(engine, {}).get(scope)
+            if not rate:
+                return None
+            rate /= self.processes
+            bucket = self._buckets.get((engine, scope, key))
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune()
+                bucket = TokenBucket(rate, rate * self.burst_seconds)
+                self._buckets[(engine, scope, key)] = bucket
+            return bucket
+
+    def _prune(self):
+        for key in [k for k, b in self._buckets.items() if b.idle()]:
+            del self._buckets[key]
+
+    def _buckets_for(self, engine: str, host: str, ip: Optional[str] = None) -> List[TokenBucket]:
+        if is_ip_address(host):
+            scopes = [("per_ip", host.strip("[]"))]
+        else:
+            scopes = [("per_domain", registered_domain(host))]
+            if ip:
+                scopes.append(("per_ip", ip))
+        return [b for b in (self._bucket(engine, s, k) for s, k in scopes) if b is not None]
+
+    def delay(self, engine: str, host: str, cost: float = 1.0, ip: Optional[str] = None) -> float:
+        """
+        Reserve a slot for one `engine` request to `host`; seconds to wait
+        for it. Pass the address a hostname resolved to as `ip` to charge
+        that IP's budget as well.
+        """
+        wait = max((b.reserve(cost) for b in self._buckets_for(engine, host, ip)), default=0.0)
+        if wait > 0:
+            with self._lock:
+                self.throttled += 1
+                self.waited += wait
+        return wait
+
+    def acquire(self, engine: str, host: str, cost: float = 1.0, ip: Optional[str] = None):
+        wait = self.delay(engine, host, cost, ip)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, engine: str, host: str, cost: float = 1.0, ip: Optional[str] = None):
+        wait = self.delay(engine, host, cost, ip)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limits": self.limits,
+                "processes": self.processes,
+                "buckets": len(self._buckets),
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited, 3),
+            }
+
+
+def get_rate_limit_config() -> dict:
+    cfg = load_easm_config().get("rate_limits", {}) or {}
+    limits = {
+        engine: {**defaults, **(cfg.get(engine) or {})}
+        for engine, defaults in DEFAULT_LIMITS.items()
+    }
+    return {
+        "enabled": bool(cfg.get("enabled", True)),
+        "burst_seconds": float(cfg.get("burst_seconds", DEFAULT_BURST_SECONDS)),
+        "limits": limits,
+    }
+
+
+def _limiter_settings() -> dict:
+    cfg = get_rate_limit_config()
+    return {
+        "limits": cfg["limits"] if cfg["enabled"] else {},
+        "burst_seconds": cfg["burst_seconds"],
+    }
+
+
+# Reconfigured in place when `rate_limits` changes, so every scan sees the new budgets
+_LIMITER: ConfigBound[RateLimiter] = ConfigBound(
+    _limiter_settings,
+    lambda settings: RateLimiter(**settings),
+    lambda limiter, settings: limiter.configure(**settings)
+)
+
+
+def scanning_processes() -> int:
+    """Processes scanning right now: live worker processes in broker mode, else this one."""
+    if get_queue_backend() != "broker":
+        return 1
+    return get_broker().scanning_processes(get_checkpoint_config()["stale_after"])
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter, so budgets hold across jobs, engines and worker processes."""
+    limiter = _LIMITER.get()
+    limiter.refresh_share()
+    return limiter
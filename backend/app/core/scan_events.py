@@ -0,0 +1,266 @@
+"""
+Live scan events.
+
+While a scan runs, its pipeline publishes events to a per-job bus:
+
+    status    job status changes (RUNNING, COMPLETED, CANCELLED, FAILED)
+    progress  per-stage item counters (throttled to `events.progress_interval`)
+    asset     each asset as it reaches the results
+    evidence  each new piece of evidence recorded for the job
+
+`GET /scan/{job_id}/events` streams them as server-sent events. Every event
+has a per-job sequence number (the SSE `id`), and the last
+`events.history` events are kept, so a client reconnecting with
+`Last-Event-ID` (or connecting late) replays what it missed before
+following the live stream. Until the job has a bus in this process (still
+queued, or running in a broker worker) the stream polls the job instead
+and emits `status` events carrying its status and progress counters.
+
+Pipeline worker threads run with `CURRENT_SCAN_JOB` set, which is how
+`add_evidence` attributes evidence to the scan that produced it.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from app.core.broker import FINISHED_STATUSES, get_broker_config
+from app.core.config_loader import load_easm_config
+from app.core.scan_store import lookup_scan_job
+
+DEFAULT_HISTORY = 1000
+DEFAULT_PROGRESS_INTERVAL = 0.5
+DEFAULT_MAX_FINISHED_JOBS = 100
+# Idle streams send an SSE comment this often so proxies keep them open
+KEEPALIVE_SECONDS = 15
+
+EVENT_END = "end"
+
+CURRENT_SCAN_JOB: ContextVar[Optional[str]] = ContextVar("current_scan_job", default=None)
+
+
+def get_events_config() -> dict:
+    cfg = load_easm_config().get("events", {}) or {}
+    return {
+        "history": int(cfg.get("history", DEFAULT_HISTORY)),
+        "progress_interval": float(cfg.get("progress_interval", DEFAULT_PROGRESS_INTERVAL)),
+        "max_finished_jobs": int(cfg.get("max_finished_jobs", DEFAULT_MAX_FINISHED_JOBS)),
+    }
+
+
+class ScanEventBus:
+    """Events of one job: bounded history plus live subscribers."""
+
+    def __init__(self, job_id: str, history: int = DEFAULT_HISTORY):
+        self.job_id = job_id
+        self.history = deque(maxlen=history)
+        self.closed = False
+
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._subscribers: List[tuple] = []   # (loop, asyncio.Queue)
+        self._listeners: List[Callable[[dict], None]] = []
+
+    def publish(self, event_type: str, data) -> dict:
+        with self._lock:
+            self._seq += 1
+            event = {
+                "id": self._seq,
+                "type": event_type,
+                "job_id": self.job_id,
+                "timestamp": datetime.utcnow().isoformat(),
+                "data": data,
+            }
+            self.history.append(event)
+            # Queued under the lock so subscribers see ids in order even
+            # when several pipeline threads publish at once
+            for loop, inbox in self._subscribers:
+                loop.call_soon_threadsafe(inbox.put_nowait, event)
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener(event)
+        return event
+
+    def close(self):
+        self.publish(EVENT_END, None)
+        with self._lock:
+            self.closed = True
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """Call `listener(event)` synchronously for every event published."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    async def subscribe(self, after: int = 0) -> AsyncIterator[dict]:
+        """Replay history newer than `after`, then follow live events until `end`."""
+        loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        with self._lock:
+            backlog = [e for e in self.history if e["id"] > after]
+            closed = self.closed
+            if not closed:
+                self._subscribers.append((loop, inbox))
+
+        try:
+            # Backlog and subscription are taken under one lock, so live
+            # events start right after the backlog; ids are only compared
+            # against it, never against each other
+            replayed = backlog[-1]["id"] if backlog else after
+            for event in backlog:
+                yield event
+            if closed:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(inbox.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None  # keepalive
+                    continue
+                if event["id"] <= replayed:
+                    continue
+                yield event
+                if event["type"] == EVENT_END:
+                    return
+        finally:
+            with self._lock:
+                if (loop, inbox) in self._subscribers:
+                    self._subscribers.remove((loop, inbox))
+
+
+class ProgressCounter:
+    """Per-stage item counters for one job, published at most every `interval`."""
+
+    def __init__(
+        self,
+        bus: ScanEventBus,
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+        counts: Optional[Dict[str, int]] = None
+    ):
+        self.bus = bus
+        self.interval = interval
+        self.counts = counts if counts is not None else {}
+
+        self._lock = threading.Lock()
+        self._last_published = 0.0
+
+    def add(self, stage: str, n: int = 1):
+        with self._lock:
+            self.counts[stage] = self.counts.get(stage, 0) + n
+            now = time.monotonic()
+            if now - self._last_published < self.interval:
+                return
+            self._last_published = now
+            snapshot = dict(self.counts)
+        self.bus.publish("progress", snapshot)
+
+    def flush(self):
+        with self._lock:
+            snapshot = dict(self.counts)
+        self.bus.publish("progress", snapshot)
+
+
+# -------------------------------------------------
+# Per-job buses
+# -------------------------------------------------
+_BUSES: "OrderedDict[str, ScanEventBus]" = OrderedDict()
+_BUSES_LOCK = threading.Lock()
+
+
+def open_event_bus(job_id: str) -> ScanEventBus:
+    """The job's bus, created on first use. Old finished buses are dropped."""
+    cfg = get_events_config()
+    with _BUSES_LOCK:
+        bus = _BUSES.get(job_id)
+        if bus is None:
+            bus = ScanEventBus(job_id, history=cfg["history"])
+            _BUSES[job_id] = bus
+
+        finished = [jid for jid, b in _BUSES.items() if b.closed]
+        for jid in finished[:max(0, len(finished) - cfg["max_finished_jobs"])]:
+            _BUSES.pop(jid, None)
+
+    return bus
+
+
+def get_event_bus(job_id: str) -> Optional[ScanEventBus]:
+    with _BUSES_LOCK:
+        return _BUSES.get(job_id)
+
+
+def publish_scan_event(job_id: Optional[str], event_type: str, data):
+    """Publish to the job's bus, if it has one and it is still open."""
+    bus = get_event_bus(job_id) if job_id else None
+    if bus is not None and not bus.closed:
+        bus.publish(event_type, data)
+
+
+def _polled_event(job_id: str, event_type: str, data) -> dict:
+    # No id: only bus events can be resumed with Last-Event-ID
+    return {
+        "id": None,
+        "type": event_type,
+        "job_id": job_id,
+        "timestamp": datetime.utcnow().isoformat(),
+        "data": data,
+    }
+
+
+async def stream_scan_events(job_id: str, after: int = 0) -> AsyncIterator[Optional[dict]]:
+    """Events for `job_id` (None = keepalive) until the scan has finished."""
+    poll_interval = get_broker_config()["poll_interval"]
+    last_state = None
+    idle = 0.0
+
+    while True:
+        bus = get_event_bus(job_id)
+        if bus is not None:
+            async for event in bus.subscribe(after):
+                yield event
+            return
+
+        job = lookup_scan_job(job_id)
+        if job is None:
+            return
+
+        state = (job.status, dict(job.progress))
+        if state != last_state:
+            last_state = state
+            idle = 0.0
+            yield _polled_event(job_id, "status", {
+                "status": job.status,
+                "progress": job.progress,
+                "incomplete": job.incomplete,
+            })
+        elif idle >= KEEPALIVE_SECONDS:
+            idle = 0.0
+            yield None
+
+        if job.status in FINISHED_STATUSES:
+            yield _polled_event(job_id, EVENT_END, None)
+            return
+
+        await asyncio.sleep(poll_interval)
+        idle += poll_interval
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """`Last-Event-ID` header → sequence number; anything unusable means 0."""
+    try:
+        return max(0, int(value or 0))
+    except ValueError:
+        return 0
+
+
+def format_sse(event: Optional[dict]) -> str:
+    if event is None:
+        return ": keepalive\n\n"
+    event_id = f"id: {event['id']}\n" if event["id"] is not None else ""
+    return f"{event_id}event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
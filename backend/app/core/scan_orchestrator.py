@@ -3,7 +3,7 @@ from datetime import datetime
 from app.models.scan_job import ScanJob
 from app.core.scan_store import SCAN_JOBS, SCAN_RESULTS
 from app.engines.discovery.domain_discovery import discover_domain
-from app.agents.asset_risk_agent import classify_asset
+from app.agents.asset_risk_agent import classify_assets
 from app.models.scan_type import ScanType
 from app.engines.discovery.domain_discovery import discover_domain
 from app.engines.discovery.ip_discovery import discover_ip
@@ -15,15 +15,10 @@ from app.core.asset_diff import diff_assets
 from app.core.bas_service import run_bas_simulation
 from app.core.snapshot_store import ASSET_SNAPSHOTS
 from app.core.logger import logger
-from app.core.asset_normalizer import normalize_assets
-from app.core.asset_deduplicator import deduplicate_assets
-from app.engines.discovery.service_discovery import discover_services
-from app.engines.discovery.http_fingerprinting import fingerprint_http_service
-from app.engines.discovery.ai_evidence_engine import scan_ai_evidence
-from app.core.evidence_store import add_evidence
-from app.models.evidence import Evidence
-from app.engines.discovery.http_fingerprinting import fingerprint_http_service
-from app.core.evidence_factory import create_evidence
+from app.core.cancellation import REASON_CANCELLED, release_job_token, start_job_token
+from app.core.scan_events import CURRENT_SCAN_JOB, open_event_bus
+from app.core.checkpoint_store import get_checkpoint_store, open_job_checkpoint
+from app.core.scan_pipeline import ScanPipeline
 
 
 
@@ -43,9 +38,10 @@ def run_domain_scan(job_id: str, domain: str):
     try:
         assets = discover_domain(domain)
         enriched = []
+        ai_results = classify_assets([a.dict() for a in assets])
 
         for asset in assets:
-            ai_result = classify_asset(asset.dict())
+            ai_result = ai_results.get(asset.asset_id, {})
             asset.risk_score = ai_result.get("risk_score")
             asset.risk_tags += ai_result.get("risk_tags", [])
             enriched.append(asset)
@@ -68,7 +64,22 @@ def run_scan(job_id: str, target: str):
         logger.error(f"Scan job {job_id} missing — skipping scan")
         return
 
+    checkpoints = get_checkpoint_store()
+
+    # Register the token before looking at the status: a cancel that lands
+    # earlier marks the job CANCELLED, a later one trips the token
+    cancel = start_job_token(job_id)
+    if job.status == "CANCELLED":
+        release_job_token(job_id)
+        logger.info(f"Scan cancelled before start | job_id={job_id}")
+        if checkpoints is not None:
+            checkpoints.finish_job(job_id)
+        return
+
     job.status = "RUNNING"
+    events = open_event_bus(job_id)
+    context = CURRENT_SCAN_JOB.set(job_id)
+    events.publish("status", {"status": job.status, "target": target})
 
     logger.info(
         f"Scan started | job_id={job.job_id} target={target}"
@@ -77,93 +88,36 @@ def run_scan(job_id: str, target: str):
     try:
         scan_type = detect_scan_type(target)
 
-        if scan_type == ScanType.DOMAIN:
-            assets = discover_domain(target)
-        elif scan_type == ScanType.IP:
-            assets = discover_ip(target)
-        else:
-            raise ValueError("Scan type not supported yet")
-
-        enriched = []
-        for asset in assets:
-            ai_result = classify_asset(asset.dict())
-            asset.risk_score = ai_result.get("risk_score")
-            asset.risk_tags += ai_result.get("risk_tags", [])
-            enriched.append(asset)
+        # 🔹 Discovery → resolve → service discovery → HTTP/AI evidence →
+        # risk classification → normalize & dedup, streamed stage to stage
+        checkpoint = open_job_checkpoint(job_id)
+        if checkpoint is not None and checkpoint.restored:
+            logger.info(
+                f"Resuming scan from checkpoint | job_id={job_id} units={len(checkpoint.restored)}"
+            )
 
-            # 🔹 NEW: Service discovery for IPs
-            if asset.asset_type == "ip":
-                services = discover_services(asset.identifier)
-                enriched.extend(services)
-
-                # 🔹 HTTP fingerprinting for web services
-                for svc in services:
-                    if "http" in svc.risk_tags or "https" in svc.risk_tags:
-                        url = f"http://{svc.identifier}"
-
-                        fp = fingerprint_http_service(url)
-
-                        now = datetime.utcnow()
-
-                        if fp.get("is_http"):
-                            add_evidence(create_evidence(
-                                asset_id=svc.asset_id,
-                                category="application",
-                                type="http_service_detected",
-                                source="http_fingerprint",
-                                confidence="high",
-                                strength="strong",
-                                observed_value=url,
-                                raw_proof=fp.get("tech_headers")
-                            ))
-
-                        if fp.get("has_login"):
-                            add_evidence(create_evidence(
-                                asset_id=svc.asset_id,
-                                category="application",
-                                type="login_page_detected",
-                                source="http_fingerprint",
-                                confidence="high",
-                                strength="strong",
-                                observed_value=url,
-                                raw_proof=fp.get("html_snippet")
-                            ))
-
-                        if fp.get("has_admin"):
-                            add_evidence(create_evidence(
-                                asset_id=svc.asset_id,
-                                category="application",
-                                type="admin_panel_detected",
-                                source="http_fingerprint",
-                                confidence="high",
-                                strength="strong",
-                                observed_value=url,
-                                raw_proof=fp.get("html_snippet")
-                            ))
-
-                        for k, v in fp.get("tech_headers", {}).items():
-                            svc.risk_tags.append(f"tech:{k}")
-                        
-                        # 🔹 NEW: Scan for AI-specific security indicators
-                        scan_ai_evidence(svc.asset_id, url, timeout=5.0)
-
-
-        # 🔹 Normalize & deduplicate assets
-        normalized = normalize_assets(enriched, root_domain=target if scan_type == ScanType.DOMAIN else None)
-        final_assets = deduplicate_assets(normalized)
+        final_assets = ScanPipeline(
+            job, target, scan_type, cancel=cancel, checkpoint=checkpoint
+        ).run()
 
         SCAN_RESULTS[job_id] = final_assets
-        job.status = "COMPLETED"
+        job.status = "CANCELLED" if cancel.reason == REASON_CANCELLED else "COMPLETED"
         job.completed_at = datetime.utcnow()
 
         logger.info(
-            f"Scan completed | job_id={job.job_id} assets_discovered={len(enriched)}"
+            f"Scan completed | job_id={job.job_id} status={job.status} "
+            f"assets_discovered={len(final_assets)} incomplete={job.incomplete}"
         )
 
+        if job.incomplete:
+            # A partial snapshot would show everything not reached as removed
+            logger.info(f"Snapshot skipped for incomplete scan | job_id={job.job_id}")
+            return
+
         snapshot = AssetSnapshot(
             snapshot_id=str(uuid4()),
             target=target,
-            assets=enriched,
+            assets=final_assets,
             scan_job_id=job.job_id
         )
 
@@ -203,3 +157,15 @@ def run_scan(job_id: str, target: str):
         logger.error(
             f"Scan failed | job_id={job.job_id} error={e}"
         )
+    finally:
+        release_job_token(job_id)
+        if checkpoints is not None:
+            checkpoints.finish_job(job_id)
+        CURRENT_SCAN_JOB.reset(context)
+        events.publish("status", {
+            "status": job.status,
+            "incomplete": job.incomplete,
+            "error": job.error,
+            "assets": len(SCAN_RESULTS.get(job_id) or []),
+        })
+        events.close()
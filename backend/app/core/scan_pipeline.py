@@ -0,0 +1,447 @@
+"""
+Scan job as a streaming pipeline.
+
+    discover → resolve → portscan → fingerprint → ai_evidence → classify → collect
+
+Every stage has its own worker count (`pipeline.stages` in easm.yaml) and
+passes through items it does not handle, so an asset reaches the results as
+soon as it has been through the whole chain. `SCAN_RESULTS[job_id]` is
+filled progressively while the job is RUNNING.
+
+The job's `CancelToken` bounds the whole run; each stage also gets a child
+token bounded by `deadlines.stages.<stage>`, started when the stage takes
+its first item. Once a stage's token trips, the stage passes items straight
+through (and the engines it drives stop between units of work), so the
+results keep whatever was found and the job lists the stage under
+`incomplete_stages`.
+
+Progress is visible while the scan runs: `job.progress` counts the items
+each stage has handled, and the job's event bus (see `scan_events`) gets
+throttled `progress` events plus an `asset` event per collected asset.
+
+With a `JobCheckpoint`, finished work units (DNS answers, port-plan chunks
+per IP, fetched URLs) are checkpointed as they complete, and units restored
+from an earlier, interrupted run of the same job are replayed instead of
+being probed again.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.models.asset import Asset
+from app.models.scan_job import ScanJob
+from app.models.scan_type import ScanType
+from app.agents.asset_risk_agent import classify_assets, get_batch_size
+from app.agents.rule_classifier import pre_classify, rules_enabled
+from app.core.ai_client import LLM_TIMEOUT
+from app.core.asset_deduplicator import AssetIndex
+from app.core.asset_normalizer import normalize_assets
+from app.core.cancellation import CancelToken, get_deadline_config
+from app.core.checkpoint_store import (
+    JobCheckpoint,
+    get_checkpoint_config,
+    pack_assets,
+    pack_evidence,
+    unpack_assets,
+    unpack_evidence,
+)
+from app.core.config_loader import load_easm_config
+from app.core.logger import logger
+from app.core.pipeline import DEFAULT_QUEUE_SIZE, Stage, StagePipeline
+from app.core.scan_events import ProgressCounter, get_events_config, open_event_bus
+from app.core.scan_store import SCAN_RESULTS
+from app.engines.discovery.async_http_engine import capture_http_services
+from app.engines.discovery.dns_resolver import normalize_name, resolve_hosts
+from app.engines.discovery.domain_discovery import iter_domain_assets, record_cname_evidence
+from app.engines.discovery.http_analyzers import HTTP_ANALYZERS, run_http_analyzers
+from app.engines.discovery.http_fingerprinting import analyze_http_fingerprint
+from app.engines.discovery.ip_discovery import build_ip_asset, discover_ip, iter_network_hosts
+from app.engines.discovery.port_scanner import get_port_scanner
+from app.engines.discovery.service_discovery import discover_services, get_http_targets, get_port_plan
+
+DEFAULT_MAX_PARALLEL_HOSTS = 16
+
+STAGE_DEFAULTS = {
+    "resolve": {"workers": 2, "batch_size": 64},
+    "fingerprint": {"workers": 4, "batch_size": 32},
+    "ai_evidence": {"workers": 2},
+    "classify": {"workers": 4},
+}
+
+
+def get_pipeline_config() -> dict:
+    cfg = load_easm_config().get("pipeline", {}) or {}
+    return {
+        "queue_size": int(cfg.get("queue_size", DEFAULT_QUEUE_SIZE)),
+        "stages": cfg.get("stages") or {},
+    }
+
+
+def get_max_parallel_hosts() -> int:
+    host_cfg = load_easm_config().get("host_scan", {})
+    return int(host_cfg.get("max_parallel_hosts", DEFAULT_MAX_PARALLEL_HOSTS))
+
+
+def enrich_assets_risk(assets: List[Asset], timeout: float = LLM_TIMEOUT):
+    """Classify `assets` in LLM batches and apply the scores in place."""
+    results = classify_assets([a.dict() for a in assets], timeout=timeout)
+    for asset in assets:
+        ai_result = results.get(asset.asset_id) or {}
+        asset.risk_score = ai_result.get("risk_score")
+        asset.risk_tags += ai_result.get("risk_tags", [])
+
+
+class ScanItem:
+    """
+    What travels between stages: an asset, or (for network targets) a bare
+    IP that only becomes an asset once it turns out to have open services.
+    The fingerprint stage parks the HTTP capture here for the AI stage.
+    """
+
+    __slots__ = ("asset", "ip", "capture")
+
+    def __init__(self, asset: Optional[Asset] = None, ip: Optional[str] = None):
+        self.asset = asset
+        self.ip = ip
+        self.capture = None
+
+
+class ScanPipeline:
+    def __init__(
+        self,
+        job: ScanJob,
+        target: str,
+        scan_type: ScanType,
+        cancel: Optional[CancelToken] = None,
+        checkpoint: Optional[JobCheckpoint] = None
+    ):
+        self.job = job
+        self.target = target
+        self.scan_type = scan_type
+        self.root_domain = target if scan_type == ScanType.DOMAIN else None
+
+        self.cancel = cancel or CancelToken()
+        self.checkpoint = checkpoint
+        self.deadlines = get_deadline_config()
+        self.stage_tokens: Dict[str, CancelToken] = {}
+        self._token_lock = threading.Lock()
+
+        self.events = open_event_bus(job.job_id)
+        self.progress = ProgressCounter(
+            self.events,
+            interval=get_events_config()["progress_interval"],
+            counts=job.progress
+        )
+
+        self.results: List[Asset] = []
+        self.index = AssetIndex()
+        self.ip_assets: Dict[str, Asset] = {}  # resolved IP -> its asset (hostname index)
+        self._ip_lock = threading.Lock()
+
+        self.fingerprint_analyzers = [analyze_http_fingerprint]
+        self.ai_analyzers = [a for a in HTTP_ANALYZERS if a is not analyze_http_fingerprint]
+
+    def build(self) -> StagePipeline:
+        cfg = get_pipeline_config()
+
+        def options(name: str, **defaults) -> dict:
+            merged = {**defaults, **STAGE_DEFAULTS.get(name, {}), **(cfg["stages"].get(name) or {})}
+            return {"workers": merged["workers"], "batch_size": merged.get("batch_size")}
+
+        def stage(name: str, handler: Callable, **defaults) -> Stage:
+            opts = options(name, **defaults)
+            return Stage(name, self._guard(name, handler, opts["batch_size"]), **opts)
+
+        return StagePipeline([
+            Stage("discover", self.discover, fatal=True),
+            stage("resolve", self.resolve),
+            stage("portscan", self.portscan, workers=get_max_parallel_hosts()),
+            stage("fingerprint", self.fingerprint),
+            stage("ai_evidence", self.ai_evidence),
+            stage("classify", self.classify, batch_size=get_batch_size()),
+            Stage("collect", self.collect),
+        ], queue_size=cfg["queue_size"])
+
+    # -------------------------------------------------
+    # Deadlines
+    # -------------------------------------------------
+    def token(self, stage: str) -> CancelToken:
+        """The stage's token; its budget starts on first use."""
+        with self._token_lock:
+            token = self.stage_tokens.get(stage)
+            if token is None:
+                token = self.cancel.child(self.deadlines["stages"].get(stage))
+                self.stage_tokens[stage] = token
+            return token
+
+    def _mark_incomplete(self, stage: str, reason: str):
+        self.job.incomplete = True
+        if stage not in self.job.incomplete_stages:
+            self.job.incomplete_stages[stage] = reason
+            logger.warning(
+                f"Scan stage cut short | job_id={self.job.job_id} stage={stage} reason={reason}"
+            )
+
+    def _guard(self, stage: str, handler: Callable, batched: bool) -> Callable:
+        """
+        Pass items through untouched once the stage's token has tripped;
+        network hosts that were never scanned have no asset yet and are dropped.
+        """
+        def run(items, emit):
+            token = self.token(stage)
+            if token.cancelled:
+                self._mark_incomplete(stage, token.reason)
+                for item in (items if batched else [items]):
+                    if item.asset is not None:
+                        emit(item)
+                return
+
+            handler(items, emit)
+            self.progress.add(stage, len(items) if batched else 1)
+            if token.cancelled:
+                self._mark_incomplete(stage, token.reason)
+
+        return run
+
+    def run(self) -> List[Asset]:
+        # Partial results are visible while the job is still RUNNING
+        SCAN_RESULTS[self.job.job_id] = self.results
+        try:
+            self.build().run([self.target])
+        finally:
+            if self.checkpoint is not None:
+                self.checkpoint.flush()
+
+        # A hostname can reach an IP after that IP's services went downstream
+        for asset in self.results:
+            if asset.asset_type == "service":
+                owner = self.ip_assets.get(asset.identifier.rsplit(":", 1)[0])
+                if owner is not None:
+                    asset.hostnames = list(owner.hostnames)
+
+        self.progress.flush()
+        return self.results
+
+    def _save_checkpoint(self, kind: str, key: str, payload: dict):
+        if self.checkpoint is not None:
+            self.checkpoint.save(kind, key, payload)
+
+    def _restored(self, kind: str, key: str) -> Optional[dict]:
+        return self.checkpoint.get(kind, key) if self.checkpoint is not None else None
+
+    # -------------------------------------------------
+    # Stages
+    # -------------------------------------------------
+    def discover(self, target: str, emit):
+        token = self.token("discover")
+
+        def found(item: ScanItem):
+            emit(item)
+            self.progress.add("discover")
+
+        if self.scan_type == ScanType.DOMAIN:
+            for asset in iter_domain_assets(target, cancel=token):
+                found(ScanItem(asset))
+        elif self.scan_type == ScanType.IP:
+            for asset in discover_ip(target):
+                found(ScanItem(asset))
+        elif self.scan_type == ScanType.NETWORK:
+            for ip in iter_network_hosts(target, cancel=token):
+                found(ScanItem(ip=ip))
+        else:
+            raise ValueError("Scan type not supported yet")
+
+        if token.cancelled:
+            self._mark_incomplete("discover", token.reason)
+
+    def _index_ip(self, ip: str, hostname: str) -> Optional[Asset]:
+        """Return a new IP asset the first time `ip` is seen, else None."""
+        with self._ip_lock:
+            existing = self.ip_assets.get(ip)
+            if existing is not None:
+                if hostname not in existing.hostnames:
+                    existing.hostnames.append(hostname)
+                return None
+
+            asset = build_ip_asset(ip, source="dns_lookup")
+            asset.hostnames = [hostname]
+            self.ip_assets[ip] = asset
+            return asset
+
+    def resolve(self, items: List[ScanItem], emit):
+        names = [
+            i.asset.identifier for i in items
+            if i.asset is not None and i.asset.asset_type == "domain"
+        ]
+        records = {}
+        for name in names:
+            restored = self._restored("dns", normalize_name(name))
+            if restored is not None:
+                records[normalize_name(name)] = restored
+
+        pending = [n for n in names if normalize_name(n) not in records]
+        if pending:
+            try:
+                resolved = resolve_hosts(pending)
+            except Exception as e:
+                logger.error(f"DNS resolution failed | job_id={self.job.job_id} error={e}")
+                resolved = {}
+            for name, record in resolved.items():
+                records[name] = record
+                self._save_checkpoint("dns", name, record)
+
+        for item in items:
+            emit(item)
+
+            asset = item.asset
+            if asset is None or asset.asset_type != "domain":
+                continue
+            record = records.get(normalize_name(asset.identifier))
+            if not record:
+                continue
+
+            record_cname_evidence(asset.asset_id, record)
+            for ip in record["a"] + record["aaaa"]:
+                ip_asset = self._index_ip(ip, asset.identifier)
+                if ip_asset is not None:
+                    emit(ScanItem(ip_asset))
+
+    def portscan(self, item: ScanItem, emit):
+        asset = item.asset
+        if asset is None:
+            ip = item.ip
+        elif asset.asset_type == "ip":
+            ip = asset.identifier
+        else:
+            emit(item)
+            return
+
+        stats = get_port_scanner().new_host_stats()
+        try:
+            services = self._scan_host(ip, stats)
+        except Exception as e:
+            logger.error(f"Host scan failed | ip={ip} error={e}")
+            services = []
+
+        if asset is None:
+            if not services:
+                return  # nothing listening on this network host
+            item.asset = asset = build_ip_asset(ip, source="network_range")
+
+        self.job.host_stats[ip] = stats.as_dict()
+        emit(item)
+
+        # Each IP is scanned once; its services belong to every hostname
+        for service in services:
+            service.hostnames = list(asset.hostnames)
+            emit(ScanItem(service))
+
+        logger.info(
+            f"Host scanned | job_id={self.job.job_id} ip={ip} services={len(services)}"
+        )
+
+    def _scan_host(self, ip: str, stats) -> List[Asset]:
+        """
+        Scan `ip` in one pass over the port plan chunks that are not
+        checkpointed yet, checkpointing each chunk as soon as all of its
+        ports are answered.
+        """
+        cancel = self.token("portscan")
+        if self.checkpoint is None:
+            return discover_services(ip, stats=stats, cancel=cancel)
+
+        plan = get_port_plan()
+        chunk_size = get_checkpoint_config()["port_chunk_size"]
+        services: List[Asset] = []
+        todo = []
+
+        def key(start: int) -> str:
+            return f"{ip}|{plan.mode}|{start}:{chunk_size}"
+
+        for start in range(0, len(plan.ports), chunk_size):
+            restored = self._restored("ports", key(start))
+            if restored is not None:
+                services += unpack_assets(restored)
+            else:
+                todo.append(start)
+        if not todo or cancel.cancelled:
+            return services
+
+        # Only the plan's last chunk can be short, so the remaining chunks
+        # keep their boundaries when laid end to end
+        def chunk_done(offset: int, found: List[Asset]):
+            self._save_checkpoint("ports", key(todo[offset // chunk_size]), pack_assets(found))
+
+        return services + discover_services(
+            ip, stats=stats, cancel=cancel,
+            ports=[port for start in todo for port in plan.ports[start:start + chunk_size]],
+            chunk_size=chunk_size, on_chunk=chunk_done
+        )
+
+    def fingerprint(self, items: List[ScanItem], emit):
+        services = {
+            i.asset.asset_id: i for i in items
+            if i.asset is not None and i.asset.asset_type == "service"
+        }
+        targets = []
+        for asset_id, url in get_http_targets([i.asset for i in services.values()]):
+            restored = self._restored("http", url)
+            if restored is not None:
+                unpack_evidence(restored, asset_id)
+            else:
+                targets.append((asset_id, url))
+
+        if targets:
+            cancel = self.token("fingerprint")
+            captures = capture_http_services([url for _, url in targets], cancel=cancel)
+            for (asset_id, url), capture in zip(targets, captures):
+                if capture is None:
+                    if not cancel.cancelled:
+                        self._save_checkpoint("http", url, {"evidence": []})  # unreachable
+                    continue
+                services[asset_id].capture = capture
+                run_http_analyzers(asset_id, capture, self.fingerprint_analyzers)
+
+        for item in items:
+            emit(item)
+
+    def ai_evidence(self, item: ScanItem, emit):
+        if item.capture is not None:
+            run_http_analyzers(item.asset.asset_id, item.capture, self.ai_analyzers)
+            self._save_checkpoint("http", item.capture.url, pack_evidence(item.asset.asset_id))
+            item.capture = None  # drop the body before it queues downstream
+        emit(item)
+
+    def classify(self, items: List[ScanItem], emit):
+        # Services are scored by the rule tier only; everything else that has
+        # queued up (up to llm.batch_size) goes out as one request
+        items = [item for item in items if item.asset is not None]
+        assets = []
+        for item in items:
+            if item.asset.asset_type != "service":
+                assets.append(item.asset)
+            elif rules_enabled():
+                ruled = pre_classify(item.asset.dict())
+                if ruled is not None:
+                    item.asset.risk_score = ruled["risk_score"]
+                    item.asset.risk_tags += ruled["risk_tags"]
+        if assets:
+            try:
+                enrich_assets_risk(
+                    assets, timeout=self.token("classify").timeout(self.deadlines["llm"])
+                )
+            except Exception as e:
+                logger.error(
+                    f"Risk classification failed | assets={len(assets)} error={e}"
+                )
+        for item in items:
+            emit(item)
+
+    def collect(self, item: ScanItem, emit):
+        if item.asset is None:
+            return
+        for asset in normalize_assets([item.asset], root_domain=self.root_domain):
+            if self.index.add(asset):
+                self.results.append(asset)
+                self.events.publish("asset", asset.dict())
+        self.progress.add("collect")
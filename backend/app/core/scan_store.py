@@ -1,5 +1,7 @@
-from typing import Dict
+from typing import Dict, List, Optional
 from app.models.scan_job import ScanJob
+from app.core.broker import get_broker, get_queue_backend
+from app.core.shared_store import get_result_store
 from uuid import uuid4
 
 SCAN_JOBS: Dict[str, ScanJob] = {}
@@ -14,3 +16,20 @@ def create_scan_job(target: str) -> ScanJob:
     )
     SCAN_JOBS[job_id] = job
     return job
+
+
+def lookup_scan_job(job_id: str) -> Optional[ScanJob]:
+    """Current job state, read from the broker when scans run in worker processes."""
+    if get_queue_backend() == "broker":
+        shared = get_broker().get_job(job_id)
+        if shared is not None:
+            return shared
+    return SCAN_JOBS.get(job_id)
+
+
+def lookup_scan_results(job_id: str) -> Optional[List]:
+    if job_id in SCAN_RESULTS:
+        return SCAN_RESULTS[job_id]
+    if get_queue_backend() == "broker":
+        return get_result_store().get_results(job_id)
+    return None
@@ -1,28 +1,374 @@
+"""
+Continuous EASM scheduler.
+
+One thread drives every monitored target from a timer heap ordered by next
+run time, instead of a sleeping thread per target. Each target has exactly
+one schedule (scheduling it again updates the interval). Run times are
+jittered by ±`scheduler.jitter` of the interval, and overdue schedules
+restored at startup are spread over the jitter window, so targets
+scheduled together do not fire together.
+
+Due scans are submitted to the scan job queue at low priority. At most
+`scheduler.max_concurrent_scans` scheduled scans are queued or running at
+once: the scheduler keeps the ids of the scans it dispatched and polls only
+those (outside its lock, since in broker mode that reads the broker) every
+`ACTIVE_POLL_SECONDS` to free their slots. Targets that come due while the
+cap is reached are parked in order and dispatched as slots free up. A
+target whose previous scan has not finished skips a cycle.
+
+Schedules are persisted to `scheduler.store_path`, at most once every
+`SAVE_INTERVAL` seconds, and restored on startup.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
 import threading
 import time
-from app.core.scan_store import create_scan_job
-from app.core.scan_orchestrator import run_scan
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.core.ct_cache import BACKEND_DIR
+from app.core.job_queue import QueueFull, submit_scan
 from app.core.logger import logger
+from app.core.scan_store import SCAN_JOBS, create_scan_job, lookup_scan_job
+from app.models.scan_job import ScanJob
+
+DEFAULT_STORE_PATH = "data/schedules.json"
+DEFAULT_MAX_CONCURRENT_SCANS = 4
+DEFAULT_JITTER = 0.1
+# How often the scans the scheduler dispatched are checked for completion
+ACTIVE_POLL_SECONDS = 5.0
+# Schedule changes are written out at most this often
+SAVE_INTERVAL = 1.0
+
+ACTIVE_STATUSES = {"PENDING", "QUEUED", "DEFERRED", "RUNNING"}
+
+
+class ScanScheduler:
+    def __init__(
+        self,
+        store_path: Optional[str] = None,
+        max_concurrent_scans: int = DEFAULT_MAX_CONCURRENT_SCANS,
+        jitter: float = DEFAULT_JITTER
+    ):
+        self.store_path = store_path
+        self.max_concurrent_scans = max_concurrent_scans
+        self.jitter = jitter
+
+        self._schedules: Dict[str, dict] = {}
+        self._heap = []                 # (next_run, seq, target, generation)
+        self._seq = itertools.count()
+        self._running: Dict[str, str] = {}               # job_id -> target
+        self._parked: Deque[Tuple[str, int]] = deque()  # due, waiting for a slot
+        self._next_poll = 0.0
+        self._dirty = False
+        self._last_save = 0.0
+        self._cond = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def schedule(self, target: str, interval_sec: int) -> dict:
+        """Create or update the schedule for `target`; a new one runs right away."""
+        if interval_sec <= 0:
+            raise ValueError("interval must be positive")
+
+        with self._cond:
+            entry = self._schedules.get(target)
+            if entry is None:
+                entry = {
+                    "target": target,
+                    "interval_sec": int(interval_sec),
+                    "next_run": time.time(),
+                    "created_at": datetime.utcnow().isoformat(),
+                    "last_job_id": None,
+                    "last_run_at": None,
+                    "generation": 0,
+                }
+                self._schedules[target] = entry
+            else:
+                entry["interval_sec"] = int(interval_sec)
+                entry["next_run"] = min(entry["next_run"], self._next_run(entry))
+
+            self._push(entry)
+            self._dirty = True
+            self._ensure_thread()
+            self._cond.notify()
 
+            return self._public(entry)
 
-def schedule_scan(target: str, interval_sec: int):
-    def loop():
+    def stop(self, target: str) -> bool:
+        with self._cond:
+            entry = self._schedules.pop(target, None)
+            if entry is None:
+                return False
+            # Heap entries are invalidated lazily via the generation counter
+            entry["generation"] += 1
+            self._dirty = True
+            self._cond.notify()
+            return True
+
+    def list_schedules(self) -> List[dict]:
+        with self._cond:
+            return sorted(
+                (self._public(e) for e in self._schedules.values()),
+                key=lambda e: e["next_run"]
+            )
+
+    def get(self, target: str) -> Optional[dict]:
+        with self._cond:
+            entry = self._schedules.get(target)
+            return self._public(entry) if entry else None
+
+    def start(self):
+        """Restore persisted schedules and start the timer thread."""
+        with self._cond:
+            self._load()
+            self._ensure_thread()
+            self._cond.notify()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._save()
+
+    # -------------------------------------------------
+    # Timer loop
+    # -------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._loop,
+                name="easm-scheduler",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _push(self, entry: dict):
+        entry["generation"] += 1
+        heapq.heappush(
+            self._heap,
+            (entry["next_run"], next(self._seq), entry["target"], entry["generation"])
+        )
+
+    def _next_run(self, entry: dict, base: Optional[float] = None) -> float:
+        interval = entry["interval_sec"]
+        spread = interval * self.jitter
+        return (base or time.time()) + interval + random.uniform(-spread, spread)
+
+    @staticmethod
+    def _is_active(job_id: Optional[str]) -> bool:
+        job = lookup_scan_job(job_id) if job_id else None
+        return job is not None and job.status in ACTIVE_STATUSES
+
+    def _loop(self):
         while True:
+            with self._cond:
+                self._wait_for_work()
+                if self._stopped:
+                    return
+                polled = list(self._running) if time.time() >= self._next_poll else None
+
+            # Job lookups may read the broker: never while holding the lock
+            finished = [j for j in polled if not self._is_active(j)] if polled else []
+
+            with self._cond:
+                if polled is not None:
+                    self._next_poll = time.time() + ACTIVE_POLL_SECONDS
+                for job_id in finished:
+                    self._running.pop(job_id, None)
+                launch = self._take_due()
+
+            jobs = [self._dispatch(entry["target"]) for entry in launch]
+
+            with self._cond:
+                for entry, job in zip(launch, jobs):
+                    if job is None:
+                        continue
+                    self._running[job.job_id] = entry["target"]
+                    entry["last_job_id"] = job.job_id
+                    entry["last_run_at"] = datetime.utcnow().isoformat()
+                save_due = self._dirty and time.time() >= self._last_save + SAVE_INTERVAL
+
+            if save_due:
+                self._save()
+
+    def _wait_for_work(self):
+        """Block until a schedule is due, a parked target fits, or a poll/save is due."""
+        while not self._stopped:
+            if self._parked and len(self._running) < self.max_concurrent_scans:
+                return
+
+            wake_at = []
+            if self._heap:
+                wake_at.append(self._heap[0][0])
+            if self._running:
+                wake_at.append(self._next_poll)
+            if self._dirty:
+                wake_at.append(self._last_save + SAVE_INTERVAL)
+
+            if not wake_at:
+                self._cond.wait()
+                continue
+            delay = min(wake_at) - time.time()
+            if delay <= 0:
+                return
+            self._cond.wait(delay)
+
+    def _take_due(self) -> List[dict]:
+        """Entries to dispatch now, within the free slots; the rest are parked."""
+        launch = []
+
+        def free() -> int:
+            return self.max_concurrent_scans - len(self._running) - len(launch)
+
+        # Parked targets have waited longest, so they go first
+        while self._parked and free() > 0:
+            target, generation = self._parked.popleft()
+            entry = self._schedules.get(target)
+            if entry is not None and entry["generation"] == generation:
+                launch.append(entry)
+
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, target, generation = heapq.heappop(self._heap)
+            entry = self._schedules.get(target)
+            if entry is None or entry["generation"] != generation:
+                continue  # stopped or rescheduled
+
+            if entry["last_job_id"] in self._running:
+                # Previous scan of this target still queued/running: skip a cycle
+                entry["next_run"] = self._next_run(entry)
+                self._push(entry)
+                self._dirty = True
+            elif free() > 0:
+                launch.append(entry)
+            else:
+                self._parked.append((target, generation))
+
+        for entry in launch:
+            entry["next_run"] = self._next_run(entry)
+            self._push(entry)
+        if launch:
+            self._dirty = True
+        return launch
+
+    def _dispatch(self, target: str) -> Optional[ScanJob]:
+        job = create_scan_job(target)
+
+        try:
+            submit_scan(job, priority="low")
+        except QueueFull as e:
+            SCAN_JOBS.pop(job.job_id, None)
+            logger.error(f"Continuous scan not queued | target={target} error={e}")
+            return None
+        except Exception as e:
+            logger.error(f"Continuous scan failed: {e}")
+            return None
+
+        logger.info(
+            f"Continuous EASM scan queued | job_id={job.job_id} target={target}"
+        )
+        return job
+
+    # -------------------------------------------------
+    # Persistence
+    # -------------------------------------------------
+    @staticmethod
+    def _public(entry: dict) -> dict:
+        public = {k: v for k, v in entry.items() if k != "generation"}
+        public["next_run_at"] = datetime.utcfromtimestamp(entry["next_run"]).isoformat()
+        return public
+
+    def _save(self):
+        """Write the schedules out if they changed; the file is written without the lock held."""
+        with self._save_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                self._last_save = time.time()
+                data = [
+                    {k: v for k, v in e.items() if k != "generation"}
+                    for e in self._schedules.values()
+                ]
+
+            if not self.store_path:
+                return
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            tmp_path = f"{self.store_path}.tmp"
             try:
-                # ✅ ALWAYS create job via factory
-                job = create_scan_job(target)
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.store_path)
+            except OSError as e:
+                logger.error(f"Failed to persist schedules: {e}")
+
+    def _load(self):
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+
+        try:
+            with open(self.store_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load schedules: {e}")
+            return
+
+        now = time.time()
+        for item in data:
+            target = item.get("target")
+            if not target or target in self._schedules:
+                continue
+
+            entry = {**item, "generation": 0}
+            if entry.get("next_run", 0) < now:
+                # Spread overdue schedules out instead of firing them together
+                entry["next_run"] = now + random.uniform(0, entry["interval_sec"] * self.jitter)
+            self._schedules[target] = entry
+            self._push(entry)
+            if entry.get("last_job_id"):
+                # Possibly still running: holds a slot until the first poll says otherwise
+                self._running[entry["last_job_id"]] = target
+
+        logger.info(f"Schedules restored | count={len(self._schedules)}")
+
+
+def get_scheduler_settings() -> dict:
+    cfg = load_easm_config().get("scheduler", {}) or {}
+    return {
+        "store_path": str(BACKEND_DIR / cfg.get("store_path", DEFAULT_STORE_PATH)),
+        "max_concurrent_scans": int(cfg.get("max_concurrent_scans", DEFAULT_MAX_CONCURRENT_SCANS)),
+        "jitter": float(cfg.get("jitter", DEFAULT_JITTER)),
+    }
+
+
+def _refresh_scheduler(scheduler: ScanScheduler, settings: dict):
+    # The schedule store stays where it was opened until the next restart
+    with scheduler._cond:
+        scheduler.max_concurrent_scans = settings["max_concurrent_scans"]
+        scheduler.jitter = settings["jitter"]
+        scheduler._cond.notify()  # a higher cap may free parked targets
+
 
-                logger.info(
-                    f"Continuous EASM scan started | "
-                    f"job_id={job.job_id} target={target}"
-                )
+_SCHEDULER: ConfigBound[ScanScheduler] = ConfigBound(
+    get_scheduler_settings, lambda settings: ScanScheduler(**settings), _refresh_scheduler
+)
 
-                run_scan(job_id=job.job_id, target=target)
 
-            except Exception as e:
-                logger.error(f"Continuous scan failed: {e}")
+def get_scheduler() -> ScanScheduler:
+    return _SCHEDULER.get()
 
-            time.sleep(interval_sec)
 
-    thread = threading.Thread(target=loop, daemon=True)
-    thread.start()
+def schedule_scan(target: str, interval_sec: int) -> dict:
+    return get_scheduler().schedule(target, interval_sec)
@@ -0,0 +1,130 @@
+"""
+Shared scan result store.
+
+Worker processes write each finished job's assets, evidence and asset
+snapshot here; the API process reads them back (`lookup_scan_results()`,
+`evidence_store.lookup_evidence()`). The store lives in the same SQLite file as the
+broker and, like it, is single-host only.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.models.asset import Asset
+from app.models.asset_snapshot import AssetSnapshot
+from app.models.evidence import Evidence
+from app.core.broker import get_broker_config
+
+
+class SQLiteResultStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scan_results ("
+                " job_id TEXT PRIMARY KEY, assets TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scan_evidence ("
+                " evidence_id TEXT PRIMARY KEY, asset_id TEXT NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS scan_evidence_asset ON scan_evidence (asset_id)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS asset_snapshots ("
+                " snapshot_id TEXT PRIMARY KEY, target TEXT NOT NULL,"
+                " version INTEGER NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS asset_snapshots_target ON asset_snapshots (target, version)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -------------------------------------------------
+    # Results
+    # -------------------------------------------------
+    def save_results(self, job_id: str, assets: List[Asset]):
+        payload = json.dumps([json.loads(a.json()) for a in assets])
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scan_results (job_id, assets) VALUES (?, ?)",
+                (job_id, payload)
+            )
+
+    def get_results(self, job_id: str) -> Optional[List[Asset]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT assets FROM scan_results WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return [Asset(**a) for a in json.loads(row[0])]
+
+    # -------------------------------------------------
+    # Evidence
+    # -------------------------------------------------
+    def save_evidence(self, evidence: List[Evidence]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scan_evidence (evidence_id, asset_id, payload) VALUES (?, ?, ?)",
+                [(e.evidence_id, e.asset_id, e.json()) for e in evidence]
+            )
+
+    def load_evidence(self) -> Dict[str, List[Evidence]]:
+        """All stored evidence, keyed by asset id like EVIDENCE_STORE."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT asset_id, payload FROM scan_evidence").fetchall()
+
+        evidence: Dict[str, List[Evidence]] = {}
+        for asset_id, payload in rows:
+            evidence.setdefault(asset_id, []).append(Evidence(**json.loads(payload)))
+        return evidence
+
+    # -------------------------------------------------
+    # Snapshots
+    # -------------------------------------------------
+    def save_snapshot(self, snapshot: AssetSnapshot):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO asset_snapshots (snapshot_id, target, version, payload) "
+                "VALUES (?, ?, ?, ?)",
+                (snapshot.snapshot_id, snapshot.target, snapshot.snapshot_version, snapshot.json())
+            )
+
+    def load_snapshots(self, target: str) -> List[AssetSnapshot]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT payload FROM asset_snapshots WHERE target = ? ORDER BY version",
+                (target,)
+            ).fetchall()
+        return [AssetSnapshot(**json.loads(r[0])) for r in rows]
+
+
+_STORE: Optional[SQLiteResultStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_result_store() -> SQLiteResultStore:
+    global _STORE
+
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = SQLiteResultStore(get_broker_config()["path"])
+
+    return _STORE
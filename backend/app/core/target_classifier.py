@@ -1,7 +1,11 @@
 import re
 from app.models.scan_type import ScanType
+from app.engines.discovery.ip_discovery import validate_network_target
 
 IP_REGEX = r"^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$"
+CIDR_REGEX = r"^(?:[0-9]{1,3}\.){3}[0-9]{1,3}/[0-9]{1,2}$"
+# Full range (203.0.113.10-203.0.113.50) or last-octet shorthand (203.0.113.10-50)
+IP_RANGE_REGEX = r"^(?:[0-9]{1,3}\.){3}[0-9]{1,3}-(?:(?:[0-9]{1,3}\.){3})?[0-9]{1,3}$"
 DOMAIN_REGEX = r"^(?!-)[A-Za-z0-9-]{1,63}(?<!-)\.(?:[A-Za-z]{2,})$"
 URL_REGEX = r"^https?://"
 
@@ -11,6 +15,9 @@ def detect_scan_type(target: str) -> ScanType:
     if re.match(IP_REGEX, target):
         return ScanType.IP
 
+    if re.match(CIDR_REGEX, target) or re.match(IP_RANGE_REGEX, target):
+        return ScanType.NETWORK
+
     if re.match(URL_REGEX, target):
         return ScanType.API  # future-ready
 
@@ -18,3 +25,14 @@ def detect_scan_type(target: str) -> ScanType:
         return ScanType.DOMAIN
 
     raise ValueError(f"Unable to detect scan type for target: {target}")
+
+def validate_target(target: str) -> ScanType:
+    """
+    `detect_scan_type`, plus the checks a network target needs before it is
+    queued: valid addresses and prefix, a forward range and at most
+    `network_scan.max_hosts` hosts. Raises ValueError otherwise.
+    """
+    scan_type = detect_scan_type(target)
+    if scan_type == ScanType.NETWORK:
+        validate_network_target(target.strip())
+    return scan_type
@@ -20,9 +20,10 @@ These evidence types are compatible with future AI-focused attack chains
 but do not change existing BAS simulator logic.
 """
 
-import requests
 from app.core.evidence_store import add_evidence
 from app.core.evidence_factory import create_evidence
+from app.core.pattern_matcher import register_pattern_group
+from app.engines.discovery.http_probe import HttpCapture
 
 
 # Keywords and patterns that suggest prompt injection vulnerabilities
@@ -140,256 +141,214 @@ LANGUAGE_AMBIGUITY_INDICATORS = [
 ]
 
 
-def scan_ai_ethics_risk(asset_id: str, url: str, timeout: float = 5.0):
+# All indicator lists are matched in a single pass over the response body
+register_pattern_group("ai.prompt_injection", PROMPT_INJECTION_INDICATORS)
+register_pattern_group("ai.model_overexposure", MODEL_OVEREXPOSURE_INDICATORS)
+register_pattern_group("ai.training_data_leak", TRAINING_DATA_LEAK_INDICATORS)
+register_pattern_group("ai.unsafe_tool_call", UNSAFE_TOOL_CALL_INDICATORS)
+register_pattern_group("ai_ethics.jailbreak", JAILBREAK_INDICATORS)
+register_pattern_group("ai_ethics.harmful_intent", HARMFUL_INTENT_INDICATORS)
+register_pattern_group("ai_ethics.context_override", CONTEXT_OVERRIDE_INDICATORS)
+register_pattern_group("ai_ethics.language_ambiguity", LANGUAGE_AMBIGUITY_INDICATORS)
+
+
+def analyze_ai_ethics_risk(asset_id: str, capture: HttpCapture):
     """
-    Scan an HTTP service for AI misuse and ethics risk indicators.
+    Record AI misuse and ethics risk indicators found in a captured response.
     Detection-only: generates evidence without filtering or enforcement.
-    
-    Args:
-        asset_id: The asset identifier for evidence attribution
-        url: The URL to scan
-        timeout: HTTP request timeout in seconds
     """
-    try:
-        resp = requests.get(
-            url,
-            timeout=timeout,
-            allow_redirects=True,
-            headers={"User-Agent": "AI-Breach-Scanner/1.0"}
-        )
+    url = capture.url
+    hits = capture.matches()
 
-        body = resp.text.lower()
-        
-        # ====================================================
-        # CHECK 1: Jailbreak-like Prompt Patterns
-        # ====================================================
-        for indicator in JAILBREAK_INDICATORS:
-            if indicator.lower() in body:
-                confidence = "high" if len(indicator) > 5 else "medium"
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="ai_ethics",
-                    type="jailbreak_attempt_detected",
-                    source="ai_ethics_scan",
-                    confidence=confidence,
-                    strength="strong",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "pattern_type": "guardrail_bypass",
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # ====================================================
-        # CHECK 2: Harmful Intent Indicators
-        # ====================================================
-        for indicator in HARMFUL_INTENT_INDICATORS:
-            if indicator.lower() in body:
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="ai_ethics",
-                    type="harmful_intent_indicator",
-                    source="ai_ethics_scan",
-                    confidence="high",
-                    strength="strong",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "pattern_type": "harmful_use_case",
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # ====================================================
-        # CHECK 3: Context Override Attempt Patterns
-        # ====================================================
-        for indicator in CONTEXT_OVERRIDE_INDICATORS:
-            if indicator.lower() in body:
-                confidence = "high" if len(indicator) > 10 else "medium"
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="ai_ethics",
-                    type="context_override_attempt",
-                    source="ai_ethics_scan",
-                    confidence=confidence,
-                    strength="moderate",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "pattern_type": "prompt_manipulation",
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # ====================================================
-        # CHECK 4: Language Ambiguity Risks
-        # ====================================================
-        for indicator in LANGUAGE_AMBIGUITY_INDICATORS:
-            if indicator.lower() in body:
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="ai_ethics",
-                    type="language_ambiguity_risk",
-                    source="ai_ethics_scan",
-                    confidence="medium",
-                    strength="weak",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "pattern_type": "context_framing",
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        return {
-            "scanned": True,
-            "url": url,
-            "status_code": resp.status_code,
-            "scan_type": "ai_ethics",
-        }
-
-    except requests.exceptions.Timeout:
-        return {"scanned": False, "error": "Timeout"}
-    except requests.exceptions.ConnectionError:
-        return {"scanned": False, "error": "Connection refused"}
-    except Exception as e:
-        return {"scanned": False, "error": str(e)}
+    # ====================================================
+    # CHECK 1: Jailbreak-like Prompt Patterns
+    # ====================================================
+    found = hits["ai_ethics.jailbreak"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        confidence = "high" if len(indicator) > 5 else "medium"
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="ai_ethics",
+            type="jailbreak_attempt_detected",
+            source="ai_ethics_scan",
+            confidence=confidence,
+            strength="strong",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "pattern_type": "guardrail_bypass",
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
+    
+    # ====================================================
+    # CHECK 2: Harmful Intent Indicators
+    # ====================================================
+    found = hits["ai_ethics.harmful_intent"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="ai_ethics",
+            type="harmful_intent_indicator",
+            source="ai_ethics_scan",
+            confidence="high",
+            strength="strong",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "pattern_type": "harmful_use_case",
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
+    
+    # ====================================================
+    # CHECK 3: Context Override Attempt Patterns
+    # ====================================================
+    found = hits["ai_ethics.context_override"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        confidence = "high" if len(indicator) > 10 else "medium"
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="ai_ethics",
+            type="context_override_attempt",
+            source="ai_ethics_scan",
+            confidence=confidence,
+            strength="moderate",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "pattern_type": "prompt_manipulation",
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
+    
+    # ====================================================
+    # CHECK 4: Language Ambiguity Risks
+    # ====================================================
+    found = hits["ai_ethics.language_ambiguity"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="ai_ethics",
+            type="language_ambiguity_risk",
+            source="ai_ethics_scan",
+            confidence="medium",
+            strength="weak",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "pattern_type": "context_framing",
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
 
 
-def scan_ai_evidence(asset_id: str, url: str, timeout: float = 5.0):
+def analyze_ai_evidence(asset_id: str, capture: HttpCapture):
     """
-    Scan an HTTP service for AI-specific security indicators.
+    Record AI-specific security indicators found in a captured response.
     Records evidence findings without modifying asset risk tags.
-    
-    Args:
-        asset_id: The asset identifier for evidence attribution
-        url: The URL to scan
-        timeout: HTTP request timeout in seconds
     """
-    try:
-        resp = requests.get(
-            url,
-            timeout=timeout,
-            allow_redirects=True,
-            headers={"User-Agent": "AI-Breach-Scanner/1.0"}
-        )
-
-        headers = {k.lower(): v for k, v in resp.headers.items()}
-        body = resp.text.lower()
-        
-        # ====================================================
-        # CHECK 1: Prompt Injection Vulnerability Indicators
-        # ====================================================
-        for indicator in PROMPT_INJECTION_INDICATORS:
-            if indicator.lower() in body:
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="application",
-                    type="prompt_injection_detected",
-                    source="ai_evidence_scan",
-                    confidence="medium",
-                    strength="moderate",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # ====================================================
-        # CHECK 2: Model Overexposure Indicators
-        # ====================================================
-        for indicator in MODEL_OVEREXPOSURE_INDICATORS:
-            if indicator.lower() in body:
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="application",
-                    type="model_overexposure",
-                    source="ai_evidence_scan",
-                    confidence="high",
-                    strength="strong",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "headers": dict(headers),
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # ====================================================
-        # CHECK 3: Training Data Leak Risk Indicators
-        # ====================================================
-        for indicator in TRAINING_DATA_LEAK_INDICATORS:
-            if indicator.lower() in body:
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="exposure",
-                    type="training_data_leak_risk",
-                    source="ai_evidence_scan",
-                    confidence="high",
-                    strength="strong",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # ====================================================
-        # CHECK 4: Unsafe Tool Call Indicators
-        # ====================================================
-        for indicator in UNSAFE_TOOL_CALL_INDICATORS:
-            if indicator.lower() in body:
-                add_evidence(create_evidence(
-                    asset_id=asset_id,
-                    category="application",
-                    type="unsafe_tool_call",
-                    source="ai_evidence_scan",
-                    confidence="high",
-                    strength="strong",
-                    observed_value=indicator,
-                    raw_proof={
-                        "url": url,
-                        "indicator_found": indicator,
-                        "status_code": resp.status_code,
-                    }
-                ))
-                break  # Only record once per service
-        
-        # 🔹 NEW: Also scan for AI ethics and misuse risks
-        scan_ai_ethics_risk(asset_id, url, timeout)
-        
-        return {
-            "scanned": True,
-            "url": url,
-            "status_code": resp.status_code,
-            "evidence_types": [
-                "prompt_injection",
-                "model_overexposure",
-                "training_data_leak",
-                "unsafe_tool_call",
-                "ai_ethics_risks",
-            ]
-        }
+    url = capture.url
+    headers = capture.headers
+    hits = capture.matches()
 
-    except requests.exceptions.Timeout:
-        return {"scanned": False, "error": "Timeout"}
-    except requests.exceptions.ConnectionError:
-        return {"scanned": False, "error": "Connection refused"}
-    except Exception as e:
-        return {"scanned": False, "error": str(e)}
+    # ====================================================
+    # CHECK 1: Prompt Injection Vulnerability Indicators
+    # ====================================================
+    found = hits["ai.prompt_injection"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="application",
+            type="prompt_injection_detected",
+            source="ai_evidence_scan",
+            confidence="medium",
+            strength="moderate",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
+    
+    # ====================================================
+    # CHECK 2: Model Overexposure Indicators
+    # ====================================================
+    found = hits["ai.model_overexposure"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="application",
+            type="model_overexposure",
+            source="ai_evidence_scan",
+            confidence="high",
+            strength="strong",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "headers": dict(headers),
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
+    
+    # ====================================================
+    # CHECK 3: Training Data Leak Risk Indicators
+    # ====================================================
+    found = hits["ai.training_data_leak"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="exposure",
+            type="training_data_leak_risk",
+            source="ai_evidence_scan",
+            confidence="high",
+            strength="strong",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
+    
+    # ====================================================
+    # CHECK 4: Unsafe Tool Call Indicators
+    # ====================================================
+    found = hits["ai.unsafe_tool_call"]
+    if found:
+        indicator = found[0]  # Only record once per service
+        add_evidence(create_evidence(
+            asset_id=asset_id,
+            category="application",
+            type="unsafe_tool_call",
+            source="ai_evidence_scan",
+            confidence="high",
+            strength="strong",
+            observed_value=indicator,
+            raw_proof={
+                "url": url,
+                "indicator_found": indicator,
+                "status_code": capture.status_code,
+                **capture.capture_info(),
+            }
+        ))
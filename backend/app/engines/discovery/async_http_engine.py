@@ -0,0 +1,500 @@
+"""
+Asynchronous HTTP fingerprinting engine.
+
+A small HTTP/1.1 client built on asyncio streams runs on the shared scan
+event loop and probes many URLs concurrently. Connections are kept alive
+and pooled per (scheme, host, port) for at most `idle_timeout` seconds,
+with no more than `max_idle` parked in total, so probing thousands of
+one-off hosts does not pile up idle sockets. Two semaphores bound the work:
+one caps requests in flight per host (dropped once the host has no
+requests), the other caps them process-wide.
+
+Responses are captured as `HttpCapture`s, capped by `http_probe.max_body_bytes`
+and `http_probe.read_deadline`, and handed to the analyzer registry in
+`http_analyzers` (fingerprinting: http_service_detected,
+login_interface_detected, admin_interface_detected, api_endpoint_detected,
+auth_missing; plus the AI evidence checks).
+"""
+
+import asyncio
+import codecs
+import ssl
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from app.core.async_runtime import run_sync
+from app.core.cancellation import CancelToken
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.core.rate_limiter import get_rate_limiter, is_ip_address
+from app.engines.discovery.http_probe import (
+    DEFAULT_MAX_BODY_BYTES,
+    DEFAULT_READ_DEADLINE,
+    USER_AGENT,
+    HttpCapture,
+    get_probe_limits,
+)
+from app.engines.discovery.dns_resolver import get_resolver
+from app.engines.discovery.http_analyzers import run_http_analyzers
+
+DEFAULT_MAX_CONNECTIONS = 500
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 6
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_IDLE_TIMEOUT = 5.0
+DEFAULT_MAX_IDLE = 100
+MAX_REDIRECTS = 5
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+
+
+class HttpProtocolError(Exception):
+    pass
+
+
+# Failures that mean "service could not be fetched" rather than a bug
+CAPTURE_ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HttpProtocolError, ValueError)
+
+
+class AsyncHttpResponse:
+    __slots__ = ("status_code", "headers", "body", "truncated_reason")
+
+    def __init__(self, status_code: int, headers: Dict[str, str], body: bytes, truncated_reason: Optional[str]):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.truncated_reason = truncated_reason
+
+    @property
+    def encoding(self) -> str:
+        content_type = self.headers.get("content-type", "")
+        for param in content_type.split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip("\"'")
+        # Match requests: text/* without a charset defaults to ISO-8859-1
+        return "iso-8859-1" if content_type.startswith("text/") else "utf-8"
+
+
+class _Connection:
+    __slots__ = ("reader", "writer", "parked_at")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.parked_at = 0.0
+
+    def is_usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncHttpClient:
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        read_deadline: float = DEFAULT_READ_DEADLINE,
+        verify_tls: bool = True,
+        rate_limit: Optional[str] = "http",
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        max_idle: int = DEFAULT_MAX_IDLE
+    ):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.read_deadline = read_deadline
+        # Per-target budget every request is charged to (None = unthrottled)
+        self.rate_limit = rate_limit
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+
+        self._ssl = ssl.create_default_context()
+        if not verify_tls:
+            self._ssl.check_hostname = False
+            self._ssl.verify_mode = ssl.CERT_NONE
+
+        # Created lazily so they bind to the scan event loop
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+        self._idle: Dict[Tuple[str, str, int], List[_Connection]] = {}
+        self._idle_count = 0
+        self._reaper: Optional[asyncio.TimerHandle] = None
+
+        self.connections_opened = 0
+
+    # -------------------------------------------------
+    # Connection pool
+    # -------------------------------------------------
+    def _slots_for(self, host: str) -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        """Slots for one request to `host`; pair with `_done_with(host)`."""
+        if self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(self.max_connections)
+        host_slots = self._host_slots.get(host)
+        if host_slots is None:
+            host_slots = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        return self._global_slots, host_slots
+
+    def _done_with(self, host: str):
+        # Forget the host's semaphore once nobody holds or waits on it
+        users = self._host_users.get(host, 1) - 1
+        if users > 0:
+            self._host_users[host] = users
+        else:
+            self._host_users.pop(host, None)
+            self._host_slots.pop(host, None)
+
+    def _take_idle(self, key: Tuple[str, str, int]) -> Optional[_Connection]:
+        idle = self._idle.get(key)
+        conn = idle.pop() if idle else None
+        if conn is not None:
+            self._idle_count -= 1
+            if not idle:
+                del self._idle[key]
+        return conn
+
+    def _reap(self):
+        """Close parked connections older than `idle_timeout` or no longer usable."""
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            keep = []
+            for conn in self._idle[key]:
+                if conn.parked_at >= cutoff and conn.is_usable():
+                    keep.append(conn)
+                else:
+                    conn.close()
+                    self._idle_count -= 1
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+
+    def _schedule_reap(self):
+        if self._reaper is not None or not self._idle:
+            return
+
+        def run():
+            self._reaper = None
+            self._reap()
+            self._schedule_reap()
+
+        self._reaper = asyncio.get_running_loop().call_later(self.idle_timeout, run)
+
+    async def _connect(self, key: Tuple[str, str, int]) -> Tuple[_Connection, bool]:
+        cutoff = time.monotonic() - self.idle_timeout
+        while True:
+            conn = self._take_idle(key)
+            if conn is None:
+                break
+            if conn.parked_at >= cutoff and conn.is_usable():
+                return conn, True
+            conn.close()
+
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host,
+                port,
+                ssl=self._ssl if scheme == "https" else None,
+                server_hostname=host if scheme == "https" else None
+            ),
+            self.timeout
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer), False
+
+    def _release(self, key: Tuple[str, str, int], conn: _Connection, reusable: bool):
+        if not reusable or not conn.is_usable() or self.idle_timeout <= 0:
+            conn.close()
+            return
+
+        if self._idle_count >= self.max_idle:
+            self._reap()
+        if self._idle_count >= self.max_idle or len(self._idle.get(key, ())) >= self.max_connections_per_host:
+            conn.close()
+            return
+
+        conn.parked_at = time.monotonic()
+        self._idle.setdefault(key, []).append(conn)
+        self._idle_count += 1
+        self._schedule_reap()
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for conns in self._idle.values():
+            for conn in conns:
+                conn.close()
+        self._idle.clear()
+        self._idle_count = 0
+
+    # -------------------------------------------------
+    # Request / response
+    # -------------------------------------------------
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str], deadline: float):
+        """Return (body, truncated_reason, connection_reusable)."""
+        parts: List[bytes] = []
+        received = 0
+
+        async def read(method, *args):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            return await asyncio.wait_for(method(*args), min(remaining, self.timeout))
+
+        try:
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size_line = await read(reader.readline)
+                    size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                    if size == 0:
+                        while (await read(reader.readline)).strip():
+                            pass  # trailers
+                        return b"".join(parts), None, True
+                    chunk = await read(reader.readexactly, size + 2)
+                    received += size
+                    parts.append(chunk[:size])
+                    if received > self.max_body_bytes:
+                        break
+
+            elif "content-length" in headers:
+                length = int(headers["content-length"])
+                to_read = min(length, self.max_body_bytes + 1)
+                while received < to_read:
+                    chunk = await read(reader.read, min(65536, to_read - received))
+                    if not chunk:
+                        raise HttpProtocolError("Connection closed mid-body")
+                    received += len(chunk)
+                    parts.append(chunk)
+                if length <= self.max_body_bytes:
+                    return b"".join(parts), None, True
+
+            else:
+                while received <= self.max_body_bytes:
+                    chunk = await read(reader.read, 65536)
+                    if not chunk:
+                        return b"".join(parts), None, False
+                    received += len(chunk)
+                    parts.append(chunk)
+
+        except asyncio.TimeoutError:
+            return b"".join(parts)[:self.max_body_bytes], "deadline", False
+
+        return b"".join(parts)[:self.max_body_bytes], "size_limit", False
+
+    async def _address_of(self, host: str) -> Optional[str]:
+        """The address a hostname resolves to (from the resolver cache after the scan's DNS stage)."""
+        if is_ip_address(host):
+            return None
+        answer = await get_resolver().resolve(host)
+        addresses = answer["a"] or answer["aaaa"]
+        return addresses[0] if addresses else None
+
+    async def _send(self, method: str, url: str, body: Optional[bytes], headers: Optional[Dict[str, str]]):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise HttpProtocolError(f"Unsupported URL: {url}")
+
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+
+        if self.rate_limit:
+            await get_rate_limiter().acquire_async(
+                self.rate_limit, host, ip=await self._address_of(host)
+            )
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        host_header = f"[{host}]" if ":" in host else host
+        if parts.port:
+            host_header += f":{parts.port}"
+
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {host_header}",
+            f"User-Agent: {USER_AGENT}",
+            "Accept: */*",
+            "Accept-Encoding: identity",
+            "Connection: keep-alive",
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+        global_slots, host_slots = self._slots_for(host)
+        try:
+            # Per-host slot first, so requests queued behind a busy host don't
+            # hold global slots other hosts could use
+            async with host_slots, global_slots:
+                return await self._exchange(key, method, url, request)
+        finally:
+            self._done_with(host)
+
+    async def _exchange(self, key: Tuple[str, str, int], method: str, url: str, request: bytes):
+        """Send `request` on a pooled connection to `key` and read the response."""
+        for attempt in range(2):
+            conn, reused = await self._connect(key)
+            try:
+                conn.writer.write(request)
+                await asyncio.wait_for(conn.writer.drain(), self.timeout)
+                status_line = await asyncio.wait_for(conn.reader.readline(), self.timeout)
+            except (OSError, asyncio.IncompleteReadError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # stale keep-alive connection; retry on a fresh one
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if not status_line and reused and attempt == 0:
+                conn.close()
+                continue
+            break
+
+        try:
+            version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+            status_code = int(status)
+        except ValueError:
+            conn.close()
+            raise HttpProtocolError(f"Malformed status line from {url}: {status_line[:80]!r}")
+
+        try:
+            response_headers: Dict[str, str] = {}
+            while True:
+                line = await asyncio.wait_for(conn.reader.readline(), self.timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+
+            if method == "HEAD" or status_code in (204, 304) or 100 <= status_code < 200:
+                payload, truncated_reason, reusable = b"", None, True
+            else:
+                payload, truncated_reason, reusable = await self._read_body(
+                    conn.reader,
+                    response_headers,
+                    time.monotonic() + self.read_deadline
+                )
+        except BaseException:
+            conn.close()
+            raise
+
+        connection_header = response_headers.get("connection", "").lower()
+        if connection_header == "close" or (version == "HTTP/1.0" and connection_header != "keep-alive"):
+            reusable = False
+        self._release(key, conn, reusable)
+
+        return AsyncHttpResponse(status_code, response_headers, payload, truncated_reason)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        follow_redirects: bool = True
+    ) -> AsyncHttpResponse:
+        response = await self._send(method, url, body, headers)
+
+        redirects = 0
+        while follow_redirects and response.status_code in REDIRECT_CODES and "location" in response.headers:
+            redirects += 1
+            if redirects > MAX_REDIRECTS:
+                raise HttpProtocolError(f"Too many redirects for {url}")
+            url = urljoin(url, response.headers["location"])
+            if response.status_code in (301, 302, 303):
+                method, body = "GET", None
+            response = await self._send(method, url, body, headers)
+
+        return response
+
+    async def capture(self, url: str) -> HttpCapture:
+        """GET `url` and package it the way HTTP analyzers expect."""
+        response = await self.request("GET", url)
+        decoder = codecs.getincrementaldecoder("utf-8")
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding)
+        except LookupError:
+            pass
+        text = decoder(errors="replace").decode(response.body, final=True).lower()
+
+        return HttpCapture(
+            url,
+            response.status_code,
+            response.headers,
+            text,
+            body_bytes=len(response.body),
+            truncated=response.truncated_reason is not None,
+            truncated_reason=response.truncated_reason
+        )
+
+
+def get_http_client_settings() -> dict:
+    probe_cfg = load_easm_config().get("http_probe", {}) or {}
+    limits = get_probe_limits()
+    return {
+        "max_connections": int(probe_cfg.get("max_connections", DEFAULT_MAX_CONNECTIONS)),
+        "max_connections_per_host": int(
+            probe_cfg.get("max_connections_per_host", DEFAULT_MAX_CONNECTIONS_PER_HOST)
+        ),
+        "timeout": float(probe_cfg.get("timeout", DEFAULT_TIMEOUT)),
+        "max_body_bytes": limits["max_body_bytes"],
+        "read_deadline": limits["read_deadline"],
+        "verify_tls": bool(probe_cfg.get("verify_tls", True)),
+        "idle_timeout": float(probe_cfg.get("idle_timeout", DEFAULT_IDLE_TIMEOUT)),
+        "max_idle": int(probe_cfg.get("max_idle_connections", DEFAULT_MAX_IDLE)),
+    }
+
+
+# Rebuilt when `http_probe` changes; the old client's parked connections
+# are closed by its idle reaper
+_CLIENT: ConfigBound[AsyncHttpClient] = ConfigBound(
+    get_http_client_settings, lambda settings: AsyncHttpClient(**settings)
+)
+
+
+def get_async_http_client() -> AsyncHttpClient:
+    return _CLIENT.get()
+
+
+async def capture_http_services_async(
+    urls: Iterable[str],
+    client: Optional[AsyncHttpClient] = None,
+    cancel: Optional[CancelToken] = None
+) -> List[Optional[HttpCapture]]:
+    """
+    Fetch every URL concurrently; unreachable services come back as None,
+    as do requests not started, or cut short, by a tripped `cancel` token.
+    """
+    client = client or get_async_http_client()
+
+    async def fetch(url: str) -> Optional[HttpCapture]:
+        remaining = cancel.remaining() if cancel is not None else None
+        if remaining == 0:
+            return None
+        try:
+            return await asyncio.wait_for(client.capture(url), remaining)
+        except CAPTURE_ERRORS:
+            return None
+
+    return list(await asyncio.gather(*(fetch(url) for url in urls)))
+
+
+def capture_http_services(
+    urls: Iterable[str],
+    client: Optional[AsyncHttpClient] = None,
+    cancel: Optional[CancelToken] = None
+) -> List[Optional[HttpCapture]]:
+    """Blocking wrapper around `capture_http_services_async` on the scan loop."""
+    return run_sync(capture_http_services_async(urls, client, cancel))
@@ -0,0 +1,360 @@
+"""
+Concurrent, cached DNS resolution.
+
+Queries are sent over UDP straight to the configured nameservers from the
+shared scan event loop, so thousands of names can be resolved concurrently
+without a thread per lookup. Every answer carries all A, AAAA and CNAME
+records, and results are cached in-process for the TTL the nameserver
+returned. The cache is module-level, so scan jobs and the continuous
+scheduler share it.
+
+If no nameserver answers, the system resolver is used as a fallback
+(A/AAAA only, cached for `fallback_ttl`).
+"""
+
+import asyncio
+import random
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.async_runtime import run_sync
+from app.core.config_loader import ConfigBound, load_easm_config
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_AAAA = 28
+CLASS_IN = 1
+
+RESOLV_CONF = Path("/etc/resolv.conf")
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_ATTEMPTS = 2
+DEFAULT_MAX_CONCURRENCY = 200
+DEFAULT_NEGATIVE_TTL = 60
+DEFAULT_FALLBACK_TTL = 300
+DEFAULT_MAX_TTL = 3600
+
+
+# -------------------------------------------------
+# Wire format
+# -------------------------------------------------
+def build_query(query_id: int, name: str, qtype: int) -> bytes:
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)  # RD set
+    qname = b""
+    for label in name.rstrip(".").split("."):
+        encoded = label.encode("idna")
+        if not encoded or len(encoded) > 63:
+            raise ValueError(f"Invalid DNS label in {name!r}")
+        qname += bytes([len(encoded)]) + encoded
+    return header + qname + b"\x00" + struct.pack("!HH", qtype, CLASS_IN)
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    labels = []
+    end = None
+    jumps = 0
+
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if jumps > 16:
+                raise ValueError("DNS name compression loop")
+            pointer = struct.unpack("!H", data[offset:offset + 2])[0] & 0x3FFF
+            if end is None:
+                end = offset + 2
+            offset = pointer
+            jumps += 1
+            continue
+        if length == 0:
+            offset += 1
+            break
+        offset += 1
+        labels.append(data[offset:offset + length].decode("ascii", "replace"))
+        offset += length
+
+    return ".".join(labels).lower(), (end if end is not None else offset)
+
+
+def parse_response(data: bytes) -> Tuple[int, int, List[Tuple[str, int, int, str]]]:
+    """
+    Parse a DNS response into (query_id, rcode, answers), where each answer
+    is (owner_name, rtype, ttl, value) for A, AAAA and CNAME records.
+    """
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    rcode = flags & 0x000F
+    offset = 12
+
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+
+    answers = []
+    for _ in range(ancount):
+        owner, offset = _read_name(data, offset)
+        rtype, _, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata_offset = offset
+        offset += rdlength
+
+        if rtype == TYPE_A and rdlength == 4:
+            value = socket.inet_ntop(socket.AF_INET, data[rdata_offset:offset])
+        elif rtype == TYPE_AAAA and rdlength == 16:
+            value = socket.inet_ntop(socket.AF_INET6, data[rdata_offset:offset])
+        elif rtype == TYPE_CNAME:
+            value, _ = _read_name(data, rdata_offset)
+        else:
+            continue
+
+        answers.append((owner, rtype, ttl, value))
+
+    return query_id, rcode, answers
+
+
+# -------------------------------------------------
+# TTL cache (shared across jobs and the scheduler)
+# -------------------------------------------------
+class DnsCache:
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if not entry:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._entries[name]
+                return None
+            return result
+
+    def set(self, name: str, result: dict, ttl: int):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[name] = (time.monotonic() + ttl, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+DNS_CACHE = DnsCache()
+
+
+# -------------------------------------------------
+# UDP client
+# -------------------------------------------------
+class _DnsClientProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        query_id = struct.unpack("!H", data[:2])[0]
+        future = self.pending.pop(query_id, None)
+        if future and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP unreachable etc. — outstanding queries simply time out
+        pass
+
+
+def read_system_nameservers() -> List[Tuple[str, int]]:
+    if not RESOLV_CONF.exists():
+        return []
+
+    nameservers = []
+    for line in RESOLV_CONF.read_text().splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] == "nameserver":
+            nameservers.append((parts[1].split("%")[0], 53))
+    return nameservers
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower().rstrip(".")
+
+
+def _empty_result(name: str) -> dict:
+    return {"name": name, "a": [], "aaaa": [], "cname": []}
+
+
+class DnsResolver:
+    def __init__(
+        self,
+        nameservers: Optional[List[Tuple[str, int]]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        attempts: int = DEFAULT_ATTEMPTS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        negative_ttl: int = DEFAULT_NEGATIVE_TTL,
+        fallback_ttl: int = DEFAULT_FALLBACK_TTL,
+        max_ttl: int = DEFAULT_MAX_TTL,
+        cache: Optional[DnsCache] = None
+    ):
+        self.nameservers = nameservers if nameservers is not None else read_system_nameservers()
+        self.timeout = timeout
+        self.attempts = attempts
+        self.max_concurrency = max_concurrency
+        self.negative_ttl = negative_ttl
+        self.fallback_ttl = fallback_ttl
+        self.max_ttl = max_ttl
+        self.cache = cache if cache is not None else DNS_CACHE
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._endpoints: Dict[Tuple[str, int], Tuple[asyncio.DatagramTransport, _DnsClientProtocol]] = {}
+
+    async def _endpoint(self, nameserver: Tuple[str, int]):
+        endpoint = self._endpoints.get(nameserver)
+        if endpoint is None or endpoint[0].is_closing():
+            loop = asyncio.get_running_loop()
+            endpoint = await loop.create_datagram_endpoint(
+                _DnsClientProtocol,
+                remote_addr=nameserver
+            )
+            self._endpoints[nameserver] = endpoint
+        return endpoint
+
+    async def _query(self, name: str, qtype: int):
+        """Return (rcode, answers), or None if no nameserver replied."""
+        loop = asyncio.get_running_loop()
+
+        for _ in range(self.attempts):
+            for nameserver in self.nameservers:
+                transport, protocol = await self._endpoint(nameserver)
+
+                query_id = random.getrandbits(16)
+                while query_id in protocol.pending:
+                    query_id = random.getrandbits(16)
+
+                future = loop.create_future()
+                protocol.pending[query_id] = future
+                transport.sendto(build_query(query_id, name, qtype))
+
+                try:
+                    data = await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    continue
+                finally:
+                    protocol.pending.pop(query_id, None)
+
+                try:
+                    _, rcode, answers = parse_response(data)
+                except (ValueError, IndexError, struct.error):
+                    continue
+                return rcode, answers
+
+        return None
+
+    async def _system_resolve(self, name: str) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(name, None, type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            return None
+
+        result = _empty_result(name)
+        for family, _, _, _, sockaddr in infos:
+            key = "aaaa" if family == socket.AF_INET6 else "a"
+            if sockaddr[0] not in result[key]:
+                result[key].append(sockaddr[0])
+        return result
+
+    async def resolve(self, name: str) -> dict:
+        """
+        Resolve one name to {"name", "a", "aaaa", "cname"}.
+        Lookup failures return empty record lists rather than raising.
+        """
+        name = normalize_name(name)
+
+        cached = self.cache.get(name)
+        if cached is not None:
+            return cached
+
+        try:
+            build_query(0, name, TYPE_A)
+        except ValueError:
+            result = _empty_result(name)
+            self.cache.set(name, result, self.negative_ttl)
+            return result
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._slots:
+            replies = []
+            if self.nameservers:
+                replies = [
+                    r for r in await asyncio.gather(
+                        self._query(name, TYPE_A),
+                        self._query(name, TYPE_AAAA)
+                    )
+                    if r is not None
+                ]
+
+            if not replies:
+                result = await self._system_resolve(name) or _empty_result(name)
+                ttl = self.fallback_ttl if result["a"] or result["aaaa"] else self.negative_ttl
+                self.cache.set(name, result, ttl)
+                return result
+
+        result = _empty_result(name)
+        ttls = []
+        keys = {TYPE_A: "a", TYPE_AAAA: "aaaa", TYPE_CNAME: "cname"}
+
+        for _, answers in replies:
+            for _, rtype, ttl, value in answers:
+                bucket = result[keys[rtype]]
+                if value not in bucket:
+                    bucket.append(value)
+                ttls.append(ttl)
+
+        ttl = min(min(ttls), self.max_ttl) if ttls else self.negative_ttl
+        self.cache.set(name, result, ttl)
+        return result
+
+    async def resolve_many(self, names: Iterable[str]) -> Dict[str, dict]:
+        unique = list(dict.fromkeys(normalize_name(n) for n in names))
+        results = await asyncio.gather(*(self.resolve(n) for n in unique))
+        return dict(zip(unique, results))
+
+
+def get_resolver_settings() -> dict:
+    dns_cfg = load_easm_config().get("dns", {}) or {}
+    port = int(dns_cfg.get("port", 53))
+    nameservers = [
+        (str(ns), port) for ns in dns_cfg.get("nameservers") or []
+    ] or None
+    return {
+        "nameservers": nameservers,
+        "timeout": float(dns_cfg.get("timeout", DEFAULT_TIMEOUT)),
+        "attempts": int(dns_cfg.get("attempts", DEFAULT_ATTEMPTS)),
+        "max_concurrency": int(dns_cfg.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)),
+        "negative_ttl": int(dns_cfg.get("negative_ttl", DEFAULT_NEGATIVE_TTL)),
+        "fallback_ttl": int(dns_cfg.get("fallback_ttl", DEFAULT_FALLBACK_TTL)),
+        "max_ttl": int(dns_cfg.get("max_ttl", DEFAULT_MAX_TTL)),
+    }
+
+
+# Rebuilt when `dns` changes; answers stay in the module-level DNS_CACHE
+_RESOLVER: ConfigBound[DnsResolver] = ConfigBound(
+    get_resolver_settings, lambda settings: DnsResolver(**settings)
+)
+
+
+def get_resolver() -> DnsResolver:
+    return _RESOLVER.get()
+
+
+def resolve_hosts(names: Iterable[str]) -> Dict[str, dict]:
+    """Blocking helper: resolve many names concurrently on the scan loop."""
+    return run_sync(get_resolver().resolve_many(names))
@@ -1,79 +1,112 @@
-import socket
 from uuid import uuid4
-from typing import List
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 from app.core.evidence_store import add_evidence
 from app.models.evidence import Evidence
 from app.models.asset import Asset
-from app.engines.discovery.subdomain_discovery import discover_subdomains
+from app.core.cancellation import CancelToken
+from app.engines.discovery.subdomain_discovery import iter_subdomains
 from app.core.evidence_factory import create_evidence
+from app.engines.discovery.dns_resolver import normalize_name, resolve_hosts
 
 
-def resolve_ip(hostname: str) -> List[Asset]:
+def build_ip_index(hostnames: List[str], records: Dict[str, dict]) -> Dict[str, List[str]]:
     """
-    Resolve IP address for a hostname.
+    Map each resolved IP to every hostname pointing at it, in discovery
+    order. Hosts behind a shared load balancer or CDN edge collapse into
+    one entry, so the IP is port-scanned once per job.
     """
-    assets = []
-    try:
-        ip = socket.gethostbyname(hostname)
-        assets.append(
-            Asset(
-                asset_id=str(uuid4()),
-                asset_type="ip",
-                identifier=ip,
-                source="dns_lookup",
-                risk_tags=["internet_exposed"],
-            )
-        )
-    except Exception:
-        pass
+    index: Dict[str, List[str]] = {}
+    for hostname in hostnames:
+        record = records.get(normalize_name(hostname))
+        if not record:
+            continue
+        for ip in record["a"] + record["aaaa"]:
+            names = index.setdefault(ip, [])
+            if hostname not in names:
+                names.append(hostname)
+    return index
 
-    return assets
 
+def record_cname_evidence(asset_id: str, record: dict):
+    if not record["cname"]:
+        return
 
-def discover_domain(domain: str) -> List[Asset]:
-    assets: List[Asset] = []
+    add_evidence(create_evidence(
+        asset_id=asset_id,
+        category="discovery",
+        type="cname_detected",
+        source="dns_lookup",
+        confidence="high",
+        strength="weak",
+        observed_value=record["cname"][-1],
+        raw_proof=record
+    ))
 
+
+def iter_domain_assets(domain: str, cancel: Optional[CancelToken] = None) -> Iterator[Asset]:
+    """
+    Yield the root domain asset, then each subdomain as Certificate
+    Transparency discovery produces it (with subdomain_found evidence).
+    """
     # 1️⃣ Root domain asset
-    assets.append(
-        Asset(
-            asset_id=str(uuid4()),
-            asset_type="domain",
-            identifier=domain,
-            source="manual",
-            risk_tags=["internet_exposed"],
-        )
+    yield Asset(
+        asset_id=str(uuid4()),
+        asset_type="domain",
+        identifier=domain,
+        source="manual",
+        risk_tags=["internet_exposed"],
     )
 
-    # 2️⃣ Resolve IP for root domain
-    assets.extend(resolve_ip(domain))
-
-    # 3️⃣ Discover subdomains (PASSIVE)
+    # 2️⃣ Discover subdomains (PASSIVE)
     try:
-        subdomains = discover_subdomains(domain)
+        for sub in iter_subdomains(domain, cancel=cancel):
+            try:
+                add_evidence(create_evidence(
+                    asset_id=sub.asset_id,
+                    category="discovery",
+                    type="subdomain_found",
+                    source="cert_transparency",
+                    confidence="high",
+                    strength="moderate",
+                    observed_value=sub.identifier,
+                    raw_proof=None
+                ))
+            except Exception as e:
+                print(f"Failed to record evidence for {sub.identifier}: {e}")
+
+            yield sub
     except Exception as e:
         # Log but don't fail entire scan if subdomain discovery fails
         print(f"Subdomain discovery failed for {domain}: {e}")
-        subdomains = []
 
-    for sub in subdomains:
-        assets.append(sub)
 
-        try:
-            add_evidence(create_evidence(
-                asset_id=sub.asset_id,
-                category="discovery",
-                type="subdomain_found",
-                source="cert_transparency",
-                confidence="high",
-                strength="moderate",
-                observed_value=sub.identifier,
-                raw_proof=None
-            ))
-        except Exception as e:
-            print(f"Failed to record evidence for {sub.identifier}: {e}")
+def discover_domain(domain: str) -> List[Asset]:
+    domain_assets = list(iter_domain_assets(domain))
+    assets: List[Asset] = list(domain_assets)
+
+    # 3️⃣ Resolve root domain and all subdomains concurrently
+    try:
+        records = resolve_hosts(a.identifier for a in domain_assets)
+    except Exception as e:
+        print(f"DNS resolution failed for {domain}: {e}")
+        records = {}
+
+    for asset in domain_assets:
+        record = records.get(normalize_name(asset.identifier))
+        if record:
+            record_cname_evidence(asset.asset_id, record)
 
-        # 4️⃣ Resolve IPs for subdomains
-        assets.extend(resolve_ip(sub.identifier))
+    # 4️⃣ One IP asset per unique address, carrying every hostname behind it
+    ip_index = build_ip_index([a.identifier for a in domain_assets], records)
+    for ip, hostnames in ip_index.items():
+        assets.append(Asset(
+            asset_id=str(uuid4()),
+            asset_type="ip",
+            identifier=ip,
+            source="dns_lookup",
+            risk_tags=["internet_exposed"],
+            hostnames=hostnames,
+        ))
 
     return assets
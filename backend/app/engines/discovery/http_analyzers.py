@@ -0,0 +1,44 @@
+"""
+HTTP analyzer registry.
+
+`run_http_analyzers` runs every registered analyzer over one captured
+response. An analyzer is any callable taking `(asset_id, capture)` that
+records evidence.
+"""
+
+from typing import Callable, List, Optional
+
+from app.engines.discovery.http_probe import HttpCapture
+from app.engines.discovery.http_fingerprinting import analyze_http_fingerprint
+from app.engines.discovery.ai_evidence_engine import (
+    analyze_ai_evidence,
+    analyze_ai_ethics_risk,
+)
+
+HttpAnalyzer = Callable[[str, HttpCapture], None]
+
+HTTP_ANALYZERS: List[HttpAnalyzer] = [
+    analyze_http_fingerprint,
+    analyze_ai_evidence,
+    analyze_ai_ethics_risk,
+]
+
+
+def register_http_analyzer(analyzer: HttpAnalyzer) -> HttpAnalyzer:
+    """Add an analyzer to the shared HTTP stage (usable as a decorator)."""
+    if analyzer not in HTTP_ANALYZERS:
+        HTTP_ANALYZERS.append(analyzer)
+    return analyzer
+
+
+def run_http_analyzers(
+    asset_id: str,
+    capture: HttpCapture,
+    analyzers: Optional[List[HttpAnalyzer]] = None
+):
+    """Run `analyzers` (default: every registered one) over one capture."""
+    for analyzer in (HTTP_ANALYZERS if analyzers is None else analyzers):
+        try:
+            analyzer(asset_id, capture)
+        except Exception as e:
+            print(f"HTTP analyzer {analyzer.__name__} failed for {capture.url}: {e}")
@@ -0,0 +1,75 @@
+"""
+Shared HTTP capture.
+
+A web service is fetched once (by the async HTTP engine) and the captured
+response (status, lower-cased headers, capped lower-cased body) is handed
+to every analyzer, instead of each analyzer issuing its own request.
+
+Reading stops at `http_probe.max_body_bytes` or after
+`http_probe.read_deadline` seconds, whichever comes first, so per-probe
+memory is bounded by the byte cap and a slow-streaming endpoint cannot hold
+the scan past the deadline. Truncation is recorded on the capture and
+copied into evidence `raw_proof`.
+"""
+
+from typing import Dict, List, Optional
+
+from app.core.config_loader import load_easm_config
+from app.core.pattern_matcher import get_shared_matcher
+
+USER_AGENT = "AI-Breach-Scanner/1.0"
+DEFAULT_MAX_BODY_BYTES = 512 * 1024
+DEFAULT_READ_DEADLINE = 5.0
+
+
+class HttpCapture:
+    """Response data shared by all HTTP analyzers."""
+
+    __slots__ = (
+        "url", "status_code", "headers", "body",
+        "body_bytes", "truncated", "truncated_reason", "_matches",
+    )
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        headers: Dict[str, str],
+        body: str,
+        body_bytes: int = 0,
+        truncated: bool = False,
+        truncated_reason: Optional[str] = None
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.body_bytes = body_bytes
+        self.truncated = truncated
+        self.truncated_reason = truncated_reason  # "size_limit" | "deadline"
+        self._matches = None
+
+    def capture_info(self) -> dict:
+        """Capture metadata merged into evidence raw_proof."""
+        return {
+            "body_bytes": self.body_bytes,
+            "body_truncated": self.truncated,
+            "truncated_reason": self.truncated_reason,
+        }
+
+    def matches(self) -> Dict[str, List[str]]:
+        """
+        Keyword hits for every registered pattern group, computed in one
+        pass over the body the first time any analyzer asks.
+        """
+        if self._matches is None:
+            self._matches = get_shared_matcher().search(self.body)
+        return self._matches
+
+
+def get_probe_limits() -> dict:
+    probe_cfg = load_easm_config().get("http_probe", {}) or {}
+    return {
+        "max_body_bytes": int(probe_cfg.get("max_body_bytes", DEFAULT_MAX_BODY_BYTES)),
+        "read_deadline": float(probe_cfg.get("read_deadline", DEFAULT_READ_DEADLINE)),
+    }
@@ -1,13 +1,90 @@
+import ipaddress
 from uuid import uuid4
+from typing import Iterator, Optional, Tuple
 from app.models.asset import Asset
+from app.core.cancellation import CancelToken
+from app.core.config_loader import load_easm_config
+
+DEFAULT_MAX_NETWORK_HOSTS = 65536
+
+
+def build_ip_asset(ip: str, source: str = "direct_input") -> Asset:
+    return Asset(
+        asset_id=str(uuid4()),
+        asset_type="ip",
+        identifier=ip,
+        source=source,
+        risk_tags=["internet_exposed"]
+    )
+
 
 def discover_ip(ip: str):
-    return [
-        Asset(
-            asset_id=str(uuid4()),
-            asset_type="ip",
-            identifier=ip,
-            source="direct_input",
-            risk_tags=["internet_exposed"]
+    return [build_ip_asset(ip)]
+
+
+def parse_network_target(target: str) -> Tuple[ipaddress.IPv4Address, ipaddress.IPv4Address]:
+    """
+    Return the (first, last) host addresses of a CIDR block or range.
+    Network and broadcast addresses of a CIDR block are excluded, as in
+    `IPv4Network.hosts()`.
+    """
+    target = target.strip()
+
+    if "/" in target:
+        network = ipaddress.ip_network(target, strict=False)
+        if network.num_addresses <= 2:
+            return network[0], network[-1]
+        return network[1], network[-2]
+
+    start_str, end_str = target.split("-", 1)
+    start = ipaddress.ip_address(start_str.strip())
+    end_str = end_str.strip()
+    if "." not in end_str:
+        # Last-octet shorthand: 203.0.113.10-50
+        end_str = start_str.rsplit(".", 1)[0] + "." + end_str
+    end = ipaddress.ip_address(end_str)
+
+    if end < start:
+        raise ValueError(f"Invalid address range: {target}")
+    return start, end
+
+
+def count_network_hosts(target: str) -> int:
+    start, end = parse_network_target(target)
+    return int(end) - int(start) + 1
+
+
+def get_max_network_hosts() -> int:
+    return int(
+        load_easm_config().get("network_scan", {}).get("max_hosts", DEFAULT_MAX_NETWORK_HOSTS)
+    )
+
+
+def validate_network_target(target: str) -> int:
+    """
+    Host count of a CIDR block or range. Raises ValueError for bad
+    addresses or prefixes, reversed ranges and targets larger than
+    `network_scan.max_hosts`.
+    """
+    host_count = count_network_hosts(target)
+    max_hosts = get_max_network_hosts()
+    if host_count > max_hosts:
+        raise ValueError(
+            f"Network target {target} has {host_count} hosts "
+            f"(limit network_scan.max_hosts={max_hosts})"
         )
-    ]
+    return host_count
+
+
+def iter_network_hosts(target: str, cancel: Optional[CancelToken] = None) -> Iterator[str]:
+    """
+    Lazily expand a CIDR block or range into host IPs. Nothing is
+    materialized up front, so a /16 costs one address at a time.
+    Expansion stops once `cancel` trips.
+    """
+    validate_network_target(target)
+    start, end = parse_network_target(target)
+    for value in range(int(start), int(end) + 1):
+        if cancel is not None and cancel.cancelled:
+            return
+        yield str(ipaddress.ip_address(value))
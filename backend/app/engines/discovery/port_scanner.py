@@ -0,0 +1,407 @@
+"""
+Event-loop TCP connect scanner.
+
+Each probe is a non-blocking connect multiplexed on the shared scan event
+loop, so thousands of connections can be in flight without a thread per
+probe. One semaphore sized by `port_scan.max_concurrency` caps in-flight
+connects across every host and job in the process.
+
+Each host also gets its own `HostProbeStats`: RTT samples from early
+answers (SYN-ACK or RST) drive a per-host timeout, and an AIMD window
+bounds how many probes that host has in flight.
+"""
+
+import asyncio
+import queue
+import socket
+import time
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.core.async_runtime import submit
+from app.core.cancellation import CancelToken
+from app.core.config_loader import ConfigBound, load_easm_config
+from app.core.rate_limiter import get_rate_limiter
+
+# Keep below the process file descriptor limit (`ulimit -n`)
+DEFAULT_MAX_CONCURRENCY = 512
+
+DEFAULT_INITIAL_TIMEOUT = 0.5
+DEFAULT_MIN_TIMEOUT = 0.1
+DEFAULT_MAX_TIMEOUT = 3.0
+DEFAULT_INITIAL_WINDOW = 256
+DEFAULT_MIN_WINDOW = 4
+DEFAULT_MAX_WINDOW = 512
+DEFAULT_RETRIES = 1
+
+PROBE_OPEN = "open"
+PROBE_CLOSED = "closed"      # RST: the host answered, the port is shut
+PROBE_TIMEOUT = "timeout"
+PROBE_RESET = "reset"        # connection reset mid-handshake
+PROBE_ERROR = "error"        # unreachable, no route, ...
+
+_SCAN_DONE = object()
+
+
+class _ChunkDone(NamedTuple):
+    index: int
+    open_ports: List[int]
+
+
+# -------------------------------------------------
+# Per-host RTT estimate and probe window
+# -------------------------------------------------
+class HostProbeStats:
+    """
+    RTT estimator from RFC 6298 plus an AIMD probe window for one host.
+
+    The timeout is SRTT + 4*RTTVAR clamped to [min_timeout, max_timeout];
+    until the first sample it is `initial_timeout`. Every answer grows the
+    window (slow start up to ssthresh, then +1 per window), while losses
+    halve it at most once per RTT so one burst of losses is not punished
+    repeatedly.
+
+    A first-pass timeout is not a loss: on most internet hosts the bulk of
+    ports are filtered and simply never answer. Only a re-probe that times
+    out while the host answered other probes in the meantime counts as
+    congestion, as does a reset mid-handshake.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+    CLOCK_GRANULARITY = 0.01
+
+    def __init__(
+        self,
+        initial_timeout: float = DEFAULT_INITIAL_TIMEOUT,
+        min_timeout: float = DEFAULT_MIN_TIMEOUT,
+        max_timeout: float = DEFAULT_MAX_TIMEOUT,
+        initial_window: int = DEFAULT_INITIAL_WINDOW,
+        min_window: int = DEFAULT_MIN_WINDOW,
+        max_window: int = DEFAULT_MAX_WINDOW
+    ):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_window = min_window
+        self.max_window = max_window
+
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.window = float(min(max(initial_window, min_window), max_window))
+        self.ssthresh = float(max_window)
+        self.in_flight = 0
+
+        self.probes = 0
+        self.responses = 0
+        self.counts = {
+            PROBE_OPEN: 0, PROBE_CLOSED: 0, PROBE_TIMEOUT: 0,
+            PROBE_RESET: 0, PROBE_ERROR: 0,
+        }
+        self.retried = 0
+        self.window_decreases = 0
+        self.last_answer = float("-inf")
+        self._last_decrease = float("-inf")
+
+    @property
+    def timeout(self) -> float:
+        if self.srtt is None:
+            return self.initial_timeout
+        rto = self.srtt + max(self.CLOCK_GRANULARITY, self.K * self.rttvar)
+        return min(max(rto, self.min_timeout), self.max_timeout)
+
+    @property
+    def retry_timeout(self) -> float:
+        """Backed-off timeout for re-probing ports that timed out."""
+        return min(self.timeout * 2, self.max_timeout)
+
+    def record(
+        self,
+        state: str,
+        rtt: Optional[float] = None,
+        retry: bool = False,
+        launched_at: Optional[float] = None
+    ):
+        """
+        Account one probe outcome. `retry` marks a re-probe and
+        `launched_at` (monotonic) when it was sent, so a re-probe timeout
+        can be told apart from a port that is simply filtered.
+        """
+        self.probes += 1
+        self.counts[state] += 1
+
+        if rtt is not None:
+            self._on_rtt_sample(rtt)
+        elif state == PROBE_RESET:
+            self._on_loss()
+        elif (
+            state == PROBE_TIMEOUT and retry and launched_at is not None
+            and self.last_answer > launched_at
+        ):
+            self._on_loss()
+
+    def _on_rtt_sample(self, rtt: float):
+        self.responses += 1
+        self.last_answer = time.monotonic()
+
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+
+        if self.window < self.ssthresh:
+            self.window += 1
+        else:
+            self.window += 1 / self.window
+        self.window = min(self.window, float(self.max_window))
+
+    def _on_loss(self):
+        now = time.monotonic()
+        if now - self._last_decrease < (self.srtt or self.timeout):
+            return
+
+        self.ssthresh = max(self.window / 2, float(self.min_window))
+        self.window = self.ssthresh
+        self._last_decrease = now
+        self.window_decreases += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "srtt_ms": round(self.srtt * 1000, 2) if self.srtt is not None else None,
+            "rttvar_ms": round(self.rttvar * 1000, 2) if self.rttvar is not None else None,
+            "timeout_ms": round(self.timeout * 1000, 2),
+            "window": round(self.window, 2),
+            "probes": self.probes,
+            **self.counts,
+            "retried": self.retried,
+            "window_decreases": self.window_decreases,
+        }
+
+
+class PortScanner:
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        adaptive: Optional[dict] = None
+    ):
+        self.max_concurrency = max_concurrency
+        adaptive = dict(adaptive or {})
+        self.retries = int(adaptive.pop("retries", DEFAULT_RETRIES))
+        self.adaptive = adaptive
+        self._slots: Optional[asyncio.Semaphore] = None  # bound to the scan loop
+
+    def new_host_stats(self, initial_timeout: Optional[float] = None) -> HostProbeStats:
+        settings = dict(self.adaptive)
+        if initial_timeout is not None:
+            settings["initial_timeout"] = initial_timeout
+        return HostProbeStats(**settings)
+
+    async def probe_port(
+        self,
+        ip: str,
+        port: int,
+        timeout: float
+    ) -> Tuple[str, Optional[float]]:
+        """Return (state, rtt); rtt is set only when the host answered."""
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(
+                asyncio.get_running_loop().sock_connect(sock, (ip, port)),
+                timeout
+            )
+            return PROBE_OPEN, time.monotonic() - started
+        except ConnectionRefusedError:
+            return PROBE_CLOSED, time.monotonic() - started
+        except ConnectionResetError:
+            return PROBE_RESET, None
+        except asyncio.TimeoutError:
+            return PROBE_TIMEOUT, None
+        except OSError:
+            return PROBE_ERROR, None
+        finally:
+            sock.close()
+
+    async def probe(self, ip: str, port: int, timeout: float) -> bool:
+        state, _ = await self.probe_port(ip, port, timeout)
+        return state == PROBE_OPEN
+
+    async def scan(
+        self,
+        ip: str,
+        ports: Iterable[int],
+        timeout: Optional[float],
+        on_open: Callable[[int], None],
+        stats: Optional[HostProbeStats] = None,
+        cancel: Optional[CancelToken] = None,
+        on_settled: Optional[Callable[[int], None]] = None
+    ):
+        """
+        Probe `ports` on `ip`, calling `on_open(port)` as each open port resolves.
+        Tasks are created only when both the host's window and a global slot
+        are free, so memory stays bounded by `max_concurrency` rather than by
+        the size of the port plan. `timeout` only seeds the estimate used
+        before the host's first answer. Ports that timed out are re-probed
+        with a backed-off timeout once the host is known to answer. Once
+        `cancel` trips no new probes are launched; in-flight ones finish.
+        `on_settled(port)` is called once a port's answer is final: after its
+        probe, or for a timed-out port once no re-probe is left to try.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        if stats is None:
+            stats = self.new_host_stats(initial_timeout=timeout)
+
+        pending = set()
+        timed_out = []
+        freed = asyncio.Event()
+        limiter = get_rate_limiter()
+
+        def finished(task: asyncio.Task):
+            pending.discard(task)
+            stats.in_flight -= 1
+            self._slots.release()
+            freed.set()
+
+        async def run(port: int, probe_timeout: float, retry: bool):
+            launched_at = time.monotonic()
+            state, rtt = await self.probe_port(ip, port, probe_timeout)
+            stats.record(state, rtt, retry=retry, launched_at=launched_at)
+            if state == PROBE_OPEN:
+                on_open(port)
+            if state == PROBE_TIMEOUT:
+                timed_out.append(port)
+            elif on_settled is not None:
+                on_settled(port)
+
+        async def launch(port: int, probe_timeout: Optional[float] = None):
+            while stats.in_flight >= int(stats.window):
+                freed.clear()
+                await freed.wait()
+            # Per-target budget first, so a throttled host never holds a global slot
+            await limiter.acquire_async("port_scan", ip)
+            await self._slots.acquire()
+
+            stats.in_flight += 1
+            task = asyncio.create_task(
+                run(port, probe_timeout or stats.timeout, probe_timeout is not None)
+            )
+            pending.add(task)
+            task.add_done_callback(finished)
+
+        def stopped() -> bool:
+            return cancel is not None and cancel.cancelled
+
+        try:
+            for port in ports:
+                if stopped():
+                    break
+                await launch(port)
+            if pending:
+                await asyncio.gather(*list(pending))
+
+            for _ in range(self.retries):
+                if not timed_out or not stats.responses or stopped():
+                    break
+                retry = list(timed_out)
+                timed_out.clear()
+                stats.retried += len(retry)
+
+                for port in retry:
+                    await launch(port, stats.retry_timeout)
+                if pending:
+                    await asyncio.gather(*list(pending))
+
+            # A cancelled scan skipped re-probes it would have made
+            if on_settled is not None and not stopped():
+                for port in timed_out:
+                    on_settled(port)
+        except asyncio.CancelledError:
+            for task in list(pending):
+                task.cancel()
+            raise
+
+    def iter_open_ports(
+        self,
+        ip: str,
+        ports: Iterable[int],
+        timeout: Optional[float] = None,
+        stats: Optional[HostProbeStats] = None,
+        cancel: Optional[CancelToken] = None,
+        chunk_size: Optional[int] = None,
+        on_chunk: Optional[Callable[[int, List[int]], None]] = None
+    ) -> Iterator[int]:
+        """
+        Blocking generator over open ports, yielded in the order they resolve.
+        Closing the generator early cancels the outstanding probes. Pass
+        `stats` to read the host's RTT and window figures afterwards.
+
+        With `on_chunk`, `ports` is split into ranges of `chunk_size` and
+        `on_chunk(index, open_ports)` is called in the caller's thread, after
+        the range's open ports were yielded, once every port of range `index`
+        has its final answer. The scan itself runs straight through.
+        """
+        results: queue.Queue = queue.Queue()
+        on_open = results.put
+        on_settled = None
+
+        if on_chunk is not None:
+            ports = list(ports)
+            chunk_of = {port: i // chunk_size for i, port in enumerate(ports)}
+            left = [min(chunk_size, len(ports) - start) for start in range(0, len(ports), chunk_size)]
+            found: List[List[int]] = [[] for _ in left]
+
+            def on_open(port: int):
+                found[chunk_of[port]].append(port)
+                results.put(port)
+
+            def on_settled(port: int):
+                index = chunk_of[port]
+                left[index] -= 1
+                if not left[index]:
+                    results.put(_ChunkDone(index, found[index]))
+
+        async def run():
+            try:
+                await self.scan(ip, ports, timeout, on_open, stats, cancel, on_settled)
+            finally:
+                results.put(_SCAN_DONE)
+
+        future = submit(run())
+
+        try:
+            while True:
+                port = results.get()
+                if port is _SCAN_DONE:
+                    break
+                if isinstance(port, _ChunkDone):
+                    on_chunk(port.index, port.open_ports)
+                    continue
+                yield port
+
+            future.result()
+        finally:
+            future.cancel()
+
+
+def get_port_scanner_settings() -> dict:
+    port_cfg = load_easm_config().get("port_scan", {})
+    return {
+        "max_concurrency": int(port_cfg.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)),
+        "adaptive": dict(port_cfg.get("adaptive") or {}),
+    }
+
+
+_SCANNER: ConfigBound[PortScanner] = ConfigBound(
+    get_port_scanner_settings, lambda settings: PortScanner(**settings)
+)
+
+
+def get_port_scanner() -> PortScanner:
+    """Process-wide scanner so the concurrency limit is global; rebuilt when `port_scan` changes."""
+    return _SCANNER.get()
@@ -1,13 +1,14 @@
-import socket
+import threading
+from array import array
 from uuid import uuid4
-from typing import List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
 
 from app.models.asset import Asset
-from app.core.config_loader import load_easm_config
+from app.core.cancellation import CancelToken
+from app.core.config_loader import get_config_version, load_easm_config
 from app.core.evidence_store import add_evidence
 from app.core.evidence_factory import create_evidence
-from app.engines.discovery.http_fingerprinting import fingerprint_http_service
+from app.engines.discovery.port_scanner import HostProbeStats, get_port_scanner
 
 
 # -------------------------------------------------
@@ -33,116 +34,169 @@ COMMON_PORTS = {
     9200: "elasticsearch",
 }
 
+# Ports that get HTTP fingerprinting, mapped to their URL scheme
+HTTP_PORTS = {
+    80: "http",
+    443: "https",
+    8080: "http",
+    8443: "https",
+}
 
-# -------------------------------------------------
-# Socket-level port check
-# -------------------------------------------------
-def check_port(ip: str, port: int, service_name: str, timeout: float):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(timeout)
-
-    try:
-        if sock.connect_ex((ip, port)) == 0:
-            return port, service_name
-    except Exception:
-        pass
-    finally:
-        sock.close()
 
-    return None
+def get_http_url(ip: str, port: int):
+    """Return the URL to fingerprint for a web port, or None."""
+    scheme = HTTP_PORTS.get(port)
+    if not scheme:
+        return None
+    host = f"[{ip}]" if ":" in ip else ip
+    return f"{scheme}://{host}:{port}"
 
 
 # -------------------------------------------------
 # Port selection logic (policy-driven)
 # -------------------------------------------------
-def get_ports_to_scan() -> dict:
-    config = load_easm_config()
-    port_cfg = config.get("port_scan", {})
+class PortPlan:
+    """
+    Ports to probe for the active scan mode, built once per config
+    version. `ports` is a uint16 array (128 KiB for a full scan instead of
+    a 65k-entry dict); only explicitly named ports are kept in `names`.
+    """
+
+    __slots__ = ("mode", "ports", "names")
+
+    def __init__(self, mode: str, ports: array, names: Dict[int, str]):
+        self.mode = mode
+        self.ports = ports
+        self.names = names
+
+    def service_name(self, port: int) -> str:
+        return self.names.get(port, "unknown")
+
+    def __len__(self):
+        return len(self.ports)
+
+
+_PORT_PLAN = {"version": None, "plan": None}
+_PORT_PLAN_LOCK = threading.Lock()
+
+
+def build_port_plan(port_cfg: dict) -> PortPlan:
     mode = port_cfg.get("mode", "curated")
 
     if mode == "curated":
         curated = port_cfg.get("curated_ports", {})
         if isinstance(curated, list):
-            return {int(p): "unknown" for p in curated}
+            return PortPlan(mode, array("H", (int(p) for p in curated)), {})
         if isinstance(curated, dict):
-            return {int(p): str(v) for p, v in curated.items()}
+            names = {int(p): str(v) for p, v in curated.items()}
+            return PortPlan(mode, array("H", names), names)
         raise RuntimeError("Invalid curated_ports format")
 
     if mode == "extended":
         range_str = port_cfg.get("extended_ports", {}).get("range", "1-1024")
         start, end = range_str.split("-")
-        return {p: "unknown" for p in range(int(start), int(end) + 1)}
+        return PortPlan(mode, array("H", range(int(start), int(end) + 1)), {})
 
     if mode == "full":
         if not port_cfg.get("full_scan", {}).get("enabled", False):
             raise RuntimeError("Full port scan disabled by policy")
-        return {p: "unknown" for p in range(1, 65536)}
+        return PortPlan(mode, array("H", range(1, 65536)), {})
 
     raise RuntimeError(f"Invalid port scan mode: {mode}")
 
 
+def get_port_plan() -> PortPlan:
+    """Cached port plan; rebuilt only when easm.yaml is reloaded."""
+    version = get_config_version()
+
+    with _PORT_PLAN_LOCK:
+        if _PORT_PLAN["version"] != version:
+            _PORT_PLAN["plan"] = build_port_plan(load_easm_config().get("port_scan", {}))
+            _PORT_PLAN["version"] = version
+        return _PORT_PLAN["plan"]
+
+
+def get_http_targets(services: List[Asset]) -> List[tuple]:
+    """(asset_id, url) pairs for the web services among `services`."""
+    targets = []
+    for svc in services:
+        ip, port = svc.identifier.rsplit(":", 1)
+        url = get_http_url(ip, int(port))
+        if url:
+            targets.append((svc.asset_id, url))
+    return targets
+
+
 # -------------------------------------------------
 # Service discovery + evidence emission
 # -------------------------------------------------
-def discover_services(ip: str, timeout: float = 0.5) -> List[Asset]:
+def discover_services(
+    ip: str,
+    timeout: Optional[float] = None,
+    stats: Optional[HostProbeStats] = None,
+    cancel: Optional[CancelToken] = None,
+    ports: Optional[Iterable[int]] = None,
+    chunk_size: Optional[int] = None,
+    on_chunk: Optional[Callable[[int, List[Asset]], None]] = None
+) -> List[Asset]:
+    """
+    Port-scan one IP and emit port_open evidence. Web services are
+    fingerprinted separately (see `get_http_targets` and the async HTTP
+    engine) so HTTP probing never blocks the port scan.
+
+    Probe timeouts adapt to the host's measured RTT; `timeout` only
+    overrides the initial estimate and `stats` collects the figures.
+    A tripped `cancel` token stops the scan with the ports found so far.
+    `ports` restricts the scan to part of the port plan. With `on_chunk`,
+    `on_chunk(start, services)` reports each `chunk_size` range of the
+    ports (by its offset) as soon as all of its ports are answered, while
+    the scan carries on.
+    """
     services: List[Asset] = []
-    ports = get_ports_to_scan()
-    scan_mode = load_easm_config()["port_scan"]["mode"]
-
-    with ThreadPoolExecutor(max_workers=50) as executor:
-        futures = [
-            executor.submit(check_port, ip, port, service_name, timeout)
-            for port, service_name in ports.items()
-        ]
-
-        for future in as_completed(futures):
-            result = future.result()
-            if not result:
-                continue
-
-            port, service_name = result
-
-            # -------------------------------
-            # Create Service Asset
-            # -------------------------------
-            service_asset = Asset(
-                asset_id=str(uuid4()),
-                asset_type="service",
-                identifier=f"{ip}:{port}",
-                source="port_scan",
-                risk_tags=[
-                    "public_service",
-                    service_name,
-                    f"scan_mode:{scan_mode}"
-                ],
-            )
-
-            services.append(service_asset)
-
-            # -------------------------------
-            # Evidence: Port Open
-            # -------------------------------
-            add_evidence(create_evidence(
-                asset_id=service_asset.asset_id,
-                type="port_open",            # ✅ correct
-                category="exposure",
-                source="port_scan",
-                confidence="high",
-                strength="moderate",
-                observed_value=service_asset.identifier,
-                raw_proof=service_asset.identifier
-            ))
-
-            # -------------------------------
-            # HTTP Fingerprinting (CRITICAL)
-            # -------------------------------
-            if port in {80, 443, 8080, 8443}:
-                scheme = "https" if port in {443, 8443} else "http"
-                url = f"{scheme}://{ip}:{port}"
-
-                fingerprint_http_service(
-                    asset_id=service_asset.asset_id,
-                    url=url
-                )
+    by_port: Dict[int, Asset] = {}
+    plan = get_port_plan()
+    scan_mode = plan.mode
+
+    def chunk_done(index: int, open_ports: List[int]):
+        on_chunk(index * chunk_size, [by_port[p] for p in open_ports])
+
+    # Open ports stream back from the event-loop scanner as they resolve
+    for port in get_port_scanner().iter_open_ports(
+        ip, plan.ports if ports is None else ports, timeout, stats, cancel,
+        chunk_size=chunk_size, on_chunk=chunk_done if on_chunk is not None else None
+    ):
+        service_name = plan.service_name(port)
+
+        # -------------------------------
+        # Create Service Asset
+        # -------------------------------
+        service_asset = Asset(
+            asset_id=str(uuid4()),
+            asset_type="service",
+            identifier=f"{ip}:{port}",
+            source="port_scan",
+            risk_tags=[
+                "public_service",
+                service_name,
+                f"scan_mode:{scan_mode}"
+            ],
+        )
+
+        services.append(service_asset)
+        by_port[port] = service_asset
+
+        # -------------------------------
+        # Evidence: Port Open
+        # -------------------------------
+        add_evidence(create_evidence(
+            asset_id=service_asset.asset_id,
+            type="port_open",            # ✅ correct
+            category="exposure",
+            source="port_scan",
+            confidence="high",
+            strength="moderate",
+            observed_value=service_asset.identifier,
+            raw_proof=service_asset.identifier
+        ))
 
     return services
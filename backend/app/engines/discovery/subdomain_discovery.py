@@ -1,11 +1,27 @@
+import codecs
+import json
 import requests
-from typing import List
+from typing import Iterable, Iterator, List, Optional
+from datetime import datetime
 from app.models.asset import Asset
+from app.core.cancellation import CancelToken
+from app.core.ct_cache import (
+    get_ct_cache_config,
+    is_ct_cache_fresh,
+    load_ct_cache,
+    new_ct_cache_entry,
+    record_certificate,
+    save_ct_cache,
+)
 from uuid import uuid4
 import re
 
 CRT_SH_URL = "https://crt.sh/?q=%25.{domain}&output=json"
 
+STREAM_CHUNK_BYTES = 64 * 1024
+# A single crt.sh entry is a few hundred bytes; anything far larger is malformed
+MAX_PENDING_CHARS = 4 * 1024 * 1024
+
 DOMAIN_REGEX = re.compile(
     r"^(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}$"
 )
@@ -21,54 +37,161 @@ def is_valid_domain(name: str, root_domain: str) -> bool:
     return True
 
 
-def discover_subdomains(domain: str) -> List[Asset]:
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[dict]:
     """
-    Passive subdomain discovery using Certificate Transparency logs.
-    Safe, non-intrusive, enterprise-friendly.
+    Incrementally decode the elements of a top-level JSON array.
+    Only the element currently being parsed is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    in_array = False
+
+    for chunk in chunks:
+        buffer += text.decode(chunk)
+        pos = 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+
+            if not in_array:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                in_array = True
+                pos += 1
+                continue
+
+            if buffer[pos] == "]":
+                return
+
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+
+            yield item
+
+        buffer = buffer[pos:]
+        if len(buffer) > MAX_PENDING_CHARS:
+            raise ValueError("JSON array element exceeds size limit")
+
+
+def _subdomain_asset(name: str) -> Asset:
+    return Asset(
+        asset_id=str(uuid4()),
+        asset_type="domain",
+        identifier=name,
+        source="cert_transparency",
+        risk_tags=["internet_exposed"]
+    )
+
+
+def iter_subdomains(domain: str, cancel: Optional[CancelToken] = None) -> Iterator[Asset]:
+    """
+    Stream crt.sh results and yield each new, valid subdomain as soon as
+    its certificate entry is parsed. Memory is bounded by the set of unique
+    names, not by the size of the crt.sh response.
+
+    With the CT cache enabled, cached subdomains are yielded first and
+    crt.sh is skipped while the cache is fresh. Otherwise only certificates
+    newer than the cached high-water mark are merged. If crt.sh is slow or
+    down, the cached subdomains are what the caller gets.
+    Errors stop the stream; anything already yielded is kept. So does a
+    tripped `cancel` token, checked between certificates.
     """
-    discovered = set()
-    assets = []
+    cache_cfg = get_ct_cache_config()
+    cache = load_ct_cache(domain) if cache_cfg["enabled"] else None
+    timeout = 30
+
+    if cache is not None:
+        for name in cache["subdomains"]:
+            yield _subdomain_asset(name)
+
+        if is_ct_cache_fresh(cache, cache_cfg["refresh_minutes"]):
+            return
+
+        timeout = cache_cfg["timeout_with_cache"]
+
+    if cancel is not None:
+        if cancel.cancelled:
+            return
+        timeout = cancel.timeout(timeout)
+
+    entry = cache or new_ct_cache_entry(domain)
+    known_max_id = entry["max_cert_id"]
+    max_id = known_max_id
+    merged = False
+    completed = False
 
     try:
         url = CRT_SH_URL.format(domain=domain)
-        # Increase timeout, add retries
-        response = requests.get(url, timeout=30, allow_redirects=True)
+        response = requests.get(url, timeout=timeout, allow_redirects=True, stream=True)
+    except requests.Timeout:
+        print(f"Timeout querying crt.sh for {domain}")
+        return
+    except requests.ConnectionError as e:
+        print(f"Connection error querying crt.sh for {domain}: {e}")
+        return
 
+    try:
         if response.status_code != 200:
-            return []
+            return
+
+        certificates = iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_BYTES))
+
+        for cert in certificates:
+            if cancel is not None and cancel.cancelled:
+                break
+            if not isinstance(cert, dict):
+                continue
 
-        data = response.json()
+            cert_id = int(cert.get("id") or 0)
+            if cert_id and cert_id <= known_max_id:
+                continue  # already merged on a previous scan
+            max_id = max(max_id, cert_id)
+            merged = True
 
-        for entry in data:
-            name = entry.get("name_value")
+            name = cert.get("name_value")
             if not name:
                 continue
 
             for sub in name.split("\n"):
                 sub = sub.strip().lower()
 
-                if is_valid_domain(sub, domain):
-                    discovered.add(sub)
+                if not is_valid_domain(sub, domain):
+                    continue
+
+                if record_certificate(entry, sub, cert_id, cert.get("entry_timestamp")):
+                    yield _subdomain_asset(sub)
+
+        # A cancelled read is partial: keep the names, not the high-water mark
+        completed = cancel is None or not cancel.cancelled
 
     except requests.Timeout:
         print(f"Timeout querying crt.sh for {domain}")
-        return []
     except requests.ConnectionError as e:
         print(f"Connection error querying crt.sh for {domain}: {e}")
-        return []
     except Exception as e:
         print(f"Error discovering subdomains for {domain}: {e}")
-        return []
-
-    for subdomain in discovered:
-        assets.append(
-            Asset(
-                asset_id=str(uuid4()),
-                asset_type="domain",
-                identifier=subdomain,
-                source="cert_transparency",
-                risk_tags=["internet_exposed"]
-            )
-        )
-
-    return assets
+    finally:
+        response.close()
+
+        if cache_cfg["enabled"]:
+            # crt.sh output is not ordered by ID, so the high-water mark only
+            # advances after a complete read; partial reads still merge names
+            if completed:
+                entry["max_cert_id"] = max_id
+                entry["fetched_at"] = datetime.utcnow().isoformat()
+            if completed or merged:
+                save_ct_cache(entry)
+
+
+def discover_subdomains(domain: str) -> List[Asset]:
+    """
+    Passive subdomain discovery using Certificate Transparency logs.
+    Safe, non-intrusive, enterprise-friendly.
+    """
+    return list(iter_subdomains(domain))
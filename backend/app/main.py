@@ -1,21 +1,39 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.engines.discovery.domain_discovery import discover_domain
-from app.agents.asset_risk_agent import classify_asset
-from fastapi import BackgroundTasks
+from app.agents.asset_risk_agent import classify_assets
 from uuid import uuid4
 from app.models.scan_job import ScanJob
 from app.core.scan_store import SCAN_JOBS, SCAN_RESULTS
 from app.core.scan_orchestrator import run_domain_scan , run_scan
 from app.models.scan_type import ScanType
 from app.core.bas_service import run_bas_simulation
-from app.core.scheduler import schedule_scan
-from app.core.scan_store import create_scan_job
-from app.core.evidence_store import EVIDENCE_STORE
+from app.core.scheduler import get_scheduler, schedule_scan
+from app.core.scan_store import create_scan_job, lookup_scan_job, lookup_scan_results
+from app.core.evidence_store import lookup_evidence
+from app.core.rate_limiter import get_rate_limiter
+from app.core.classification_cache import get_classification_cache
+from app.core.ai_client import LLMError, get_llm_client
+from app.core.job_queue import QueueFull, cancel_scan, get_queue_stats, resume_interrupted_scans, submit_scan
+from app.core.target_classifier import validate_target
+from app.core.scan_events import format_sse, parse_last_event_id, stream_scan_events
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Re-queue scans interrupted by the last shutdown, then restore
+    # persisted continuous-EASM schedules
+    resume_interrupted_scans()
+    get_scheduler().start()
+    yield
+    get_scheduler().shutdown()
 
 
 app = FastAPI(
     title="AI External Breach & Attack Simulation Platform",
-    version="0.1"
+    version="0.1",
+    lifespan=lifespan
 )
 
 @app.get("/health")
@@ -26,9 +44,10 @@ def health():
 def scan_domain(domain: str):
     assets = discover_domain(domain)
     enriched = []
+    ai_results = classify_assets([a.dict() for a in assets])
 
     for asset in assets:
-        ai_result = classify_asset(asset.dict())
+        ai_result = ai_results.get(asset.asset_id, {})
         asset.risk_score = ai_result.get("risk_score")
         asset.risk_tags += ai_result.get("risk_tags", [])
         enriched.append(asset)
@@ -38,46 +57,90 @@ def scan_domain(domain: str):
 @app.post("/scan/start")
 def start_scan(
     target: str,
-    background_tasks: BackgroundTasks
+    priority: str = "normal"
 ):
+    # Malformed or oversized targets are refused here rather than failing as a job
+    try:
+        validate_target(target)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Create job via centralized factory
     job = create_scan_job(target)
 
-    # Run scan in background using SAME job_id
-    background_tasks.add_task(
-        run_scan,
-        job.job_id,
-        target
-    )
+    # Hand the SAME job_id to the scan worker pool (or the worker broker)
+    try:
+        submit_scan(job, priority=priority)
+    except ValueError as e:
+        SCAN_JOBS.pop(job.job_id, None)
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFull as e:
+        SCAN_JOBS.pop(job.job_id, None)
+        raise HTTPException(status_code=429, detail=str(e))
 
     return {
         "job_id": job.job_id,
         "status": job.status,
-        "target": target
+        "target": target,
+        "priority": job.priority,
+        "queue_position": job.queue_position
     }
 
+@app.get("/scan/queue")
+def get_scan_queue():
+    return get_queue_stats()
+
 @app.get("/scan/{job_id}")
 def get_scan_status(job_id: str):
-    job = SCAN_JOBS.get(job_id)
+    job = lookup_scan_job(job_id)
     if not job:
         return {"error": "Job not found"}
 
     return job
 
+@app.delete("/scan/{job_id}")
+def cancel_scan_job(job_id: str):
+    job = cancel_scan(job_id)
+    if not job:
+        return {"error": "Job not found"}
+
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "cancel_requested": job.status == "RUNNING"
+    }
+
+@app.get("/scan/{job_id}/events")
+def scan_events(job_id: str, request: Request):
+    if not lookup_scan_job(job_id):
+        return {"error": "Job not found"}
+
+    after = parse_last_event_id(request.headers.get("last-event-id"))
+
+    async def stream():
+        async for event in stream_scan_events(job_id, after):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/scan/{job_id}/results")
 def get_scan_results(job_id: str):
-    if job_id not in SCAN_RESULTS:
+    results = lookup_scan_results(job_id)
+    if results is None:
         return {"status": "Results not ready"}
 
-    return SCAN_RESULTS[job_id]
+    return results
 
 @app.get("/bas/simulate/{job_id}")
 def simulate_bas(job_id: str):
-    if job_id not in SCAN_RESULTS:
+    assets = lookup_scan_results(job_id)
+    if assets is None:
         return {"error": "Scan results not found"}
 
-    assets = SCAN_RESULTS[job_id]
-
     result = run_bas_simulation(
         chain_name="external_to_internal.yaml",
         assets=assets
@@ -87,13 +150,49 @@ def simulate_bas(job_id: str):
 
 @app.post("/easm/continuous/start")
 def start_continuous_easm(target: str, interval_minutes: int = 60):
-    schedule_scan(target, interval_minutes * 60)
+    try:
+        validate_target(target)
+        schedule = schedule_scan(target, interval_minutes * 60)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     return {
         "target": target,
         "status": "continuous_monitoring_enabled",
-        "interval_minutes": interval_minutes
+        "interval_minutes": interval_minutes,
+        "next_run_at": schedule["next_run_at"]
+    }
+
+@app.post("/easm/continuous/stop")
+def stop_continuous_easm(target: str):
+    if not get_scheduler().stop(target):
+        return {"error": "Schedule not found"}
+
+    return {
+        "target": target,
+        "status": "continuous_monitoring_disabled"
     }
 
+@app.get("/easm/continuous")
+def list_continuous_easm():
+    return get_scheduler().list_schedules()
+
+@app.get("/debug/rate-limits")
+def debug_rate_limits():
+    return get_rate_limiter().stats()
+
+@app.get("/debug/llm")
+def debug_llm():
+    try:
+        return get_llm_client().stats()
+    except LLMError as e:
+        return {"configured": False, "error": str(e)}
+
+@app.get("/debug/classification-cache")
+def debug_classification_cache():
+    cache = get_classification_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
 @app.get("/debug/evidence")
 def debug_evidence():
-    return EVIDENCE_STORE
\ No newline at end of file
+    return lookup_evidence()
\ No newline at end of file
@@ -8,5 +8,6 @@ class Asset(BaseModel):
     identifier: str
     source: str
     risk_tags: List[str] = []
+    hostnames: List[str] = []  # names resolving to this ip (and its services)
     risk_score: Optional[int] = None
     discovered_at: datetime = datetime.utcnow()
@@ -1,11 +1,17 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 class ScanJob(BaseModel):
     job_id: str
     target: str
-    status: str
+    status: str  # PENDING | QUEUED | DEFERRED | RUNNING | COMPLETED | FAILED | CANCELLED
+    priority: str = "normal"
+    queue_position: Optional[int] = None  # 1-based while QUEUED / DEFERRED
     created_at: datetime = datetime.utcnow()
     completed_at: Optional[datetime] = None
     error: Optional[str] = None
+    host_stats: Dict[str, dict] = {}  # per-IP probe RTT / timeout / window figures
+    progress: Dict[str, int] = {}  # items processed per pipeline stage
+    incomplete: bool = False  # results are partial (cancelled / deadline hit)
+    incomplete_stages: Dict[str, str] = {}  # stage -> "cancelled" | "deadline_exceeded"
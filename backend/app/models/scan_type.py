@@ -3,4 +3,5 @@ from enum import Enum
 class ScanType(str, Enum):
     DOMAIN = "domain"
     IP = "ip"
+    NETWORK = "network"  # CIDR block or address range
     API = "api"
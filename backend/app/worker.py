@@ -0,0 +1,180 @@
+"""
+Scan worker process.
+
+Claims scan jobs from the broker and runs them, writing job state, results,
+evidence and the asset snapshot back to the shared store so the API (and
+the next scan of the same target) can read them. Used with
+`job_queue.backend: broker`:
+
+    python -m app.worker --processes 4
+
+Start as many worker processes as the host can take; they share the
+broker file (`broker.path`) with the API. The SQLite broker and stores are
+single-host only (WAL mode does not work over a network filesystem), so
+workers on other machines need a networked broker backend. Running jobs are
+heartbeated; a job whose worker died is re-queued after
+`checkpoints.stale_after` seconds and resumes from its checkpoint
+(`checkpoints.path`).
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from app.core.broker import FINISHED_STATUSES, get_broker, get_broker_config
+from app.core.cancellation import cancel_running_scan
+from app.core.checkpoint_store import get_checkpoint_config
+from app.core.evidence_store import EVIDENCE_STORE
+from app.core.logger import logger
+from app.core.scan_events import open_event_bus
+from app.core.scan_orchestrator import run_scan
+from app.core.scan_store import SCAN_JOBS, SCAN_RESULTS
+from app.core.shared_store import get_result_store
+from app.core.snapshot_store import ASSET_SNAPSHOTS
+
+
+def watch_job(job_id: str, done: threading.Event, poll_interval: float):
+    """
+    Heartbeat the running job and relay a `DELETE /scan/{job_id}` recorded
+    in the broker to the scan.
+    """
+    broker = get_broker()
+    cancelled = False
+    while not done.wait(poll_interval):
+        broker.heartbeat(job_id)
+        if not cancelled and broker.cancel_requested(job_id):
+            cancel_running_scan(job_id)
+            cancelled = True
+
+
+def mirror_progress(broker, job):
+    """
+    Write the job's progress to the broker. A finished status is held back
+    as RUNNING: pollers must not see it before the results are saved.
+    """
+    if job.status in FINISHED_STATUSES:
+        job = job.copy(update={"status": "RUNNING"})
+    broker.update(job)
+
+
+def process_job(job, worker_id: str, poll_interval: float = 1.0):
+    broker = get_broker()
+    store = get_result_store()
+    done = threading.Event()
+
+    SCAN_JOBS[job.job_id] = job
+    # Diffs against the previous scan need every earlier snapshot of the target
+    ASSET_SNAPSHOTS[job.target] = store.load_snapshots(job.target)
+    broker.update(job)
+
+    # The API cannot see this process's event bus: mirror status and
+    # progress counters into the broker instead. The final status is only
+    # written once results and evidence are stored (see `finally`)
+    open_event_bus(job.job_id).add_listener(
+        lambda event: mirror_progress(broker, job) if event["type"] in ("status", "progress") else None
+    )
+
+    logger.info(f"Worker claimed scan | worker={worker_id} job_id={job.job_id}")
+    threading.Thread(
+        target=watch_job,
+        args=(job.job_id, done, poll_interval),
+        daemon=True
+    ).start()
+
+    try:
+        run_scan(job.job_id, job.target)
+
+        assets = SCAN_RESULTS.pop(job.job_id, None)
+        if assets is not None:
+            store.save_results(job.job_id, assets)
+            store.save_evidence([
+                evidence
+                for asset in assets
+                for evidence in EVIDENCE_STORE.pop(asset.asset_id, [])
+            ])
+
+        snapshots = ASSET_SNAPSHOTS.get(job.target) or []
+        if snapshots and snapshots[-1].scan_job_id == job.job_id:
+            store.save_snapshot(snapshots[-1])
+    except Exception as e:
+        job.status = "FAILED"
+        job.error = str(e)
+        logger.error(f"Scan worker error | job_id={job.job_id} error={e}")
+    finally:
+        done.set()
+        broker.update(job)
+        SCAN_JOBS.pop(job.job_id, None)
+
+
+def worker_loop(worker_id: str, poll_interval: float):
+    broker = get_broker()
+    stale_after = get_checkpoint_config()["stale_after"]
+    logger.info(f"Scan worker started | worker={worker_id}")
+
+    while True:
+        job = broker.claim(worker_id)
+        if job is None:
+            requeued = broker.requeue_stale(stale_after)
+            if requeued:
+                logger.info(f"Stale scans re-queued | count={requeued}")
+                continue
+            time.sleep(poll_interval)
+            continue
+        process_job(job, worker_id, poll_interval)
+
+
+def _run_worker(index: int, poll_interval: float):
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    worker_loop(worker_id, poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run EASM scan workers against the job broker")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to start")
+    parser.add_argument(
+        "--threads", type=int, default=1,
+        help="scans run concurrently inside each process"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=None,
+        help="seconds to wait when no job is queued (default: broker.poll_interval)"
+    )
+    args = parser.parse_args(argv)
+
+    poll_interval = args.poll_interval or get_broker_config()["poll_interval"]
+
+    if args.processes > 1:
+        ctx = multiprocessing.get_context("spawn")
+        processes = [
+            ctx.Process(target=main, args=([
+                "--threads", str(args.threads),
+                "--poll-interval", str(poll_interval),
+            ],), name=f"scan-worker-{i}")
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        return
+
+    threads = [
+        threading.Thread(
+            target=_run_worker,
+            args=(i, poll_interval),
+            name=f"scan-worker-{i}",
+            daemon=True
+        )
+        for i in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
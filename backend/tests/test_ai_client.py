@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.ai_client import LLMError, OllamaClient
+from app.core.async_runtime import run_sync
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        with server.lock:
+            server.calls += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            fail = server.calls <= server.fail_first
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+
+        if fail:
+            status, body = 503, b"busy"
+        else:
+            status = 200
+            body = json.dumps({"model": payload["model"], "response": payload["prompt"].upper()}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.lock = threading.Lock()
+    server.calls = server.active = server.peak = server.fail_first = 0
+    server.delay = 0.05
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(server, **kwargs):
+    return OllamaClient(f"http://127.0.0.1:{server.server_address[1]}", **kwargs)
+
+
+def test_concurrency_is_capped_and_connections_reused(ollama):
+    client = _client(ollama, concurrency=2)
+
+    async def many():
+        return await asyncio.gather(*(client.generate(f"p{i}", timeout=10) for i in range(6)))
+
+    results = run_sync(many())
+
+    assert [r["response"] for r in results] == [f"P{i}" for i in range(6)]
+    assert ollama.peak == 2
+    assert client.http.connections_opened == 2
+
+
+def test_retries_with_backoff_then_gives_up(ollama):
+    ollama.fail_first = 1
+    client = _client(ollama, retries=1, backoff=0.01)
+    assert run_sync(client.generate("hi", timeout=10))["response"] == "HI"
+    assert client.retried == 1
+
+    ollama.calls, ollama.fail_first = 0, 5
+    with pytest.raises(LLMError):
+        run_sync(client.generate("hi", timeout=10))
+    assert ollama.calls == 2
+
+
+def test_waiting_for_a_slot_counts_against_the_timeout(ollama):
+    ollama.delay = 0.4
+    client = _client(ollama, concurrency=1, retries=0)
+
+    async def queued():
+        started = time.monotonic()
+        first, second = await asyncio.gather(
+            client.generate("a", timeout=0.6),
+            client.generate("b", timeout=0.6),
+            return_exceptions=True
+        )
+        return first, second, time.monotonic() - started
+
+    first, second, elapsed = run_sync(queued())
+
+    assert first["response"] == "A"
+    # The second call holds the slot with only ~0.2s of its 0.6s left
+    assert isinstance(second, LLMError)
+    assert elapsed < 0.75
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.agents import asset_risk_agent
+from app.core.classification_cache import ClassificationCache
+from app.core.evidence_store import EVIDENCE_STORE, add_evidence
+from app.models.evidence import Evidence
+
+
+def _asset(asset_id, identifier):
+    # The extra tag keeps the rule tier from deciding these on its own
+    return {"asset_id": asset_id, "asset_type": "domain", "identifier": identifier,
+            "risk_tags": ["internet_exposed", "legacy_stack"]}
+
+
+def test_batch_results_are_mapped_by_asset_id(monkeypatch):
+    monkeypatch.setattr(asset_risk_agent, "get_classification_cache", lambda: ClassificationCache())
+    prompts = []
+
+    async def fake_llm(prompt, timeout=None, format=None):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            # Batch answer, fenced, with "b" missing
+            body = {"results": [{"asset_id": "a", "risk_score": 150, "risk_tags": "admin"}]}
+            return {"response": f"```json\n{json.dumps(body)}\n```"}
+        return {"response": json.dumps({"risk_score": 10, "risk_tags": []})}
+
+    monkeypatch.setattr(asset_risk_agent, "call_llm_async", fake_llm)
+
+    results = asset_risk_agent.classify_assets(
+        [_asset("a", "admin.example.com"), _asset("b", "www.example.com")], batch_size=20
+    )
+
+    assert len(prompts) == 2  # one batch request plus a retry for the omitted asset
+    assert results["a"] == {"risk_score": 100, "risk_tags": ["admin"]}
+    assert results["b"] == {"risk_score": 10, "risk_tags": []}
+
+
+def test_missing_assets_retry_as_smaller_batch_within_budget(monkeypatch):
+    monkeypatch.setattr(asset_risk_agent, "get_classification_cache", lambda: None)
+    asked = []
+
+    async def fake_llm(prompt, timeout=None, format=None):
+        ids = [i for i in "abcde" if f"{i}.example.com" in prompt]
+        asked.append(ids)
+        if len(ids) == 1:
+            return {"response": json.dumps({"risk_score": 40, "risk_tags": []})}
+        answered = ids[:len(ids) // 2]  # each batch answer covers half the assets
+        return {"response": json.dumps({"results": [
+            {"asset_id": i, "risk_score": 20, "risk_tags": []} for i in answered
+        ]})}
+
+    monkeypatch.setattr(asset_risk_agent, "call_llm_async", fake_llm)
+    assets = [_asset(i, f"{i}.example.com") for i in "abcde"]
+
+    results = asset_risk_agent.classify_assets(assets, batch_size=20)
+
+    assert asked[:2] == [list("abcde"), list("cde")]
+    assert sorted(asked[2:]) == [["d"], ["e"]]
+    assert set(results) == set("abcde")
+
+    # An answer that uses up the budget leaves no time for any fallback
+    async def slow_llm(prompt, timeout=None, format=None):
+        asked.append(prompt)
+        await asyncio.sleep(0.05)
+        return {"response": "not json"}
+
+    asked.clear()
+    monkeypatch.setattr(asset_risk_agent, "call_llm_async", slow_llm)
+    assert asset_risk_agent.classify_assets(assets, timeout=0.01, batch_size=20) == {}
+    assert len(asked) == 1
+
+
+def test_unchanged_assets_skip_the_model(monkeypatch):
+    cache = ClassificationCache()
+    monkeypatch.setattr(asset_risk_agent, "get_classification_cache", lambda: cache)
+    calls = []
+
+    async def fake_llm(prompt, timeout=None, format=None):
+        calls.append(prompt)
+        return {"response": json.dumps({"risk_score": 30, "risk_tags": ["web"]})}
+
+    monkeypatch.setattr(asset_risk_agent, "call_llm_async", fake_llm)
+
+    first = asset_risk_agent.classify_assets([_asset("a", "www.example.com")])
+    # Next scan: same asset under a fresh id
+    second = asset_risk_agent.classify_assets([_asset("z", "www.example.com")])
+
+    assert len(calls) == 1
+    assert first["a"] == second["z"] == {"risk_score": 30, "risk_tags": ["web"]}
+    assert cache.stats()["hits"] == 1
+
+
+def test_obvious_assets_are_scored_by_rules(monkeypatch):
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("the rule tier should have decided")
+
+    monkeypatch.setattr(asset_risk_agent, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(asset_risk_agent, "call_llm_async", unexpected)
+
+    for ev_type in ("port_open", "http_service_detected", "admin_interface_detected"):
+        add_evidence(Evidence(
+            evidence_id=f"rules-{ev_type}", asset_id="rules-svc",
+            category="exposure", type=ev_type, source="test",
+            confidence="high", strength="strong",
+            first_seen=datetime.utcnow(), last_seen=datetime.utcnow(),
+        ))
+    service = {"asset_id": "rules-svc", "asset_type": "service", "identifier": "10.0.0.1:443",
+               "risk_tags": ["public_service", "https", "scan_mode:curated"]}
+    domain = {"asset_id": "rules-dom", "asset_type": "domain", "identifier": "www.example.com",
+              "risk_tags": ["internet_exposed"]}
+
+    try:
+        results = asset_risk_agent.classify_assets([service, domain])
+    finally:
+        EVIDENCE_STORE.pop("rules-svc", None)
+
+    assert results["rules-svc"] == {"risk_score": 90, "risk_tags": ["admin_exposed", "web_service"]}
+    assert results["rules-dom"] == {"risk_score": 10, "risk_tags": ["minimal_exposure"]}
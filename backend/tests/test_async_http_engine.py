@@ -0,0 +1,83 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.evidence_store import get_evidence_by_type
+from app.engines.discovery.async_http_engine import AsyncHttpClient, capture_http_services
+from app.engines.discovery.http_analyzers import run_http_analyzers
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = set()
+
+    def do_GET(self):
+        type(self).client_ports.add(self.client_address[1])
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for part in (b"<html>admin ", b"dashboard</html>"):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        body = b"<html><form>Username / Password login</form></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_fingerprints_many_urls_over_pooled_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    # Pooling, not per-target budgets, is under test here
+    client = AsyncHttpClient(max_connections=50, max_connections_per_host=4, rate_limit=None)
+
+    try:
+        targets = [(f"async-{i}", f"{base}/page{i}") for i in range(40)]
+        targets.append(("async-chunked", f"{base}/chunked"))
+        captures = capture_http_services([url for _, url in targets], client=client)
+        for (asset_id, _), capture in zip(targets, captures):
+            run_http_analyzers(asset_id, capture)
+    finally:
+        server.shutdown()
+
+    assert all(c is not None for c in captures)
+    assert client.connections_opened <= 4
+    assert get_evidence_by_type("async-7", "login_interface_detected")
+    assert get_evidence_by_type("async-7", "auth_missing")
+    assert get_evidence_by_type("async-chunked", "admin_interface_detected")
+
+
+def test_unreachable_url_is_captured_as_none():
+    client = AsyncHttpClient(timeout=1.0)
+
+    assert capture_http_services(["http://127.0.0.1:1"], client=client) == [None]
+
+
+def test_idle_connections_expire_and_host_state_is_dropped():
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), _Handler) for _ in range(5)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AsyncHttpClient(rate_limit=None, idle_timeout=0.2, max_idle=3)
+
+    try:
+        urls = [f"http://127.0.0.1:{s.server_address[1]}/" for s in servers]
+        captures = capture_http_services(urls, client=client)
+
+        assert all(c is not None and c.status_code == 200 for c in captures)
+        assert client._idle_count == 3  # capped, the rest were closed
+        assert client._host_slots == {} and client._host_users == {}
+
+        time.sleep(0.5)
+        assert client._idle_count == 0 and client._idle == {}
+    finally:
+        for server in servers:
+            server.shutdown()
@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime
+
+from app.core.broker import SQLiteBroker
+from app.core.shared_store import SQLiteResultStore
+from app.models.asset import Asset
+from app.models.evidence import Evidence
+from app.models.scan_job import ScanJob
+
+
+def _job(job_id):
+    return ScanJob(job_id=job_id, target=f"{job_id}.example", status="PENDING")
+
+
+def test_claim_follows_priority_and_respects_limit(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "broker.db"))
+
+    assert broker.enqueue(_job("low"), rank=2)
+    assert broker.enqueue(_job("normal"), rank=1)
+    assert broker.enqueue(_job("high"), rank=0)
+    assert not broker.enqueue(_job("extra"), rank=1, max_queued=3)
+    assert broker.get_job("low").queue_position == 3
+
+    claimed = [broker.claim("w1").job_id for _ in range(3)]
+    assert claimed == ["high", "normal", "low"]
+    assert broker.claim("w1") is None
+
+    job = broker.get_job("high")
+    assert job.status == "RUNNING"
+    job.status = "COMPLETED"
+    broker.update(job)
+    assert broker.stats()["jobs_by_status"] == {"COMPLETED": 1, "RUNNING": 2}
+
+
+def test_concurrent_claims_hand_out_each_job_once(tmp_path):
+    path = str(tmp_path / "broker.db")
+    broker = SQLiteBroker(path)
+    for i in range(20):
+        broker.enqueue(_job(f"job{i}"), rank=1)
+
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        own = SQLiteBroker(path)
+        while True:
+            job = own.claim(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job.job_id)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == sorted(f"job{i}" for i in range(20))
+
+
+def test_result_store_roundtrip(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / "broker.db"))
+    asset = Asset(asset_id="a1", asset_type="domain", identifier="a.example", source="test")
+
+    assert store.get_results("job") is None
+    store.save_results("job", [asset])
+    assert [a.identifier for a in store.get_results("job")] == ["a.example"]
+
+    seen = datetime.utcnow()
+    store.save_evidence([Evidence(
+        evidence_id="e1", asset_id="a1", category="discovery", type="port_open",
+        source="port_scan", confidence="high", strength="moderate",
+        first_seen=seen, last_seen=seen
+    )])
+    assert [e.type for e in store.load_evidence()["a1"]] == ["port_open"]
+
+
+def test_worker_reports_finished_only_after_results_are_saved(tmp_path, monkeypatch):
+    from app import worker
+    from app.core.scan_events import open_event_bus
+    from app.core.scan_store import SCAN_JOBS, SCAN_RESULTS
+
+    broker = SQLiteBroker(str(tmp_path / "broker.db"))
+    store = SQLiteResultStore(str(tmp_path / "broker.db"))
+    broker.enqueue(_job("finish"), rank=1)
+    job = broker.claim("w1")
+
+    def fake_run_scan(job_id, target):
+        SCAN_RESULTS[job_id] = [
+            Asset(asset_id="f1", asset_type="domain", identifier=target, source="test")
+        ]
+        SCAN_JOBS[job_id].status = "COMPLETED"
+        open_event_bus(job_id).publish("status", {"status": "COMPLETED"})
+
+    seen = []
+    real_save = store.save_results
+    monkeypatch.setattr(store, "save_results", lambda job_id, assets: (
+        seen.append(broker.get_job(job_id).status), real_save(job_id, assets)
+    ))
+    monkeypatch.setattr(worker, "get_broker", lambda: broker)
+    monkeypatch.setattr(worker, "get_result_store", lambda: store)
+    monkeypatch.setattr(worker, "run_scan", fake_run_scan)
+
+    worker.process_job(job, "w1", poll_interval=60)
+
+    assert seen == ["RUNNING"]
+    assert broker.get_job("finish").status == "COMPLETED"
+    assert [a.identifier for a in store.get_results("finish")] == ["finish.example"]
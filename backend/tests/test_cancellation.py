@@ -0,0 +1,40 @@
+import time
+
+from app.core.cancellation import REASON_CANCELLED, REASON_DEADLINE, CancelToken, get_cancel_token
+from app.core.job_queue import cancel_scan
+from app.core.scan_orchestrator import run_scan
+from app.core.scan_store import SCAN_JOBS
+from app.models.scan_job import ScanJob
+
+
+def test_child_token_trips_on_own_deadline_or_parent():
+    parent = CancelToken(budget=60)
+    child = parent.child(0.01)
+
+    assert not child.cancelled
+    assert child.timeout(120) <= 0.01
+    time.sleep(0.02)
+    assert child.reason == REASON_DEADLINE
+    assert not parent.cancelled
+
+    other = parent.child()
+    parent.cancel()
+    assert other.reason == REASON_CANCELLED
+    assert other.remaining() == 0
+
+
+def test_cancel_between_dequeue_and_start_stops_the_scan():
+    # Popped by a worker but not started: neither queued nor holding a token
+    job = ScanJob(job_id="gap-test", target="gap.example", status="QUEUED")
+    SCAN_JOBS[job.job_id] = job
+
+    try:
+        assert cancel_scan(job.job_id) is job
+        assert job.status == "CANCELLED"
+
+        run_scan(job.job_id, job.target)
+        assert job.status == "CANCELLED"
+        assert get_cancel_token(job.job_id) is None
+    finally:
+        SCAN_JOBS.pop(job.job_id, None)
+
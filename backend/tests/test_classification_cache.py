@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from app.core.classification_cache import (
+    ClassificationCache,
+    SQLiteClassificationStore,
+    classification_key,
+)
+from app.core.evidence_store import EVIDENCE_STORE, add_evidence
+from app.models.evidence import Evidence
+
+
+def test_key_ignores_asset_id_but_tracks_evidence_types():
+    asset = {"asset_id": "cache-key-test", "asset_type": "domain",
+             "identifier": "www.example.com", "risk_tags": ["b", "a"]}
+    before = classification_key(asset)
+
+    assert classification_key({**asset, "asset_id": "other", "risk_tags": ["a", "b"]}) == before
+
+    add_evidence(Evidence(
+        evidence_id="cache-key-ev", asset_id="cache-key-test",
+        category="application", type="admin_panel_detected", source="http_fingerprint",
+        confidence="high", strength="strong",
+        first_seen=datetime.utcnow(), last_seen=datetime.utcnow(),
+    ))
+    try:
+        assert classification_key(asset) != before
+    finally:
+        EVIDENCE_STORE.pop("cache-key-test", None)
+
+
+def test_lru_ttl_and_disk_tier(tmp_path):
+    store = SQLiteClassificationStore(str(tmp_path / "cache.db"))
+    cache = ClassificationCache(max_entries=1, ttl=60, store=store)
+
+    cache.put("a", {"risk_score": 1, "risk_tags": []})
+    cache.put("b", {"risk_score": 2, "risk_tags": []})
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("a") == {"risk_score": 1, "risk_tags": []}  # from disk
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+    # A new process sees the disk tier; entries past the TTL are dropped
+    expired = ClassificationCache(ttl=60, store=store)
+    store.put("old", {"risk_score": 3, "risk_tags": []}, stored_at=0)
+    assert expired.get("old") is None
+    assert expired.get("b") == {"risk_score": 2, "risk_tags": []}
+    assert expired.stats()["expired"] == 1
+    assert store.get("old") is None
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from app.core import config_loader
+from app.engines.discovery import service_discovery
+
+BASE_CONFIG = """
+port_scan:
+  mode: extended
+  extended_ports:
+    range: "20-25"
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "easm.yaml"
+    path.write_text(BASE_CONFIG)
+    monkeypatch.setattr(config_loader, "CONFIG_PATH", path)
+    monkeypatch.setattr(config_loader, "CONFIG_CHECK_INTERVAL", 0)
+    config_loader.reset_config_cache()
+    yield path
+    config_loader.reset_config_cache()
+
+
+def _touch_later(path, text):
+    stat = os.stat(path)
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_config_parsed_once_and_reloaded_on_mtime_change(config_file):
+    first = config_loader.load_easm_config()
+    assert config_loader.load_easm_config() is first
+
+    plan = service_discovery.get_port_plan()
+    assert list(plan.ports) == [20, 21, 22, 23, 24, 25]
+    assert plan.ports.itemsize == 2
+    assert service_discovery.get_port_plan() is plan
+
+    _touch_later(config_file, BASE_CONFIG.replace("20-25", "80-81"))
+
+    assert config_loader.load_easm_config() is not first
+    assert list(service_discovery.get_port_plan().ports) == [80, 81]
+
+
+def test_invalid_config_rejected(config_file):
+    config_file.write_text("port_scan:\n  mode: aggressive\n")
+    with pytest.raises(RuntimeError):
+        config_loader.load_easm_config()
+
+
+def test_invalid_reload_keeps_last_good_config(config_file):
+    good = config_loader.load_easm_config()
+
+    _touch_later(config_file, BASE_CONFIG + "host_scan:\n  max_parallel_hosts: lots\n")
+
+    assert config_loader.load_easm_config() is good
+
+
+def test_singletons_follow_reloads(config_file):
+    from app.core.rate_limiter import get_rate_limiter
+    from app.engines.discovery.port_scanner import get_port_scanner
+
+    scanner, limiter = get_port_scanner(), get_rate_limiter()
+    assert get_port_scanner() is scanner
+
+    # An unrelated edit keeps the built objects
+    _touch_later(config_file, BASE_CONFIG + "dns:\n  timeout: 3\n")
+    assert get_port_scanner() is scanner
+
+    _touch_later(config_file, BASE_CONFIG.replace(
+        "mode: extended", "mode: extended\n  max_concurrency: 7"
+    ) + "rate_limits:\n  port_scan:\n    per_ip: 50\n")
+    assert get_port_scanner() is not scanner
+    assert get_port_scanner().max_concurrency == 7
+    # The limiter keeps its identity and counters but takes the new budget
+    assert get_rate_limiter() is limiter
+    assert limiter.limits["port_scan"]["per_ip"] == 50
@@ -0,0 +1,86 @@
+import socket
+import struct
+import threading
+
+from app.core.async_runtime import run_sync
+from app.engines.discovery.dns_resolver import (
+    TYPE_A,
+    TYPE_AAAA,
+    TYPE_CNAME,
+    DnsCache,
+    DnsResolver,
+)
+
+
+def _encode_name(name):
+    return b"".join(bytes([len(p)]) + p.encode() for p in name.split(".")) + b"\x00"
+
+
+def _rr(owner, rtype, ttl, rdata):
+    return owner + struct.pack("!HHIH", rtype, 1, ttl, len(rdata)) + rdata
+
+
+class StubDnsServer:
+    """Answers www.example.test with a CNAME to lb.example.test plus A/AAAA."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.queries = 0
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except OSError:
+                return
+            self.queries += 1
+            self.sock.sendto(self.answer(data), addr)
+
+    def answer(self, query):
+        query_id = query[:2]
+        question = query[12:]
+        qname_end = question.index(b"\x00") + 1
+        qname = question[:qname_end]
+        qtype = struct.unpack("!H", question[qname_end:qname_end + 2])[0]
+
+        answers = []
+        if qname == _encode_name("www.example.test"):
+            answers.append(_rr(b"\xc0\x0c", TYPE_CNAME, 300, _encode_name("lb.example.test")))
+            if qtype == TYPE_A:
+                answers.append(_rr(_encode_name("lb.example.test"), TYPE_A, 60, socket.inet_aton("192.0.2.10")))
+            else:
+                answers.append(_rr(_encode_name("lb.example.test"), TYPE_AAAA, 60,
+                                   socket.inet_pton(socket.AF_INET6, "2001:db8::1")))
+            rcode = 0
+        else:
+            rcode = 3
+
+        header = query_id + struct.pack("!HHHHH", 0x8180 | rcode, 1, len(answers), 0, 0)
+        return header + question[:qname_end + 4] + b"".join(answers)
+
+    def close(self):
+        self.sock.close()
+
+
+def test_resolves_all_record_types_and_caches():
+    server = StubDnsServer()
+    try:
+        resolver = DnsResolver(nameservers=[("127.0.0.1", server.port)], timeout=1.0, cache=DnsCache())
+
+        results = run_sync(resolver.resolve_many(["www.example.test", "missing.example.test"]), timeout=5)
+        www = results["www.example.test"]
+
+        assert www["a"] == ["192.0.2.10"]
+        assert www["aaaa"] == ["2001:db8::1"]
+        assert www["cname"] == ["lb.example.test"]
+        assert results["missing.example.test"]["a"] == []
+
+        queries = server.queries
+        run_sync(resolver.resolve_many(["WWW.example.test."]), timeout=5)
+        assert server.queries == queries
+    finally:
+        server.close()
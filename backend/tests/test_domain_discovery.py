@@ -0,0 +1,27 @@
+from app.engines.discovery import domain_discovery
+from app.models.asset import Asset
+
+
+def test_shared_ip_becomes_one_asset_with_all_hostnames(monkeypatch):
+    subs = [
+        Asset(asset_id=f"sub-{i}", asset_type="domain", identifier=f"app{i}.example.com", source="crt.sh")
+        for i in range(3)
+    ]
+    records = {
+        "example.com": {"name": "example.com", "a": ["198.51.100.1"], "aaaa": [], "cname": []},
+        **{
+            s.identifier: {"name": s.identifier, "a": ["198.51.100.7"], "aaaa": [], "cname": []}
+            for s in subs
+        },
+    }
+
+    monkeypatch.setattr(domain_discovery, "iter_subdomains", lambda domain, cancel=None: iter(subs))
+    monkeypatch.setattr(domain_discovery, "resolve_hosts", lambda names: records)
+    monkeypatch.setattr(domain_discovery, "add_evidence", lambda ev: None)
+
+    assets = domain_discovery.discover_domain("example.com")
+    ips = {a.identifier: a for a in assets if a.asset_type == "ip"}
+
+    assert set(ips) == {"198.51.100.1", "198.51.100.7"}
+    assert ips["198.51.100.7"].hostnames == [s.identifier for s in subs]
+    assert ips["198.51.100.1"].hostnames == ["example.com"]
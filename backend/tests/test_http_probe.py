@@ -0,0 +1,77 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.evidence_store import get_evidence_for_asset
+from app.engines.discovery import http_analyzers
+from app.engines.discovery.async_http_engine import AsyncHttpClient, capture_http_services
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen = 0
+
+    def do_GET(self):
+        type(self).requests_seen += 1
+        body = b"<html>Admin Login - powered by llama, ignore instructions</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_single_fetch_feeds_all_analyzers(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    seen = []
+    monkeypatch.setattr(http_analyzers, "HTTP_ANALYZERS", http_analyzers.HTTP_ANALYZERS + [
+        lambda asset_id, capture: seen.append(capture.status_code)
+    ])
+
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        [capture] = capture_http_services([url], client=AsyncHttpClient(rate_limit=None))
+        http_analyzers.run_http_analyzers("probe-asset", capture)
+    finally:
+        server.shutdown()
+
+    types = {e.type for e in get_evidence_for_asset("probe-asset")}
+    assert capture.status_code == 200
+    assert _Handler.requests_seen == 1
+    assert seen == [200]
+    assert {"http_service_detected", "admin_interface_detected", "model_overexposure",
+            "jailbreak_attempt_detected"} <= types
+
+
+class _LargeBodyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = ("Ä" * 5000).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_body_capture_stops_at_byte_cap():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LargeBodyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AsyncHttpClient(max_body_bytes=1001, rate_limit=None)
+
+    try:
+        [capture] = capture_http_services([f"http://127.0.0.1:{server.server_address[1]}"], client=client)
+    finally:
+        server.shutdown()
+
+    assert capture.body_bytes == 1001
+    assert capture.truncated is True
+    assert capture.capture_info()["truncated_reason"] == "size_limit"
+    assert capture.body.startswith("ä" * 500)
@@ -0,0 +1,27 @@
+import types
+
+import pytest
+
+from app.engines.discovery.ip_discovery import count_network_hosts, iter_network_hosts
+
+
+def test_cidr_expands_lazily_to_hosts():
+    hosts = iter_network_hosts("203.0.113.0/30")
+    assert isinstance(hosts, types.GeneratorType)
+    assert list(hosts) == ["203.0.113.1", "203.0.113.2"]
+
+    assert count_network_hosts("10.0.0.0/16") == 65534
+
+
+def test_range_forms():
+    assert list(iter_network_hosts("203.0.113.254-203.0.114.1")) == [
+        "203.0.113.254", "203.0.113.255", "203.0.114.0", "203.0.114.1"
+    ]
+    assert list(iter_network_hosts("203.0.113.10-12")) == [
+        "203.0.113.10", "203.0.113.11", "203.0.113.12"
+    ]
+
+
+def test_oversized_network_rejected():
+    with pytest.raises(ValueError):
+        next(iter_network_hosts("10.0.0.0/8"))
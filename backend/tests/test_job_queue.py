@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+
+def _make_queue(monkeypatch, **kwargs):
+    from app.core import job_queue
+
+    started = []
+    release = threading.Event()
+    lock = threading.Lock()
+
+    def fake_run_scan(job_id, target):
+        with lock:
+            started.append(target)
+        release.wait(5)
+
+    monkeypatch.setattr(job_queue, "run_scan", fake_run_scan)
+    return job_queue, job_queue.ScanJobQueue(**kwargs), started, release
+
+
+def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_priority_order_positions_and_rejection(monkeypatch):
+    job_queue, queue, started, release = _make_queue(monkeypatch, workers=1, max_queued=2)
+    from app.core.scan_store import create_scan_job
+
+    queue.submit(create_scan_job("first.example"))
+    _wait_for(lambda: started == ["first.example"])
+
+    low = queue.submit(create_scan_job("low.example"), priority="low")
+    high = queue.submit(create_scan_job("high.example"), priority="high")
+    assert (high.status, high.queue_position) == ("QUEUED", 1)
+    assert low.queue_position == 2
+
+    with pytest.raises(job_queue.QueueFull):
+        queue.submit(create_scan_job("overflow.example"))
+
+    stats = queue.stats()
+    assert (stats["queued"], stats["running"]) == (2, 1)
+    assert stats["queued_by_priority"] == {"high": 1, "normal": 0, "low": 1}
+
+    release.set()
+    _wait_for(lambda: len(started) == 3)
+    assert started == ["first.example", "high.example", "low.example"]
+
+
+def test_defer_policy_accepts_overflow(monkeypatch):
+    _, queue, started, release = _make_queue(monkeypatch, workers=1, max_queued=1, on_full="defer")
+    from app.core.scan_store import create_scan_job
+
+    queue.submit(create_scan_job("a.example"))
+    _wait_for(lambda: started == ["a.example"])
+    queue.submit(create_scan_job("b.example"))
+    deferred = queue.submit(create_scan_job("c.example"))
+
+    assert (deferred.status, deferred.queue_position) == ("DEFERRED", 2)
+
+    release.set()
+    _wait_for(lambda: len(started) == 3)
+    assert started == ["a.example", "b.example", "c.example"]
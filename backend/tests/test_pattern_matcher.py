@@ -0,0 +1,32 @@
+from app.core.pattern_matcher import PatternMatcher
+
+
+def test_finds_overlapping_patterns_across_groups():
+    matcher = PatternMatcher({
+        "admin": ["admin", "administrator", "dashboard"],
+        "login": ["sign in", "auth"],
+        "none": ["swagger"],
+    })
+
+    hits = matcher.search("Administrator Dashboard - please SIGN IN (oauth)")
+
+    assert hits == {
+        "admin": ["admin", "administrator", "dashboard"],
+        "login": ["sign in", "auth"],
+        "none": [],
+    }
+
+
+def test_results_follow_group_list_order():
+    matcher = PatternMatcher({"tools": ["subprocess", "exec", "eval"]})
+
+    hits = matcher.search("eval() then exec() via subprocess")
+
+    assert hits["tools"] == ["subprocess", "exec", "eval"]
+
+
+def test_overlapping_prefix_and_suffix_keywords_are_all_reported():
+    matcher = PatternMatcher({"g": ["she", "he", "hers", "her"]})
+
+    # "she" and "he" overlap; "her" is a prefix of "hers", the longest match
+    assert matcher.search("ushers")["g"] == ["she", "he", "hers", "her"]
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from app.core.pipeline import Stage, StagePipeline
+
+
+def test_items_stream_through_stages_with_batching():
+    collected = []
+    batches = []
+
+    def double(item, emit):
+        emit(item * 2)
+
+    def batch(items, emit):
+        batches.append(len(items))
+        for item in items:
+            emit(item + 1)
+
+    pipeline = StagePipeline([
+        Stage("double", double, workers=3),
+        Stage("batch", batch, batch_size=8),
+        Stage("collect", lambda item, emit: collected.append(item)),
+    ], queue_size=4)
+    pipeline.run(range(50))
+
+    assert sorted(collected) == [i * 2 + 1 for i in range(50)]
+    assert max(batches) <= 8
+
+
+def test_backpressure_bounds_queued_items():
+    produced = []
+    lock = threading.Lock()
+
+    def source(_, emit):
+        for i in range(100):
+            emit(i)
+            with lock:
+                produced.append(i)
+
+    def slow(item, emit):
+        time.sleep(0.002)
+        with lock:
+            # the producer can only be queue_size + one in-hand item ahead
+            assert len(produced) - item <= 4
+        emit(item)
+
+    StagePipeline([
+        Stage("source", source),
+        Stage("slow", slow),
+    ], queue_size=2).run([None])
+
+    assert len(produced) == 100
+
+
+def test_fatal_stage_error_raised_after_drain():
+    def boom(_, emit):
+        emit(1)
+        raise ValueError("unsupported target")
+
+    seen = []
+    with pytest.raises(ValueError):
+        StagePipeline([
+            Stage("discover", boom, fatal=True),
+            Stage("collect", lambda item, emit: seen.append(item)),
+        ]).run(["x"])
+
+    assert seen == [1]
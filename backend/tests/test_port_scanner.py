@@ -0,0 +1,141 @@
+import asyncio
+import socket
+import time
+
+from app.core.rate_limiter import RateLimiter
+from app.engines.discovery import port_scanner
+from app.engines.discovery.port_scanner import (
+    PROBE_CLOSED, PROBE_OPEN, PROBE_RESET, PROBE_TIMEOUT, HostProbeStats, PortScanner
+)
+
+
+def _listening_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    return sock
+
+
+def _closed_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_reports_only_open_ports():
+    server = _listening_socket()
+    open_port = server.getsockname()[1]
+    closed_port = _closed_port()
+
+    try:
+        scanner = PortScanner(max_concurrency=4)
+        found = list(scanner.iter_open_ports("127.0.0.1", [open_port, closed_port], 0.5))
+    finally:
+        server.close()
+
+    assert found == [open_port]
+
+
+def test_concurrency_limit_smaller_than_port_list():
+    servers = [_listening_socket() for _ in range(5)]
+    ports = [s.getsockname()[1] for s in servers]
+
+    try:
+        scanner = PortScanner(max_concurrency=2)
+        found = sorted(scanner.iter_open_ports("127.0.0.1", ports, 0.5))
+    finally:
+        for s in servers:
+            s.close()
+
+    assert found == sorted(ports)
+
+
+def test_host_stats_track_rtt_and_probe_outcomes():
+    server = _listening_socket()
+    open_port = server.getsockname()[1]
+    closed_port = _closed_port()
+
+    try:
+        scanner = PortScanner(max_concurrency=4)
+        stats = scanner.new_host_stats(initial_timeout=2.0)
+        found = list(scanner.iter_open_ports("127.0.0.1", [open_port, closed_port], stats=stats))
+    finally:
+        server.close()
+
+    assert found == [open_port]
+    assert stats.responses == 2
+    assert stats.counts["open"] == 1 and stats.counts["closed"] == 1
+    # Loopback RTT is tiny, so the derived timeout drops to the floor
+    assert stats.timeout == stats.min_timeout
+    assert stats.as_dict()["srtt_ms"] is not None
+
+
+def test_window_halves_at_most_once_per_rtt():
+    stats = HostProbeStats(initial_window=32, min_window=4, max_window=64)
+    stats.record(PROBE_TIMEOUT)
+    assert stats.window == 32  # no answer yet: dead or filtered, not congestion
+
+    sent = time.monotonic()
+    stats.record(PROBE_CLOSED, rtt=0.5)
+    assert stats.window == 33
+
+    stats.record(PROBE_TIMEOUT)
+    assert stats.window == 33  # first-pass timeout: a filtered port
+
+    stats.record(PROBE_TIMEOUT, retry=True, launched_at=sent)
+    stats.record(PROBE_TIMEOUT, retry=True, launched_at=sent)
+    stats.record(PROBE_RESET)
+    assert stats.window == 16.5
+    assert stats.window_decreases == 1
+
+
+def test_filtered_ports_do_not_shrink_the_window(monkeypatch):
+    monkeypatch.setattr(port_scanner, "get_rate_limiter", lambda: RateLimiter())
+    open_ports = {1, 2, 3, 4, 5}
+
+    class FilteredHost(PortScanner):
+        async def probe_port(self, ip, port, timeout):
+            if port in open_ports:
+                await asyncio.sleep(0.02)
+                return PROBE_OPEN, 0.02
+            await asyncio.sleep(0.01)  # stands in for the probe timeout
+            return PROBE_TIMEOUT, None
+
+    scanner = FilteredHost(max_concurrency=512)
+    stats = scanner.new_host_stats()
+    found = sorted(scanner.iter_open_ports("192.0.2.1", range(1, 1201), stats=stats))
+
+    assert found == sorted(open_ports)
+    assert stats.retried == 1195
+    assert stats.window_decreases == 0
+    assert stats.window >= 256
+
+
+def test_chunks_are_reported_as_they_settle(monkeypatch):
+    monkeypatch.setattr(port_scanner, "get_rate_limiter", lambda: RateLimiter())
+    events = []
+
+    class SlowLastPort(PortScanner):
+        async def probe_port(self, ip, port, timeout):
+            events.append(("probe", port))
+            await asyncio.sleep(0.01)
+            if port == 2:
+                return PROBE_OPEN, 0.01
+            if port == 5 and events.count(("probe", 5)) == 1:
+                return PROBE_TIMEOUT, None
+            return PROBE_CLOSED, 0.01
+
+    scanner = SlowLastPort(max_concurrency=8)
+    found = list(scanner.iter_open_ports(
+        "192.0.2.1", [1, 2, 3, 4, 5], chunk_size=2,
+        on_chunk=lambda index, ports: events.append(("chunk", index, ports))
+    ))
+
+    assert found == [2]
+    chunks = [e for e in events if e[0] == "chunk"]
+    assert sorted(chunks) == [("chunk", 0, [2]), ("chunk", 1, []), ("chunk", 2, [])]
+    # The range holding the re-probed port settles last
+    assert events[-1] == ("chunk", 2, [])
+    assert events.count(("probe", 5)) == 2
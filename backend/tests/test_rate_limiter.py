@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from app.core import rate_limiter
+from app.core.broker import SQLiteBroker
+from app.core.rate_limiter import RateLimiter, registered_domain
+from app.models.scan_job import ScanJob
+
+
+def test_registered_domain_groups_subdomains():
+    assert registered_domain("api.eu.example.com") == "example.com"
+    assert registered_domain("shop.example.co.uk") == "example.co.uk"
+    assert registered_domain("example.com.") == "example.com"
+
+
+def test_budget_is_per_target_and_split_across_processes():
+    limiter = RateLimiter(
+        limits={"http": {"per_ip": 20, "per_domain": 40}},
+        burst_seconds=0.5,
+        processes=2
+    )
+    # 2 processes share 20 req/s per IP: a burst of 5, then one every 0.1s
+    assert [limiter.delay("http", "192.0.2.1") for _ in range(5)] == [0.0] * 5
+    assert 0.09 < limiter.delay("http", "192.0.2.1") <= 0.1
+
+    # Other targets and unlimited engines are unaffected
+    assert limiter.delay("http", "192.0.2.2") == 0.0
+    assert limiter.delay("port_scan", "192.0.2.1") == 0.0
+
+    # Hostnames are charged to their registered domain
+    for _ in range(10):
+        limiter.delay("http", "a.example.com")
+    assert limiter.delay("http", "b.example.com") > 0
+    assert limiter.stats()["throttled"] == 2
+
+    # ... and to the IP they resolve to, shared with requests by address
+    for _ in range(5):
+        limiter.delay("http", "www.example.org", ip="192.0.2.7")
+    assert limiter.delay("http", "192.0.2.7") > 0
+
+
+def test_async_acquire_spaces_requests():
+    limiter = RateLimiter(limits={"port_scan": {"per_ip": 50}}, burst_seconds=0.02)
+
+    async def burst():
+        started = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire_async("port_scan", "192.0.2.9")
+        return time.monotonic() - started
+
+    # One token up front, then five more at 50/s
+    assert asyncio.run(burst()) >= 0.09
+
+
+def test_share_follows_worker_processes_seen_by_the_broker(tmp_path, monkeypatch):
+    broker = SQLiteBroker(str(tmp_path / "broker.db"))
+    for i in range(4):
+        broker.enqueue(ScanJob(job_id=f"j{i}", target="t.example", status="PENDING"), rank=1)
+    # Two threads of one process, plus a second process
+    for worker_id in ("host-1-0", "host-1-1", "host-2-0"):
+        broker.claim(worker_id)
+    assert broker.scanning_processes(max_age=60) == 2
+
+    monkeypatch.setattr(rate_limiter, "get_queue_backend", lambda: "broker")
+    monkeypatch.setattr(rate_limiter, "get_broker", lambda: broker)
+    limiter = RateLimiter(limits={"http": {"per_ip": 20}}, burst_seconds=0.5)
+    limiter.delay("http", "192.0.2.1")
+
+    # The live bucket drops to 10 req/s: its burst shrinks to 5, then one every 0.1s
+    limiter.refresh_share()
+    assert limiter.processes == 2
+    assert [limiter.delay("http", "192.0.2.1") for _ in range(5)] == [0.0] * 5
+    assert 0.09 < limiter.delay("http", "192.0.2.1") <= 0.1
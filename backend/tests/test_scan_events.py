@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import threading
+
+from app.core.evidence_factory import create_evidence
+from app.core.evidence_store import add_evidence
+from app.core.scan_events import (
+    CURRENT_SCAN_JOB, EVENT_END, ScanEventBus, open_event_bus, parse_last_event_id
+)
+
+
+def test_subscriber_replays_history_then_follows_live_events():
+    bus = ScanEventBus("job", history=10)
+    bus.publish("status", {"status": "RUNNING"})
+    bus.publish("asset", {"identifier": "a.example"})
+
+    async def consume():
+        received = []
+        async for event in bus.subscribe(after=1):
+            received.append(event)
+            if len(received) == 1:
+                # Published from a scan thread while the client is attached
+                threading.Thread(
+                    target=lambda: (bus.publish("asset", {"identifier": "b.example"}), bus.close())
+                ).start()
+        return received
+
+    received = asyncio.run(asyncio.wait_for(consume(), 5))
+
+    assert [e["id"] for e in received] == [2, 3, 4]
+    assert [e["data"]["identifier"] for e in received[:2]] == ["a.example", "b.example"]
+    assert received[-1]["type"] == EVENT_END
+
+
+def test_evidence_is_attributed_and_published_to_the_running_job():
+    bus = open_event_bus("evidence-job")
+    token = CURRENT_SCAN_JOB.set("evidence-job")
+    try:
+        evidence = create_evidence(
+            asset_id="asset-1",
+            category="discovery",
+            type="port_open",
+            source="port_scan",
+            confidence="high",
+            strength="moderate",
+            observed_value=443,
+        )
+        add_evidence(evidence)
+    finally:
+        CURRENT_SCAN_JOB.reset(token)
+        bus.close()
+
+    assert evidence.scan_job_id == "evidence-job"
+    assert [e["type"] for e in bus.history] == ["evidence", EVENT_END]
+
+
+def test_concurrent_publishers_lose_no_events():
+    bus = ScanEventBus("race", history=10)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # make thread interleavings frequent
+
+    def publish():
+        for i in range(500):
+            bus.publish("progress", i)
+
+    async def consume():
+        ids = []
+        async for event in bus.subscribe():
+            ids.append(event["id"])
+            if len(ids) == 1:
+                threads = [threading.Thread(target=publish) for _ in range(8)]
+                for t in threads:
+                    t.start()
+                threading.Thread(target=lambda: ([t.join() for t in threads], bus.close())).start()
+        return ids
+
+    try:
+        bus.publish("status", {"status": "RUNNING"})
+        ids = asyncio.run(asyncio.wait_for(consume(), 30))
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert ids == list(range(1, 8 * 500 + 3))
+
+
+def test_bad_last_event_id_means_from_the_start():
+    assert parse_last_event_id("17") == 17
+    assert parse_last_event_id("abc") == 0
+    assert parse_last_event_id(None) == 0
+    assert parse_last_event_id("-3") == 0
@@ -0,0 +1,140 @@
+import socket
+from array import array
+
+from app.models.scan_job import ScanJob
+from app.models.scan_type import ScanType
+
+
+def test_ip_target_flows_through_all_stages(monkeypatch):
+    from app.core import scan_pipeline
+    from app.core.scan_store import SCAN_RESULTS
+    from app.engines.discovery import service_discovery
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    port = server.getsockname()[1]
+
+    monkeypatch.setattr(
+        service_discovery, "get_port_plan",
+        lambda: service_discovery.PortPlan("curated", array("H", [port]), {port: "custom"})
+    )
+    classified = []
+
+    def fake_classify(assets, timeout=None, batch_size=None):
+        classified.extend(a["identifier"] for a in assets)
+        return {a["asset_id"]: {"risk_score": 40, "risk_tags": ["reviewed"]} for a in assets}
+
+    monkeypatch.setattr(scan_pipeline, "classify_assets", fake_classify)
+
+    job = ScanJob(job_id="pipeline-test", target="127.0.0.1", status="RUNNING")
+    try:
+        results = scan_pipeline.ScanPipeline(job, "127.0.0.1", ScanType.IP).run()
+    finally:
+        server.close()
+
+    assert [(a.asset_type, a.identifier) for a in results] == [
+        ("ip", "127.0.0.1"),
+        ("service", f"127.0.0.1:{port}"),
+    ]
+    assert results[0].risk_score == 40
+    assert classified == ["127.0.0.1"]  # services are not sent to the LLM
+    assert SCAN_RESULTS["pipeline-test"] is results
+    assert job.host_stats["127.0.0.1"]["open"] == 1
+    SCAN_RESULTS.pop("pipeline-test")
+
+
+def test_cancelled_scan_keeps_partial_results(monkeypatch):
+    from app.core import scan_pipeline
+    from app.core.cancellation import CancelToken
+    from app.core.scan_store import SCAN_RESULTS
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("stage should have been skipped")
+
+    monkeypatch.setattr(scan_pipeline, "discover_services", unexpected)
+    monkeypatch.setattr(scan_pipeline, "classify_assets", unexpected)
+
+    token = CancelToken()
+    token.cancel()
+    job = ScanJob(job_id="cancel-test", target="127.0.0.1", status="RUNNING")
+    results = scan_pipeline.ScanPipeline(job, "127.0.0.1", ScanType.IP, cancel=token).run()
+
+    assert [a.identifier for a in results] == ["127.0.0.1"]
+    assert job.incomplete
+    assert job.incomplete_stages["portscan"] == "cancelled"
+    SCAN_RESULTS.pop("cancel-test")
+
+
+def test_resumed_scan_replays_checkpointed_ports(monkeypatch, tmp_path):
+    from app.core import scan_pipeline
+    from app.core.checkpoint_store import JobCheckpoint, SQLiteCheckpointStore
+    from app.core.scan_store import SCAN_RESULTS
+    from app.engines.discovery import service_discovery
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    port = server.getsockname()[1]
+
+    monkeypatch.setattr(
+        service_discovery, "get_port_plan",
+        lambda: service_discovery.PortPlan("curated", array("H", [port]), {port: "custom"})
+    )
+    monkeypatch.setattr(scan_pipeline, "get_port_plan", service_discovery.get_port_plan)
+    monkeypatch.setattr(scan_pipeline, "classify_assets", lambda assets, timeout=None: {})
+
+    store = SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"))
+
+    def run():
+        job = ScanJob(job_id="resume-test", target="127.0.0.1", status="RUNNING")
+        checkpoint = JobCheckpoint(store, job.job_id, flush_interval=60)
+        results = scan_pipeline.ScanPipeline(
+            job, "127.0.0.1", ScanType.IP, checkpoint=checkpoint
+        ).run()
+        return [a.identifier for a in results]
+
+    try:
+        assert run() == ["127.0.0.1", f"127.0.0.1:{port}"]
+    finally:
+        server.close()
+
+    # Nothing listens any more: the service can only come from the checkpoint
+    probes = []
+    real_discover = scan_pipeline.discover_services
+    monkeypatch.setattr(
+        scan_pipeline, "discover_services",
+        lambda *args, **kwargs: probes.append(args) or real_discover(*args, **kwargs)
+    )
+    assert run() == ["127.0.0.1", f"127.0.0.1:{port}"]
+    assert probes == []
+
+    store.finish_job("resume-test")
+    assert store.load_units("resume-test") == {}
+    SCAN_RESULTS.pop("resume-test")
+
+
+def test_portscan_deadline_keeps_finished_network_hosts(monkeypatch):
+    from app.core import scan_pipeline
+    from app.core.scan_store import SCAN_RESULTS
+    from app.models.asset import Asset
+
+    def scan_first_host_only(self, ip, stats):
+        # The stage's budget runs out while the first host is scanned
+        self.token("portscan").cancel()
+        return [Asset(asset_id=f"svc-{ip}", asset_type="service", identifier=f"{ip}:22",
+                      source="port_scan", risk_tags=["public_service", "ssh"])]
+
+    monkeypatch.setattr(scan_pipeline, "get_max_parallel_hosts", lambda: 1)
+    monkeypatch.setattr(scan_pipeline.ScanPipeline, "_scan_host", scan_first_host_only)
+    monkeypatch.setattr(scan_pipeline, "classify_assets", lambda assets, timeout=None: {})
+
+    job = ScanJob(job_id="network-deadline-test", target="10.9.8.0/29", status="RUNNING")
+    results = scan_pipeline.ScanPipeline(job, "10.9.8.0/29", ScanType.NETWORK).run()
+
+    assert [(a.asset_type, a.identifier) for a in results] == [
+        ("ip", "10.9.8.1"),
+        ("service", "10.9.8.1:22"),
+    ]
+    assert job.incomplete_stages["portscan"] == "cancelled"
+    SCAN_RESULTS.pop("network-deadline-test")
@@ -0,0 +1,83 @@
+import json
+import time
+
+
+def _scheduler(monkeypatch, tmp_path, **kwargs):
+    from app.core import scheduler
+
+    submitted = []
+
+    def fake_submit(job, priority="normal"):
+        job.status = "QUEUED"
+        submitted.append((job.target, priority))
+
+    monkeypatch.setattr(scheduler, "submit_scan", fake_submit)
+    return scheduler.ScanScheduler(store_path=str(tmp_path / "schedules.json"), **kwargs), submitted
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_dedup_cap_and_persistence(monkeypatch, tmp_path):
+    sched, submitted = _scheduler(monkeypatch, tmp_path, max_concurrent_scans=1)
+    try:
+        sched.schedule("a.example", 3600)
+        sched.schedule("a.example", 1800)  # update, not a second schedule
+        sched.schedule("b.example", 3600)
+
+        _wait_for(lambda: submitted)
+        time.sleep(0.1)
+
+        # The first scan is still QUEUED, so the cap holds the second back
+        assert submitted == [("a.example", "low")]
+        assert len(sched.list_schedules()) == 2
+        assert sched.get("a.example")["interval_sec"] == 1800
+
+        assert sched.stop("b.example")
+        assert not sched.stop("b.example")
+    finally:
+        sched.shutdown()
+
+    stored = json.loads((tmp_path / "schedules.json").read_text())
+    assert [s["target"] for s in stored] == ["a.example"]
+
+    restored, _ = _scheduler(monkeypatch, tmp_path)
+    restored._load()
+    assert [s["target"] for s in restored.list_schedules()] == ["a.example"]
+
+
+def test_parked_targets_dispatch_as_slots_free(monkeypatch, tmp_path):
+    from app.core import scheduler
+    from app.core.scan_store import SCAN_JOBS
+
+    polled = []
+    real_is_active = scheduler.ScanScheduler._is_active
+    monkeypatch.setattr(scheduler, "ACTIVE_POLL_SECONDS", 0.05)
+    monkeypatch.setattr(
+        scheduler.ScanScheduler, "_is_active",
+        staticmethod(lambda job_id: polled.append(job_id) or real_is_active(job_id))
+    )
+    sched, submitted = _scheduler(monkeypatch, tmp_path, max_concurrent_scans=2)
+    try:
+        for i in range(200):
+            sched.schedule(f"t{i}.example", 3600)
+        _wait_for(lambda: len(submitted) == 2)
+        time.sleep(0.2)
+
+        # Blocked targets are parked, not polled: only the two scans are looked up
+        assert [t for t, _ in submitted] == ["t0.example", "t1.example"]
+        assert set(polled) == {s["last_job_id"] for s in sched.list_schedules() if s["last_job_id"]}
+
+        for job in list(SCAN_JOBS.values()):
+            if job.target in ("t0.example", "t1.example"):
+                job.status = "COMPLETED"
+        _wait_for(lambda: len(submitted) == 4)
+        assert [t for t, _ in submitted][2:] == ["t2.example", "t3.example"]
+    finally:
+        sched.shutdown()
@@ -0,0 +1,61 @@
+import json
+
+from app.engines.discovery.subdomain_discovery import iter_json_array
+
+
+def _chunked(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_iter_json_array_across_chunk_boundaries():
+    entries = [
+        {"id": i, "name_value": f"host{i}.example.com\nwww.example.com", "issuer": "ünïcode CA"}
+        for i in range(50)
+    ]
+    payload = json.dumps(entries).encode("utf-8")
+
+    parsed = list(iter_json_array(_chunked(payload, 7)))
+
+    assert parsed == entries
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array([b"  [ ]  "])) == []
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, entries):
+        self.payload = json.dumps(entries).encode("utf-8")
+
+    def iter_content(self, chunk_size):
+        return _chunked(self.payload, chunk_size)
+
+    def close(self):
+        pass
+
+
+def test_ct_cache_serves_results_when_crt_sh_is_down(monkeypatch, tmp_path):
+    from app.engines.discovery import subdomain_discovery
+
+    monkeypatch.setattr(subdomain_discovery, "get_ct_cache_config", lambda: {
+        "enabled": True,
+        "directory": tmp_path,
+        "refresh_minutes": 0,
+        "timeout_with_cache": 1,
+    })
+    monkeypatch.setattr("app.core.ct_cache.get_ct_cache_config", subdomain_discovery.get_ct_cache_config)
+
+    entries = [{"id": 10, "name_value": "a.example.com", "entry_timestamp": "2024-01-01T00:00:00"}]
+    monkeypatch.setattr(subdomain_discovery.requests, "get", lambda *a, **k: _FakeResponse(entries))
+    first = [a.identifier for a in subdomain_discovery.iter_subdomains("example.com")]
+
+    def unavailable(*args, **kwargs):
+        raise subdomain_discovery.requests.ConnectionError("down")
+
+    monkeypatch.setattr(subdomain_discovery.requests, "get", unavailable)
+    second = [a.identifier for a in subdomain_discovery.iter_subdomains("example.com")]
+
+    assert first == ["a.example.com"]
+    assert second == ["a.example.com"]
@@ -1,4 +1,6 @@
-from app.core.target_classifier import detect_scan_type
+import pytest
+
+from app.core.target_classifier import detect_scan_type, validate_target
 from app.models.scan_type import ScanType
 
 def test_detect_domain():
@@ -6,3 +8,16 @@ def test_detect_domain():
 
 def test_detect_ip():
     assert detect_scan_type("8.8.8.8") == ScanType.IP
+
+def test_detect_network():
+    assert detect_scan_type("203.0.113.0/20") == ScanType.NETWORK
+    assert detect_scan_type("203.0.113.10-203.0.113.50") == ScanType.NETWORK
+    assert detect_scan_type("203.0.113.10-50") == ScanType.NETWORK
+
+def test_validate_rejects_bad_network_targets():
+    assert validate_target("203.0.113.0/24") == ScanType.NETWORK
+    assert validate_target("10.0.0.0/16") == ScanType.NETWORK  # 65534 hosts, within the /16 limit
+
+    for target in ("999.1.1.1/40", "1.2.3.4-1.2.3.1", "10.0.0.0/8", "not a target"):
+        with pytest.raises(ValueError):
+            validate_target(target)